@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+EV-MES 应用入口
+
+生产部署（/api/events 推送连接较多时使用 gevent worker，见 src/utils/event_bus.py）:
+    gunicorn -k gevent -w 1 --worker-connections 1000 'app:create_app()'
+"""
+import os
+from flask import Flask, redirect, url_for
+from src.config import SECRET_KEY, DEBUG, BASE_DIR
+from src.models.database import init_database, session_factory
+from src.ui.dashboard_views import dashboard_bp
+from src.ui.order_views import order_bp
+from src.ui.inventory_views import inventory_bp
+from src.ui.production_views import production_bp
+from src.ui.api_views import api_bp
+from src.utils.request_timing import RequestTiming
+from src.utils.query_stats import QueryStats
+from src.utils.metrics import Metrics
+from src.utils.json_utils import JsonUtils
+from src.ui.metrics_views import metrics_bp
+from src.utils.profiler import Profiler
+from src.ui.admin_views import admin_bp
+
+
+def create_app():
+    """
+    创建Flask应用并注册蓝图
+    """
+    app = Flask(__name__, template_folder=os.path.join(BASE_DIR, 'templates'))
+    app.config['SECRET_KEY'] = SECRET_KEY
+    
+    # 安装了 orjson 时使用更快的 JSON 序列化
+    JsonUtils.init_app(app)
+    
+    # 初始化数据库
+    init_database()
+    
+    # 分阶段请求计时（Server-Timing 响应头 + 慢请求日志）
+    RequestTiming.init_app(app)
+    
+    # 每请求SQL计数与 N+1 检测
+    QueryStats.init_app(app)
+    
+    # 请求耗时与计数指标
+    Metrics.init_app(app)
+    
+    # 按需性能剖析（?__profile=1 或抽样窗口）
+    Profiler.init_app(app)
+    
+    # 注册蓝图
+    app.register_blueprint(dashboard_bp)
+    app.register_blueprint(order_bp)
+    app.register_blueprint(inventory_bp)
+    app.register_blueprint(production_bp)
+    app.register_blueprint(api_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(admin_bp)
+    
+    @app.teardown_appcontext
+    def remove_session(exc):
+        # 归还 scoped_session 在当前线程上的会话，避免线程复用时会话与其对象一直存活
+        session_factory.remove()
+    
+    @app.route('/')
+    def index():
+        return redirect(url_for('dashboard.page_dashboard'))
+    
+    return app
+
+
+if __name__ == '__main__':
+    create_app().run(debug=DEBUG)
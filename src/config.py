@@ -4,8 +4,8 @@ EV-MES 系统配置文件
 """
 import os
 
-# 数据库配置
-DATABASE_URI = 'sqlite:///data/ev_mes.db'
+# 数据库配置（可通过环境变量 EV_MES_DATABASE_URI 指向其他数据库文件，如压测库）
+DATABASE_URI = os.environ.get('EV_MES_DATABASE_URI', 'sqlite:///data/ev_mes.db')
 
 # 应用配置
 SECRET_KEY = 'ev-mes-secret-key-2024'
@@ -34,6 +34,92 @@ PRODUCTION_STATUS = {
     'CANCELLED': '已取消'
 }
 
+# 生产线列表
+PRODUCTION_LINES = ['Line-A', 'Line-B', 'Line-C', 'Line-D', 'Line-E']
+
+# 交期仿真配置：各生产线实际工期/计划工期 服从均值为1的对数正态分布
+DEFAULT_DURATION_SIGMA = 0.15
+LINE_DURATION_SIGMA = {
+    'Line-A': 0.10,
+    'Line-B': 0.12,
+    'Line-C': 0.20,
+    'Line-D': 0.15,
+    'Line-E': 0.15
+}
+FORECAST_DEFAULT_REPLICATIONS = 2000
+FORECAST_MAX_REPLICATIONS = 20000
+# 交期仿真的工作进程数上限（同时不超过CPU核数），也是默认进程数
+FORECAST_MAX_WORKERS = 4
+
+# 交期风险：余量（天）低于该值的订单视为有风险
+RISK_SLACK_THRESHOLD_DAYS = 2
+
+# 自动补全：进程内前缀索引的重建间隔（秒）和默认返回条数
+AUTOCOMPLETE_REBUILD_SECONDS = 300
+AUTOCOMPLETE_DEFAULT_LIMIT = 10
+
+# 甘特时间轴：每条生产线最多返回的时间桶数
+TIMELINE_MAX_BUCKETS = 200
+TIMELINE_RESOLUTIONS = {
+    'hour': 3600,
+    'day': 86400,
+    'week': 604800
+}
+
+# 请求计时：总耗时超过阈值（毫秒）的请求写入慢请求日志（JSON行）
+SLOW_REQUEST_THRESHOLD_MS = 500
+SLOW_REQUEST_LOG_FILE = os.path.join(DATA_DIR, 'slow_requests.log')
+
+# 同一请求内同一语句指纹执行次数超过该值时记录 N+1 警告
+QUERY_REPEAT_WARN_THRESHOLD = 10
+
+# 图表缓存：相同参数的图表直接复用已渲染的图片（LRU条目数）
+CHART_CACHE_SIZE = 64
+
+# 管理端点令牌（请求头 X-Admin-Token）；未配置时管理端点一律拒绝访问
+ADMIN_TOKEN = os.environ.get('EV_MES_ADMIN_TOKEN')
+
+# 性能剖析：输出目录和调用栈采样间隔（毫秒）
+PROFILES_DIR = os.path.join(DATA_DIR, 'profiles')
+PROFILE_SAMPLE_INTERVAL_MS = 5
+PROFILE_MAX_WINDOW_SECONDS = 3600
+
+# 内存诊断：tracemalloc 默认记录的栈帧数和最多保留的快照数
+MEMORY_TRACE_FRAMES = 1
+MEMORY_MAX_SNAPSHOTS = 10
+
+# 数据库迁移：数据回填每批处理的行数（每批单独提交）
+MIGRATION_BATCH_SIZE = 5000
+
+# 归档：保留期（天）、每批移动的行数和批间暂停（秒，让其他写入穿插执行）
+ARCHIVE_RETENTION_DAYS = 90
+ARCHIVE_BATCH_SIZE = 1000
+ARCHIVE_BATCH_PAUSE_SECONDS = 0.05
+# 可归档的状态
+ARCHIVE_ORDER_STATUSES = ['COMPLETED']
+ARCHIVE_PLAN_STATUSES = ['COMPLETED', 'CANCELLED']
+
+# 按ID/编码读取的行快照缓存：最大条目数、估算内存上限（字节）和存活时间（秒，多进程部署时的失效兜底）
+IDENTITY_CACHE_MAX_ENTRIES = 20000
+IDENTITY_CACHE_MAX_BYTES = 32 * 1024 * 1024
+IDENTITY_CACHE_TTL_SECONDS = 60
+
 
 # 分页配置
 DEFAULT_PAGE_SIZE = 10
+# 列表API单页最大行数、按ID批量读取时最多的ID数（一次 IN 查询）
+API_MAX_PAGE_SIZE = 10000
+API_MAX_BATCH_IDS = 1000
+# 增量同步：每次默认/最多返回的行数；只返回更新时间早于当前时间若干秒的行（等待进行中的事务提交，
+# 避免更新时间较早但提交较晚的行被跳过）；删除记录保留天数（超过时终端需重新全量同步）
+CHANGES_DEFAULT_LIMIT = 500
+CHANGES_MAX_LIMIT = 5000
+CHANGES_SETTLE_SECONDS = 5
+CHANGES_TOMBSTONE_RETENTION_DAYS = 30
+
+# 事件推送（SSE）：保留的最近事件数（断线重连补发）、最多的订阅连接数、心跳间隔（秒，
+# 同时用于及时发现已断开的连接）和浏览器断线后的重连等待（毫秒）
+EVENT_BUS_HISTORY = 1000
+EVENTS_MAX_SUBSCRIBERS = 1000
+EVENTS_HEARTBEAT_SECONDS = 15
+EVENTS_RETRY_MS = 3000
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+归档模型
+
+已完成的订单和已完成/已取消的生产计划超过保留期后由 ArchiveService 分批移入归档表，
+主表只保留仍在流转的数据。归档表的主键沿用原ID，列与主表一致，另加归档时间。
+"""
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.orm import relationship
+from .database import Base
+
+
+class ArchivedOrder(Base):
+    """
+    归档订单
+    """
+    __tablename__ = 'orders_archive'
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    customer = Column(String(100), nullable=False, comment='客户名称')
+    vehicle_model = Column(String(50), nullable=False, comment='车型')
+    quantity = Column(Integer, nullable=False, comment='数量')
+    due_date = Column(DateTime, nullable=False, comment='交期')
+    status = Column(String(20), nullable=False, comment='状态')
+    vin_prefix = Column(String(10), nullable=True, comment='VIN前缀')
+    created_at = Column(DateTime, index=True, comment='创建时间')
+    updated_at = Column(DateTime, comment='更新时间')
+    archived_at = Column(DateTime, nullable=False, comment='归档时间')
+
+    def __repr__(self):
+        return f"<ArchivedOrder(id={self.id}, customer='{self.customer}')>"
+
+    def to_dict(self):
+        """
+        转换为字典格式（与 Order.to_dict 一致，另加归档标记）
+        """
+        return {
+            'id': self.id,
+            'customer': self.customer,
+            'vehicle_model': self.vehicle_model,
+            'quantity': self.quantity,
+            'due_date': self.due_date.strftime('%Y-%m-%d') if self.due_date else None,
+            'status': self.status,
+            'vin_prefix': self.vin_prefix,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
+            'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S') if self.updated_at else None,
+            'archived': True,
+            'archived_at': self.archived_at.strftime('%Y-%m-%d %H:%M:%S') if self.archived_at else None
+        }
+
+
+class ArchivedProductionPlan(Base):
+    """
+    归档生产计划（所属订单可能仍在主表，也可能已归档，因此不设外键）
+    """
+    __tablename__ = 'production_plans_archive'
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    plan_code = Column(String(50), nullable=False, index=True, comment='计划编号')
+    order_id = Column(Integer, nullable=False, index=True, comment='关联订单ID')
+    line = Column(String(20), nullable=False, comment='生产线')
+    start_time = Column(DateTime, nullable=False, comment='开始时间')
+    end_time = Column(DateTime, nullable=False, comment='结束时间')
+    status = Column(String(20), nullable=False, comment='状态')
+    created_at = Column(DateTime, index=True, comment='创建时间')
+    updated_at = Column(DateTime, comment='更新时间')
+    archived_at = Column(DateTime, nullable=False, comment='归档时间')
+
+    # 所属订单（主表或归档表中的一个）
+    order = relationship('Order', primaryjoin='foreign(ArchivedProductionPlan.order_id) == Order.id',
+                         viewonly=True)
+    archived_order = relationship('ArchivedOrder',
+                                  primaryjoin='foreign(ArchivedProductionPlan.order_id) == ArchivedOrder.id',
+                                  viewonly=True)
+
+    def __repr__(self):
+        return f"<ArchivedProductionPlan(id={self.id}, plan_code='{self.plan_code}')>"
+
+    def to_dict(self):
+        """
+        转换为字典格式（与 ProductionPlan.to_dict 一致，另加归档标记）
+        """
+        order = self.order or self.archived_order
+        return {
+            'id': self.id,
+            'plan_code': self.plan_code,
+            'order_id': self.order_id,
+            'line': self.line,
+            'start_time': self.start_time.strftime('%Y-%m-%d %H:%M:%S') if self.start_time else None,
+            'end_time': self.end_time.strftime('%Y-%m-%d %H:%M:%S') if self.end_time else None,
+            'status': self.status,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
+            'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S') if self.updated_at else None,
+            'order_info': order.to_dict() if order else None,
+            'archived': True,
+            'archived_at': self.archived_at.strftime('%Y-%m-%d %H:%M:%S') if self.archived_at else None
+        }
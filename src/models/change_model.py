@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+删除记录（墓碑）模型
+
+增量同步接口只能通过 updated_at 发现新增和修改的行，被删除或归档的行从主表消失后无法再查到，
+因此删除时在同一事务内写入一条删除记录，终端据此移除本地缓存的行。
+"""
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from datetime import datetime
+from .database import Base
+
+
+class DeletedRow(Base):
+    """
+    删除记录（ID自增，按ID递增读取）
+    """
+    __tablename__ = 'deleted_rows'
+    __table_args__ = (
+        Index('ix_deleted_rows_kind_id', 'kind', 'id'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String(20), nullable=False, comment='数据类别（orders / items / plans）')
+    row_id = Column(Integer, nullable=False, comment='被删除行的ID')
+    reason = Column(String(20), nullable=False, default='deleted', comment='原因（deleted / archived）')
+    deleted_at = Column(DateTime, nullable=False, default=datetime.now, index=True, comment='删除时间')
+
+    def __repr__(self):
+        return f"<DeletedRow(kind='{self.kind}', row_id={self.row_id}, reason='{self.reason}')>"
@@ -8,6 +8,8 @@ from sqlalchemy.orm import sessionmaker, scoped_session
 from sqlalchemy.pool import StaticPool
 import os
 from src.config import DATABASE_URI, BASE_DIR
+from src.utils.query_stats import QueryStats
+from src.utils.metrics import Metrics
 
 # 确保数据库目录存在
 db_path = os.path.join(BASE_DIR, 'data')
@@ -21,6 +23,12 @@ engine = create_engine(
     echo=False
 )
 
+# SQL计数与 N+1 检测（请求内统计，见 QueryStats.init_app）
+QueryStats.install(engine)
+
+# 连接池与SQL指标（/metrics）
+Metrics.install_engine(engine)
+
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 session_factory = scoped_session(SessionLocal)
@@ -40,13 +48,15 @@ def get_db():
 
 def init_database():
     """
-    初始化数据库表结构
+    初始化数据库表结构（按版本执行迁移，已是最新版本时直接返回）
     """
     # 导入所有模型以确保表被创建
     from .order_model import Order
     from .inventory_model import InventoryItem
     from .production_model import ProductionPlan
+    from .archive_model import ArchivedOrder, ArchivedProductionPlan
+    from .change_model import DeletedRow
+    from .migrations import run_migrations
     
-    # 创建所有表（如果不存在）
-    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
 
@@ -2,13 +2,15 @@
 """
 库存管理模型
 """
-from sqlalchemy import Column, Integer, String, Float, Text
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime
 from datetime import datetime
 import random
 import qrcode
 import os
+import time
 from .database import Base
 from src.config import QRCODE_DIR
+from src.utils.metrics import QRCODE_GENERATIONS, QRCODE_SECONDS
 
 class InventoryItem(Base):
     """
@@ -22,7 +24,9 @@ class InventoryItem(Base):
     spec = Column(String(200), nullable=True, comment='规格型号')
     quantity = Column(Integer, nullable=False, default=0, comment='库存数量')
     location = Column(String(50), nullable=True, comment='存放位置')
-    created_at = Column(String(20), default=lambda: datetime.now().strftime('%Y-%m-%d %H:%M:%S'), comment='创建时间')
+    created_at = Column(DateTime, default=datetime.now, index=True, comment='创建时间')
+    # 增量同步按 (updated_at, id) 顺序读取
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, index=True, comment='更新时间')
     
     def __repr__(self):
         return f"<InventoryItem(id={self.id}, part_code='{self.part_code}', name='{self.name}')>"
@@ -38,7 +42,8 @@ class InventoryItem(Base):
             'spec': self.spec,
             'quantity': self.quantity,
             'location': self.location,
-            'created_at': self.created_at,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
+            'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S') if self.updated_at else None,
             'qrcode_path': self.get_qrcode_path()
         }
     
@@ -52,9 +57,17 @@ class InventoryItem(Base):
         """
         生成二维码图片
         """
+        return InventoryItem.render_qrcode(self.part_code, self.name, self.spec, self.quantity)
+    
+    @staticmethod
+    def render_qrcode(part_code, name, spec, quantity):
+        """
+        根据物料字段生成二维码图片（不依赖ORM对象，可在子进程中批量调用）
+        """
+        started = time.perf_counter()
         try:
             # 创建二维码内容（包含物料信息）
-            qr_content = f"物料编码: {self.part_code}\n物料名称: {self.name}\n规格: {self.spec}\n库存: {self.quantity}"
+            qr_content = f"物料编码: {part_code}\n物料名称: {name}\n规格: {spec}\n库存: {quantity}"
             
             # 生成二维码
             qr = qrcode.QRCode(
@@ -70,13 +83,17 @@ class InventoryItem(Base):
             img = qr.make_image(fill_color="black", back_color="white")
             
             # 保存二维码图片
-            qr_path = os.path.join(QRCODE_DIR, f"{self.part_code}.png")
+            qr_path = os.path.join(QRCODE_DIR, f"{part_code}.png")
             img.save(qr_path)
             
+            QRCODE_GENERATIONS.labels('success').inc()
             return True
         except Exception as e:
             print(f"生成二维码失败: {e}")
+            QRCODE_GENERATIONS.labels('error').inc()
             return False
+        finally:
+            QRCODE_SECONDS.observe(time.perf_counter() - started)
     
     @staticmethod
     def create_sample_data(db, count=500):
@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+"""
+数据库结构版本迁移
+
+schema_version 表记录已执行的迁移版本。启动时若已是最新版本只执行一次查询即返回；
+全新数据库直接按当前模型建表并标记为最新版本；已有数据库（包括没有版本表的旧库）按版本号
+依次执行未执行的迁移。
+
+迁移需可重复执行（中途中断后重跑不会出错），并尽量避免长时间持有写锁:
+    - 每个索引单独一个事务创建（PostgreSQL 使用 CREATE INDEX CONCURRENTLY）
+    - 数据回填按主键分批，每批单独提交，期间其他写入可以穿插执行
+"""
+from typing import Callable, List
+from contextlib import nullcontext
+from datetime import datetime
+import logging
+import time
+from sqlalchemy import inspect, text, table, column, bindparam, select, update, Integer, String, DateTime
+from src.config import MIGRATION_BATCH_SIZE
+from .database import Base
+
+migration_logger = logging.getLogger('ev_mes.migrations')
+
+
+class Migration:
+    """
+    单个迁移：版本号、说明和升级函数（接收引擎，自行管理事务）
+    """
+
+    def __init__(self, version: int, description: str, upgrade: Callable):
+        self.version = version
+        self.description = description
+        self.upgrade = upgrade
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, description: str):
+    """
+    注册迁移的装饰器（版本号必须递增）
+    """
+    def decorator(func):
+        if MIGRATIONS and version <= MIGRATIONS[-1].version:
+            raise ValueError(f"迁移版本号必须递增: {version}")
+        MIGRATIONS.append(Migration(version, description, func))
+        return func
+    return decorator
+
+
+schema_version = table(
+    'schema_version',
+    column('version', Integer),
+    column('description', String),
+    column('applied_at', DateTime),
+    column('duration_ms', Integer)
+)
+
+
+# ---------------------------------------------------------------------------
+# 迁移辅助函数
+# ---------------------------------------------------------------------------
+
+def column_type(engine, table_name: str, column_name: str) -> str:
+    """
+    列的声明类型（大写），列不存在时返回 None
+    """
+    for info in inspect(engine).get_columns(table_name):
+        if info['name'] == column_name:
+            return str(info['type']).upper()
+    return None
+
+
+def create_index(engine, name: str, table_name: str, columns: List[str]):
+    """
+    创建索引（已存在时跳过），每个索引单独一个事务
+    """
+    if engine.dialect.name == 'postgresql':
+        # CONCURRENTLY 不阻塞写入，但不能在事务内执行
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.exec_driver_sql(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table_name} ({", ".join(columns)})')
+        return
+
+    if any(index['name'] == name for index in inspect(engine).get_indexes(table_name)):
+        return
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f'CREATE INDEX {name} ON {table_name} ({", ".join(columns)})')
+    migration_logger.info('创建索引 %s (%.1fs)', name, time.perf_counter() - started)
+
+
+def backfill(engine, table_name: str, source: str, target: str, target_type, convert: Callable,
+             batch_size: int = MIGRATION_BATCH_SIZE, connection=None) -> int:
+    """
+    按主键分批把 source 列转换后写入 target 列（只处理 target 为空的行），每批单独提交
+
+    Args:
+        convert: 源值 -> 目标值，返回 None 表示无法转换
+        connection: 指定时在该连接的当前事务内执行、不单独提交（用于收尾阶段）
+
+    Returns:
+        int: 更新的行数
+    """
+    source_table = table(table_name, column('id', Integer), column(source), column(target, target_type))
+    pending = select(source_table.c.id, source_table.c[source]).where(
+        source_table.c[target].is_(None), source_table.c[source].isnot(None))
+    statement = update(source_table).where(source_table.c.id == bindparam('row_id')).values(
+        {target: bindparam('value')})
+
+    updated = 0
+    skipped = 0
+    last_id = 0
+    while True:
+        with (nullcontext(connection) if connection is not None else engine.begin()) as conn:
+            rows = conn.execute(pending.where(source_table.c.id > last_id)
+                                .order_by(source_table.c.id).limit(batch_size)).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            values = [{'row_id': row_id, 'value': convert(value)} for row_id, value in rows]
+            converted = [value for value in values if value['value'] is not None]
+            skipped += len(values) - len(converted)
+            if converted:
+                conn.execute(statement, converted)
+            updated += len(converted)
+        migration_logger.info('回填 %s.%s: %d 行', table_name, target, updated)
+    if skipped:
+        migration_logger.warning('回填 %s.%s: %d 行无法转换，保留为空', table_name, target, skipped)
+    return updated
+
+
+def parse_legacy_datetime(value) -> datetime:
+    """
+    解析旧版本以字符串保存的时间
+    """
+    if isinstance(value, datetime):
+        return value
+    value = str(value).strip()
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S',
+                '%Y-%m-%d %H:%M', '%Y/%m/%d %H:%M:%S', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+# ---------------------------------------------------------------------------
+# 迁移
+# ---------------------------------------------------------------------------
+
+@migration(1, '基线：补建缺失的表和原有索引')
+def _baseline(engine):
+    Base.metadata.create_all(bind=engine)
+    create_index(engine, 'ix_production_plans_order_id', 'production_plans', ['order_id'])
+    create_index(engine, 'ix_production_plans_line_time', 'production_plans', ['line', 'start_time', 'end_time'])
+
+
+@migration(2, 'inventory_items.created_at 由字符串改为 DateTime')
+def _inventory_created_at_datetime(engine):
+    if 'DATETIME' in (column_type(engine, 'inventory_items', 'created_at') or ''):
+        return
+
+    # 新增列 -> 分批回填 -> 在一个短事务内补齐回填期间新写入的行并交换列名
+    if column_type(engine, 'inventory_items', 'created_at_new') is None:
+        with engine.begin() as conn:
+            conn.exec_driver_sql('ALTER TABLE inventory_items ADD COLUMN created_at_new DATETIME')
+    backfill(engine, 'inventory_items', 'created_at', 'created_at_new', DateTime, parse_legacy_datetime)
+
+    with engine.begin() as conn:
+        backfill(engine, 'inventory_items', 'created_at', 'created_at_new', DateTime, parse_legacy_datetime,
+                 connection=conn)
+        unconverted = conn.exec_driver_sql(
+            'SELECT count(*) FROM inventory_items WHERE created_at_new IS NULL AND created_at IS NOT NULL').scalar()
+        conn.exec_driver_sql('ALTER TABLE inventory_items RENAME COLUMN created_at TO created_at_legacy')
+        conn.exec_driver_sql('ALTER TABLE inventory_items RENAME COLUMN created_at_new TO created_at')
+        if unconverted:
+            # 无法解析的原值只保存在旧列中，保留旧列供人工核对（模型不使用该列，可在修正后自行删除）
+            migration_logger.warning('inventory_items.created_at 有 %d 行无法转换，原值保留在 created_at_legacy 列',
+                                     unconverted)
+        else:
+            conn.exec_driver_sql('ALTER TABLE inventory_items DROP COLUMN created_at_legacy')
+
+
+@migration(3, '常用过滤/排序列索引（状态、创建时间、时间窗口）')
+def _filter_indexes(engine):
+    create_index(engine, 'ix_orders_status', 'orders', ['status'])
+    create_index(engine, 'ix_orders_created_at', 'orders', ['created_at'])
+    create_index(engine, 'ix_production_plans_status', 'production_plans', ['status'])
+    create_index(engine, 'ix_production_plans_created_at', 'production_plans', ['created_at'])
+    create_index(engine, 'ix_production_plans_start_end', 'production_plans', ['start_time', 'end_time'])
+    create_index(engine, 'ix_inventory_items_created_at', 'inventory_items', ['created_at'])
+    if engine.dialect.name == 'sqlite':
+        # 让查询规划器获得新索引的统计信息（只分析需要的表，开销远小于 ANALYZE）
+        with engine.begin() as conn:
+            conn.exec_driver_sql('PRAGMA optimize')
+
+
+@migration(4, '订单/生产计划归档表')
+def _archive_tables(engine):
+    from .archive_model import ArchivedOrder, ArchivedProductionPlan
+    ArchivedOrder.__table__.create(bind=engine, checkfirst=True)
+    ArchivedProductionPlan.__table__.create(bind=engine, checkfirst=True)
+
+
+@migration(5, '增量同步：updated_at 列和索引、删除记录表')
+def _change_tracking(engine):
+    from .change_model import DeletedRow
+    if column_type(engine, 'inventory_items', 'updated_at') is None:
+        with engine.begin() as conn:
+            conn.exec_driver_sql('ALTER TABLE inventory_items ADD COLUMN updated_at DATETIME')
+    # 没有更新时间的旧行按创建时间回填，否则增量同步的首次全量读取会漏掉这些行
+    for table_name in ('inventory_items', 'orders', 'production_plans'):
+        backfill(engine, table_name, 'created_at', 'updated_at', DateTime, parse_legacy_datetime)
+    create_index(engine, 'ix_orders_updated_at', 'orders', ['updated_at'])
+    create_index(engine, 'ix_production_plans_updated_at', 'production_plans', ['updated_at'])
+    create_index(engine, 'ix_inventory_items_updated_at', 'inventory_items', ['updated_at'])
+    DeletedRow.__table__.create(bind=engine, checkfirst=True)
+
+
+@migration(6, '订单/生产计划主键改为 AUTOINCREMENT（已归档的ID不再被新行复用）')
+def _autoincrement_ids(engine):
+    # SQLite 默认按 max(rowid)+1 分配ID，最大ID的行被归档后新行会复用它；AUTOINCREMENT 按
+    # sqlite_sequence 分配，只增不减。PostgreSQL 的序列本来就不回退，无需处理
+    if engine.dialect.name != 'sqlite':
+        return
+    from sqlalchemy.schema import CreateTable, CreateIndex
+    from .order_model import Order
+    from .production_model import ProductionPlan
+
+    for model, archive_table in ((Order, 'orders_archive'), (ProductionPlan, 'production_plans_archive')):
+        model_table = model.__table__
+        name = model_table.name
+        with engine.connect() as conn:
+            ddl = conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                       (name,)).scalar()
+        if 'AUTOINCREMENT' not in ddl.upper():
+            # SQLite 不能修改主键定义，按官方步骤重建表：新表 -> 复制数据 -> 删除旧表 -> 改名 -> 重建索引，
+            # 在一个事务内完成（中断时整体回滚，可重新执行）
+            started = time.perf_counter()
+            rebuild = f'{name}_rebuild'
+            create = str(CreateTable(model_table).compile(engine)).replace(
+                f'CREATE TABLE {name} ', f'CREATE TABLE {rebuild} ', 1)
+            columns = ', '.join(model_table.columns.keys())
+            with engine.begin() as conn:
+                conn.exec_driver_sql(f'DROP TABLE IF EXISTS {rebuild}')
+                conn.exec_driver_sql(create)
+                conn.exec_driver_sql(f'INSERT INTO {rebuild} ({columns}) SELECT {columns} FROM {name}')
+                conn.exec_driver_sql(f'DROP TABLE {name}')
+                conn.exec_driver_sql(f'ALTER TABLE {rebuild} RENAME TO {name}')
+                for index in model_table.indexes:
+                    conn.execute(CreateIndex(index))
+            migration_logger.info('重建表 %s (%.1fs)', name, time.perf_counter() - started)
+
+        # 序列从主表和归档表的最大ID之后开始
+        with engine.begin() as conn:
+            seq = conn.exec_driver_sql(
+                f'SELECT max(coalesce((SELECT max(id) FROM {name}), 0), '
+                f'coalesce((SELECT max(id) FROM {archive_table}), 0))').scalar()
+            conn.exec_driver_sql('DELETE FROM sqlite_sequence WHERE name = ?', (name,))
+            conn.exec_driver_sql('INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)', (name, seq))
+
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+# ---------------------------------------------------------------------------
+# 执行
+# ---------------------------------------------------------------------------
+
+def current_version(engine) -> int:
+    """
+    当前数据库结构版本（没有版本表时返回 None）
+    """
+    if not inspect(engine).has_table('schema_version'):
+        return None
+    with engine.connect() as conn:
+        return conn.execute(text('SELECT max(version) FROM schema_version')).scalar() or 0
+
+
+def _record(engine, item: Migration, duration_ms: int):
+    with engine.begin() as conn:
+        # 多个进程同时启动时可能重复执行同一迁移（迁移本身可重复执行），只保留一条记录
+        exists = conn.execute(select(schema_version.c.version)
+                              .where(schema_version.c.version == item.version)).first()
+        if not exists:
+            conn.execute(schema_version.insert().values(
+                version=item.version, description=item.description,
+                applied_at=datetime.now(), duration_ms=duration_ms))
+
+
+def run_migrations(engine) -> List[int]:
+    """
+    执行所有未执行的迁移
+
+    Returns:
+        List[int]: 本次执行的迁移版本号（已是最新时为空）
+    """
+    version = current_version(engine)
+    if version is not None and version >= LATEST_VERSION:
+        return []
+
+    if version is None:
+        with engine.begin() as conn:
+            conn.exec_driver_sql(
+                'CREATE TABLE IF NOT EXISTS schema_version ('
+                'version INTEGER PRIMARY KEY, description VARCHAR(200), '
+                'applied_at DATETIME, duration_ms INTEGER)')
+        # 确保所有模型都已注册到 metadata
+        from . import order_model, inventory_model, production_model, archive_model, change_model
+        model_tables = set(Base.metadata.tables)
+        if not model_tables & set(inspect(engine).get_table_names()):
+            # 全新数据库：按当前模型建表，所有迁移视为已执行
+            Base.metadata.create_all(bind=engine)
+            for item in MIGRATIONS:
+                _record(engine, item, 0)
+            migration_logger.info('新建数据库结构，版本 %d', LATEST_VERSION)
+            return []
+        version = 0
+
+    applied = []
+    for item in MIGRATIONS:
+        if item.version <= version:
+            continue
+        migration_logger.info('执行迁移 %d: %s', item.version, item.description)
+        started = time.perf_counter()
+        item.upgrade(engine)
+        _record(engine, item, int((time.perf_counter() - started) * 1000))
+        applied.append(item.version)
+    return applied
@@ -13,16 +13,19 @@ class Order(Base):
     订单模型
     """
     __tablename__ = 'orders'
+    # ID只增不减：已归档订单的ID不会被新订单复用（迁移 6）
+    __table_args__ = {'sqlite_autoincrement': True}
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     customer = Column(String(100), nullable=False, comment='客户名称')
     vehicle_model = Column(String(50), nullable=False, comment='车型')
     quantity = Column(Integer, nullable=False, comment='数量')
     due_date = Column(DateTime, nullable=False, comment='交期')
-    status = Column(String(20), nullable=False, default='NEW', comment='状态')
+    status = Column(String(20), nullable=False, default='NEW', index=True, comment='状态')
     vin_prefix = Column(String(10), nullable=True, comment='VIN前缀')
-    created_at = Column(DateTime, default=datetime.now, comment='创建时间')
-    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, comment='更新时间')
+    created_at = Column(DateTime, default=datetime.now, index=True, comment='创建时间')
+    # 增量同步按 (updated_at, id) 顺序读取
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, index=True, comment='更新时间')
     
     # 关联关系
     production_plans = relationship("ProductionPlan", back_populates="order")
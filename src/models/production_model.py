@@ -2,7 +2,7 @@
 """
 生产计划模型
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timedelta
 import random
@@ -13,16 +13,25 @@ class ProductionPlan(Base):
     生产计划模型
     """
     __tablename__ = 'production_plans'
+    __table_args__ = (
+        # 时间窗口查询（甘特时间轴、冲突检查）
+        Index('ix_production_plans_line_time', 'line', 'start_time', 'end_time'),
+        # 跨生产线的时间窗口查询（利用率统计）
+        Index('ix_production_plans_start_end', 'start_time', 'end_time'),
+        # ID只增不减：已归档计划的ID不会被新计划复用（迁移 6）
+        {'sqlite_autoincrement': True},
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     plan_code = Column(String(50), unique=True, nullable=False, comment='计划编号')
-    order_id = Column(Integer, ForeignKey('orders.id'), nullable=False, comment='关联订单ID')
+    order_id = Column(Integer, ForeignKey('orders.id'), nullable=False, index=True, comment='关联订单ID')
     line = Column(String(20), nullable=False, comment='生产线')
     start_time = Column(DateTime, nullable=False, comment='开始时间')
     end_time = Column(DateTime, nullable=False, comment='结束时间')
-    status = Column(String(20), nullable=False, default='PLANNED', comment='状态')
-    created_at = Column(DateTime, default=datetime.now, comment='创建时间')
-    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, comment='更新时间')
+    status = Column(String(20), nullable=False, default='PLANNED', index=True, comment='状态')
+    created_at = Column(DateTime, default=datetime.now, index=True, comment='创建时间')
+    # 增量同步按 (updated_at, id) 顺序读取
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, index=True, comment='更新时间')
     
     # 关联关系
     order = relationship("Order", back_populates="production_plans")
@@ -30,11 +39,14 @@ class ProductionPlan(Base):
     def __repr__(self):
         return f"<ProductionPlan(id={self.id}, plan_code='{self.plan_code}', line='{self.line}')>"
     
-    def to_dict(self):
+    def to_dict(self, include_order: bool = True):
         """
         转换为字典格式
+
+        Args:
+            include_order: 是否包含 order_info（为 False 时不访问 order 关联，不会触发加载）
         """
-        return {
+        values = {
             'id': self.id,
             'plan_code': self.plan_code,
             'order_id': self.order_id,
@@ -43,9 +55,11 @@ class ProductionPlan(Base):
             'end_time': self.end_time.strftime('%Y-%m-%d %H:%M:%S') if self.end_time else None,
             'status': self.status,
             'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
-            'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S') if self.updated_at else None,
-            'order_info': self.order.to_dict() if self.order else None
+            'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S') if self.updated_at else None
         }
+        if include_order:
+            values['order_info'] = self.order.to_dict() if self.order else None
+        return values
     
     @staticmethod
     def create_sample_data(db, count=100):
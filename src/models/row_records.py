@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+列表行记录（只读投影）
+
+列表页、图表页只需要展示数据：按列查询得到的行直接包装为元组子类记录，不构造ORM对象、
+不进入会话的 identity map，也不预先复制成字典。记录没有实例 __dict__，内存只有一个元组；
+时间列在访问时才格式化为与 to_dict 相同的字符串。
+
+记录同时支持属性访问（模板）和 record['key'] / record.get('key')（原有按字典处理的代码），
+需要JSON时调用 to_dict()。
+"""
+from typing import Dict, Optional, Sequence, Tuple
+from functools import lru_cache
+from .order_model import Order
+from .inventory_model import InventoryItem
+from .production_model import ProductionPlan
+
+DATE_FORMAT = '%Y-%m-%d'
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class RowRecord(tuple):
+    """
+    行记录基类（由 record_type 生成具体类型）
+    """
+    __slots__ = ()
+    _fields: Tuple[str, ...] = ()
+    # 由类属性提供、同样输出到 to_dict 的派生字段
+    _extra: Tuple[str, ...] = ()
+    _index: Dict[str, int] = {}
+    _formats: Dict[str, str] = {}
+
+    @classmethod
+    def from_row(cls, row):
+        return tuple.__new__(cls, row)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key not in self._index and not hasattr(type(self), key):
+                raise KeyError(key)
+            return getattr(self, key)
+        return tuple.__getitem__(self, key)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self) -> Tuple[str, ...]:
+        return self._fields + self._extra
+
+    def to_dict(self) -> Dict:
+        """
+        转换为字典格式（与对应模型的 to_dict 一致）
+        """
+        result = {}
+        for name in self.keys():
+            value = getattr(self, name)
+            result[name] = value.to_dict() if isinstance(value, RowRecord) else value
+        return result
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{name}={getattr(self, name)!r}' for name in self._fields)})"
+
+
+def _raw(index: int):
+    return property(lambda self: tuple.__getitem__(self, index))
+
+
+def _formatted(index: int, fmt: str):
+    def getter(self):
+        value = tuple.__getitem__(self, index)
+        return value.strftime(fmt) if value else None
+    return property(getter)
+
+
+def record_type(name: str, fields: Sequence[str], formats: Dict[str, str] = None, **extra) -> type:
+    """
+    生成行记录类型
+
+    Args:
+        fields: 列名（与查询列顺序一致）
+        formats: 需要按格式输出的时间列 {列名: strftime 格式}
+        extra: 派生字段（如由其他列计算的属性、固定标记），同样输出到 to_dict
+    """
+    formats = formats or {}
+    namespace = {'__slots__': (), '_fields': tuple(fields), '_extra': tuple(extra),
+                 '_index': {f: i for i, f in enumerate(fields)}, '_formats': dict(formats)}
+    for index, field in enumerate(fields):
+        namespace[field] = _formatted(index, formats[field]) if field in formats else _raw(index)
+    namespace.update(extra)
+    return type(name, (RowRecord,), namespace)
+
+
+@lru_cache(maxsize=256)
+def projected_type(base: type, fields: Tuple[str, ...]) -> type:
+    """
+    只含部分字段的记录类型（字段顺序按请求，时间格式沿用 base，不含派生字段）
+    """
+    unknown = [name for name in fields if name not in base._index]
+    if unknown:
+        raise ValueError(f"无效的字段: {', '.join(unknown)}")
+    return record_type(f'{base.__name__}Fields', fields,
+                       {name: base._formats[name] for name in fields if name in base._formats})
+
+
+def project(record: RowRecord, fields: Tuple[str, ...], base: type = None) -> RowRecord:
+    """
+    从完整记录中取出部分字段（归档记录按 base 指定的主表记录类型投影，便于混合输出）
+    """
+    target = projected_type(base or type(record), fields)
+    index = type(record)._index
+    return target.from_row(tuple(tuple.__getitem__(record, index[name]) for name in fields))
+
+
+def parse_fields(value: Optional[str], allowed: Sequence[str]) -> Optional[Tuple[str, ...]]:
+    """
+    解析 ?fields= 参数（逗号分隔，保持顺序并去重），为空时返回 None 表示全部字段
+
+    Raises:
+        ValueError: 包含未知字段
+    """
+    if not value:
+        return None
+    fields = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in allowed]
+    if unknown:
+        raise ValueError(f"无效的字段: {', '.join(unknown)}（可选: {', '.join(allowed)}）")
+    return fields or None
+
+
+# ---------------------------------------------------------------------------
+# 订单
+# ---------------------------------------------------------------------------
+
+ORDER_FIELDS = ('id', 'customer', 'vehicle_model', 'quantity', 'due_date', 'status', 'vin_prefix',
+                'created_at', 'updated_at')
+ORDER_FORMATS = {'due_date': DATE_FORMAT, 'created_at': DATETIME_FORMAT, 'updated_at': DATETIME_FORMAT}
+
+OrderRow = record_type('OrderRow', ORDER_FIELDS, ORDER_FORMATS)
+ArchivedOrderRow = record_type('ArchivedOrderRow', ORDER_FIELDS + ('archived_at',),
+                               dict(ORDER_FORMATS, archived_at=DATETIME_FORMAT), archived=True)
+
+
+def order_columns(model=Order) -> list:
+    return [getattr(model, name) for name in ORDER_FIELDS]
+
+
+# ---------------------------------------------------------------------------
+# 库存物料
+# ---------------------------------------------------------------------------
+
+INVENTORY_FIELDS = ('id', 'part_code', 'name', 'spec', 'quantity', 'location', 'created_at', 'updated_at')
+
+InventoryRow = record_type(
+    'InventoryRow', INVENTORY_FIELDS, {'created_at': DATETIME_FORMAT, 'updated_at': DATETIME_FORMAT},
+    # 与 InventoryItem.get_qrcode_path 一致，访问时才拼接
+    qrcode_path=property(lambda self: f"qrcodes/{self.part_code}.png")
+)
+
+
+def inventory_columns() -> list:
+    return [getattr(InventoryItem, name) for name in INVENTORY_FIELDS]
+
+
+# ---------------------------------------------------------------------------
+# 生产计划（order_info 为嵌套的订单记录）
+# ---------------------------------------------------------------------------
+
+PLAN_FIELDS = ('id', 'plan_code', 'order_id', 'line', 'start_time', 'end_time', 'status',
+               'created_at', 'updated_at')
+PLAN_FORMATS = {'start_time': DATETIME_FORMAT, 'end_time': DATETIME_FORMAT,
+                'created_at': DATETIME_FORMAT, 'updated_at': DATETIME_FORMAT}
+
+PlanRow = record_type('PlanRow', PLAN_FIELDS + ('order_info',), PLAN_FORMATS)
+# 接口可选字段（order_info 为嵌套的订单信息）
+PLAN_API_FIELDS = PLAN_FIELDS + ('order_info',)
+ArchivedPlanRow = record_type('ArchivedPlanRow', PLAN_FIELDS + ('order_info', 'archived_at'),
+                              dict(PLAN_FORMATS, archived_at=DATETIME_FORMAT), archived=True)
+
+
+def plan_columns(model=ProductionPlan) -> list:
+    return [getattr(model, name) for name in PLAN_FIELDS]
+
+
+def plan_row(row, archived: bool = False) -> RowRecord:
+    """
+    由 plan_columns() + order_columns() [+ archived_at] 的查询行构造计划记录（订单列全为空时 order_info 为 None）
+    """
+    plan_size = len(PLAN_FIELDS)
+    order_values = row[plan_size:plan_size + len(ORDER_FIELDS)]
+    order_info = OrderRow.from_row(order_values) if order_values[0] is not None else None
+    if archived:
+        return ArchivedPlanRow.from_row(tuple(row[:plan_size]) + (order_info, row[-1]))
+    return PlanRow.from_row(tuple(row[:plan_size]) + (order_info,))
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+归档业务逻辑服务
+"""
+from typing import Dict, List
+from datetime import datetime, timedelta
+import time
+from sqlalchemy.orm import Session
+from sqlalchemy import select, insert, delete, literal, func, exists
+from src.models.order_model import Order
+from src.models.production_model import ProductionPlan
+from src.models.archive_model import ArchivedOrder, ArchivedProductionPlan
+from src.services.autocomplete_service import AutocompleteService
+from src.services.change_service import ChangeService
+from src.utils.identity_cache import identity_cache
+from src.config import (ARCHIVE_RETENTION_DAYS, ARCHIVE_BATCH_SIZE, ARCHIVE_BATCH_PAUSE_SECONDS,
+                        ARCHIVE_ORDER_STATUSES, ARCHIVE_PLAN_STATUSES)
+
+# 主表与归档表共有的列
+ORDER_COLUMNS = ['id', 'customer', 'vehicle_model', 'quantity', 'due_date', 'status',
+                 'vin_prefix', 'created_at', 'updated_at']
+PLAN_COLUMNS = ['id', 'plan_code', 'order_id', 'line', 'start_time', 'end_time', 'status',
+                'created_at', 'updated_at']
+# 缓存类别 -> 增量同步类别
+SYNC_KINDS = {'order': 'orders', 'plan': 'plans'}
+
+
+class ArchiveService:
+    """
+    归档服务类
+
+    生产计划：状态为已完成/已取消且结束时间早于截止时间；
+    订单：状态为已完成、最后更新早于截止时间，且主表中已没有关联的生产计划
+    （先归档计划再归档订单，保证主表计划的订单始终在主表）。
+    每批在一个事务内 INSERT ... SELECT 到归档表并从主表删除，批间短暂停顿。
+    主表主键为 AUTOINCREMENT（迁移 6），新行不会复用已归档的ID。
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def cutoff_for(retention_days: int = ARCHIVE_RETENTION_DAYS) -> datetime:
+        return datetime.now() - timedelta(days=retention_days)
+
+    def _plan_candidates(self, cutoff: datetime):
+        return select(ProductionPlan.id).where(
+            ProductionPlan.status.in_(ARCHIVE_PLAN_STATUSES),
+            ProductionPlan.end_time < cutoff
+        )
+
+    def _order_candidates(self, cutoff: datetime):
+        return select(Order.id).where(
+            Order.status.in_(ARCHIVE_ORDER_STATUSES),
+            Order.updated_at < cutoff,
+            ~exists().where(ProductionPlan.order_id == Order.id)
+        )
+
+    def count_candidates(self, cutoff: datetime) -> Dict:
+        """
+        统计待归档的行数（订单数不含其计划尚待归档的订单）
+        """
+        plans = self.db.execute(select(func.count()).select_from(self._plan_candidates(cutoff).subquery())).scalar()
+        orders = self.db.execute(select(func.count()).select_from(self._order_candidates(cutoff).subquery())).scalar()
+        return {'plans': plans, 'orders': orders}
+
+    def _move(self, model, archive_model, columns: List[str], ids: List[int], sync_kind: str):
+        """
+        在一个事务内把指定ID的行复制到归档表并从主表删除（同时写入删除记录，增量同步的终端据此移除）
+        """
+        source = [getattr(model, name) for name in columns]
+        self.db.execute(
+            insert(archive_model).from_select(
+                columns + ['archived_at'],
+                select(*source, literal(datetime.now())).where(model.id.in_(ids))
+            )
+        )
+        self.db.execute(delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False))
+        ChangeService.record_deletions(self.db, sync_kind, ids, reason='archived')
+        self.db.commit()
+
+    def _archive(self, candidates, model, archive_model, columns: List[str], kind: str, on_moved,
+                 batch_size: int, max_batches: int = None, pause: float = ARCHIVE_BATCH_PAUSE_SECONDS) -> int:
+        moved = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            ids = [row[0] for row in self.db.execute(candidates.order_by(model.id).limit(batch_size))]
+            if not ids:
+                break
+            try:
+                self._move(model, archive_model, columns, ids, SYNC_KINDS[kind])
+            except Exception as e:
+                self.db.rollback()
+                raise Exception(f"归档失败: {str(e)}")
+            for row_id in ids:
+                identity_cache.invalidate(kind, row_id)
+                on_moved(row_id)
+            moved += len(ids)
+            batches += 1
+            if pause:
+                time.sleep(pause)
+        return moved
+
+    def archive_plans(self, cutoff: datetime, batch_size: int = ARCHIVE_BATCH_SIZE, max_batches: int = None) -> int:
+        """
+        归档生产计划，返回移动的行数
+        """
+        return self._archive(self._plan_candidates(cutoff), ProductionPlan, ArchivedProductionPlan, PLAN_COLUMNS, 'plan',
+                             AutocompleteService.on_plan_deleted, batch_size, max_batches)
+
+    def archive_orders(self, cutoff: datetime, batch_size: int = ARCHIVE_BATCH_SIZE, max_batches: int = None) -> int:
+        """
+        归档订单，返回移动的行数
+        """
+        return self._archive(self._order_candidates(cutoff), Order, ArchivedOrder, ORDER_COLUMNS, 'order',
+                             AutocompleteService.on_order_deleted, batch_size, max_batches)
+
+    def run(self, retention_days: int = ARCHIVE_RETENTION_DAYS, batch_size: int = ARCHIVE_BATCH_SIZE,
+            max_batches: int = None, dry_run: bool = False) -> Dict:
+        """
+        执行一次归档（先计划后订单）
+
+        Args:
+            retention_days: 保留天数，早于该时间的已结束数据被归档
+            batch_size: 每批移动的行数
+            max_batches: 每张表最多执行的批数（None 表示不限）
+            dry_run: 只统计不移动
+
+        Returns:
+            Dict: 截止时间和各表移动（或待移动）的行数
+        """
+        cutoff = self.cutoff_for(retention_days)
+        if dry_run:
+            return dict(self.count_candidates(cutoff), cutoff=cutoff.strftime('%Y-%m-%d %H:%M:%S'), dry_run=True)
+
+        plans = self.archive_plans(cutoff, batch_size, max_batches)
+        orders = self.archive_orders(cutoff, batch_size, max_batches)
+        return {'cutoff': cutoff.strftime('%Y-%m-%d %H:%M:%S'), 'plans': plans, 'orders': orders, 'dry_run': False}
+
+    def get_archive_statistics(self) -> Dict:
+        """
+        主表与归档表的行数
+        """
+        return {
+            'orders': self.db.query(func.count(Order.id)).scalar(),
+            'orders_archived': self.db.query(func.count(ArchivedOrder.id)).scalar(),
+            'plans': self.db.query(func.count(ProductionPlan.id)).scalar(),
+            'plans_archived': self.db.query(func.count(ArchivedProductionPlan.id)).scalar()
+        }
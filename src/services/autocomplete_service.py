@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+自动补全服务
+为订单、物料、生产计划维护进程内前缀索引，写操作提交后同步更新
+"""
+from typing import Dict, List
+import threading
+import time
+from sqlalchemy.orm import Session
+from src.models.order_model import Order
+from src.models.inventory_model import InventoryItem
+from src.models.production_model import ProductionPlan
+from src.utils.prefix_index import PrefixIndex
+from src.config import AUTOCOMPLETE_REBUILD_SECONDS
+
+# 进程内索引（首次查询时从数据库加载）
+_indexes = {
+    'orders': PrefixIndex(),
+    'parts': PrefixIndex(),
+    'plans': PrefixIndex()
+}
+_loaded_at: Dict[str, float] = {}
+_build_lock = threading.Lock()
+# 正在重建的索引 -> 重建期间其他线程提交的更新（重建查询可能读不到，加载后按顺序重放）
+_pending: Dict[str, list] = {}
+_pending_lock = threading.Lock()
+
+
+def _order_record(order) -> tuple:
+    payload = {
+        'id': order.id,
+        'customer': order.customer,
+        'vehicle_model': order.vehicle_model,
+        'quantity': order.quantity,
+        'status': order.status,
+        'label': f"#{order.id} {order.customer} - {order.vehicle_model} ({order.quantity}台)"
+    }
+    return order.id, (order.customer, str(order.id)), payload
+
+
+def _part_record(item) -> tuple:
+    payload = {
+        'id': item.id,
+        'part_code': item.part_code,
+        'name': item.name,
+        'quantity': item.quantity,
+        'label': f"{item.part_code} {item.name}"
+    }
+    return item.id, (item.part_code, item.name), payload
+
+
+def _plan_record(plan) -> tuple:
+    payload = {
+        'id': plan.id,
+        'plan_code': plan.plan_code,
+        'order_id': plan.order_id,
+        'line': plan.line,
+        'status': plan.status,
+        'label': f"{plan.plan_code} ({plan.line})"
+    }
+    return plan.id, (plan.plan_code,), payload
+
+
+_LOADERS = {
+    'orders': (
+        lambda db: db.query(Order.id, Order.customer, Order.vehicle_model, Order.quantity, Order.status),
+        _order_record
+    ),
+    'parts': (
+        lambda db: db.query(InventoryItem.id, InventoryItem.part_code, InventoryItem.name, InventoryItem.quantity),
+        _part_record
+    ),
+    'plans': (
+        lambda db: db.query(ProductionPlan.id, ProductionPlan.plan_code, ProductionPlan.order_id,
+                            ProductionPlan.line, ProductionPlan.status),
+        _plan_record
+    )
+}
+
+
+class AutocompleteService:
+    """
+    自动补全服务类
+
+    索引为进程级缓存：本进程的写操作会立即同步；多进程部署时其他进程的写入
+    最迟在 AUTOCOMPLETE_REBUILD_SECONDS 后随重建生效
+    """
+
+    KINDS = tuple(_indexes.keys())
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def search(self, kind: str, q: str, limit: int = 10) -> List[Dict]:
+        """
+        前缀查询
+        """
+        if kind not in _indexes:
+            raise ValueError(f"无效的补全类型: {kind}")
+        self._ensure_loaded(kind)
+        return _indexes[kind].search(q, limit)
+
+    def _ensure_loaded(self, kind: str):
+        """
+        首次使用或超过重建间隔时从数据库加载索引
+        """
+        loaded_at = _loaded_at.get(kind)
+        if loaded_at is not None and time.monotonic() - loaded_at < AUTOCOMPLETE_REBUILD_SECONDS:
+            return
+        with _build_lock:
+            loaded_at = _loaded_at.get(kind)
+            if loaded_at is not None and time.monotonic() - loaded_at < AUTOCOMPLETE_REBUILD_SECONDS:
+                return
+            query_fn, record_fn = _LOADERS[kind]
+            with _pending_lock:
+                _pending[kind] = []
+            loaded = False
+            try:
+                _indexes[kind].load(record_fn(row) for row in query_fn(self.db).yield_per(5000))
+                loaded = True
+            finally:
+                with _pending_lock:
+                    updates = _pending.pop(kind)
+                    if loaded:
+                        _loaded_at[kind] = time.monotonic()
+                    # 在锁内重放（重建失败时作用于仍在使用的旧索引），之后的更新直接作用于索引
+                    if kind in _loaded_at:
+                        for method, args in updates:
+                            getattr(_indexes[kind], method)(*args)
+
+    @staticmethod
+    def _apply(kind: str, method: str, *args):
+        with _pending_lock:
+            if kind in _pending:
+                _pending[kind].append((method, args))
+                return
+        # 索引尚未加载时无需维护，首次查询会读取最新数据
+        if kind in _loaded_at:
+            getattr(_indexes[kind], method)(*args)
+
+    @staticmethod
+    def _upsert(kind: str, record: tuple):
+        AutocompleteService._apply(kind, 'upsert', *record)
+
+    @staticmethod
+    def _remove(kind: str, item_id: int):
+        AutocompleteService._apply(kind, 'remove', item_id)
+
+    @staticmethod
+    def on_order_saved(order: Order):
+        AutocompleteService._upsert('orders', _order_record(order))
+
+    @staticmethod
+    def on_order_deleted(order_id: int):
+        AutocompleteService._remove('orders', order_id)
+
+    @staticmethod
+    def on_item_saved(item: InventoryItem):
+        AutocompleteService._upsert('parts', _part_record(item))
+
+    @staticmethod
+    def on_item_deleted(item_id: int):
+        AutocompleteService._remove('parts', item_id)
+
+    @staticmethod
+    def on_plan_saved(plan: ProductionPlan):
+        AutocompleteService._upsert('plans', _plan_record(plan))
+
+    @staticmethod
+    def on_plan_deleted(plan_id: int):
+        AutocompleteService._remove('plans', plan_id)
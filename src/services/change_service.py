@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+增量同步服务
+
+终端保存上次返回的同步令牌，之后只读取令牌之后新增/修改的行（按 (updated_at, id) 键集分页，
+走 updated_at 索引）和删除/归档的行ID（deleted_rows 表，按自增ID读取），不必重新拉取整张表。
+"""
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+import base64
+import json
+from sqlalchemy.orm import Session
+from sqlalchemy import select, insert, delete, func, or_
+from src.models.order_model import Order
+from src.models.inventory_model import InventoryItem
+from src.models.production_model import ProductionPlan
+from src.models.change_model import DeletedRow
+from src.models.row_records import (OrderRow, InventoryRow, PlanRow, ORDER_FIELDS, INVENTORY_FIELDS, PLAN_FIELDS,
+                                    projected_type)
+from src.config import (CHANGES_DEFAULT_LIMIT, CHANGES_SETTLE_SECONDS, CHANGES_TOMBSTONE_RETENTION_DAYS)
+
+
+class SyncTokenExpired(ValueError):
+    """
+    令牌早于删除记录的保留期，期间的删除可能已被清理，终端需要重新全量同步
+    """
+
+
+class ChangeService:
+    """
+    增量同步服务类
+
+    令牌记录 (最后一行的 updated_at, id)、已读取的删除记录ID和签发时间，编码为 base64url 的 JSON，
+    终端只需原样传回。updated_at 在提交前由应用写入，提交较晚的行可能带着较早的时间出现，
+    因此只返回 updated_at 早于当前时间 CHANGES_SETTLE_SECONDS 秒的行，更新的行留到下次读取。
+    """
+
+    # 类别 -> (模型, 行记录类型, 可选字段)；计划不含 order_info，终端按 order_id 关联已同步的订单
+    KINDS = {
+        'orders': (Order, OrderRow, ORDER_FIELDS),
+        'items': (InventoryItem, InventoryRow, INVENTORY_FIELDS),
+        'plans': (ProductionPlan, projected_type(PlanRow, PLAN_FIELDS), PLAN_FIELDS)
+    }
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def record_deletions(db: Session, kind: str, ids: List[int], reason: str = 'deleted'):
+        """
+        写入删除记录（在删除所在的事务内调用，由调用方提交）
+        """
+        if ids:
+            now = datetime.now()
+            db.execute(insert(DeletedRow), [{'kind': kind, 'row_id': row_id, 'reason': reason, 'deleted_at': now}
+                                            for row_id in ids])
+
+    @staticmethod
+    def encode_token(updated_at: Optional[datetime], row_id: Optional[int], tombstone_id: int,
+                     issued_at: datetime) -> str:
+        payload = {
+            'u': updated_at.isoformat() if updated_at else None,
+            'i': row_id,
+            't': tombstone_id,
+            'at': issued_at.isoformat(timespec='seconds')
+        }
+        raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    @staticmethod
+    def decode_token(token: str) -> Tuple[Optional[datetime], Optional[int], int, datetime]:
+        """
+        Raises:
+            ValueError: 令牌格式无效
+        """
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            payload = json.loads(raw)
+            updated_at = datetime.fromisoformat(payload['u']) if payload['u'] else None
+            row_id = int(payload['i']) if payload['i'] is not None else None
+            return updated_at, row_id, int(payload['t']), datetime.fromisoformat(payload['at'])
+        except (ValueError, TypeError, KeyError, AttributeError):
+            raise ValueError('无效的同步令牌')
+
+    def get_changes(self, kind: str, since: str = None, limit: int = CHANGES_DEFAULT_LIMIT,
+                    fields: Tuple[str, ...] = None) -> Dict:
+        """
+        读取令牌之后的变更
+
+        Args:
+            kind: orders / items / plans
+            since: 上次返回的令牌（为空时从头读取全部行，删除记录从当前位置开始）
+            limit: 最多返回的新增/修改行数（删除记录同样最多 limit 条）
+            fields: 只返回这些字段
+
+        Returns:
+            Dict: {'changes': 行记录, 'deleted': 删除/归档的行ID, 'next': 新令牌,
+                   'has_more': 是否还有未读取的变更（为 True 时应立即用新令牌继续读取）}
+
+        Raises:
+            ValueError: 令牌无效
+            SyncTokenExpired: 令牌已超过删除记录保留期
+        """
+        model, record, allowed = self.KINDS[kind]
+        now = datetime.now()
+        settled = now - timedelta(seconds=CHANGES_SETTLE_SECONDS)
+
+        if since:
+            last_updated, last_id, tombstone_id, issued_at = self.decode_token(since)
+            if issued_at < now - timedelta(days=CHANGES_TOMBSTONE_RETENTION_DAYS):
+                raise SyncTokenExpired('同步令牌已过期，请重新全量同步')
+        else:
+            # 首次同步：终端没有任何行，之前的删除记录无需读取
+            last_updated, last_id = None, None
+            tombstone_id = self.db.execute(
+                select(func.coalesce(func.max(DeletedRow.id), 0)).where(DeletedRow.deleted_at <= settled)
+            ).scalar()
+
+        # 新增/修改的行（键集分页：跳过上一页最后一行及之前的行）
+        if fields:
+            record = projected_type(record, fields)
+        columns = [getattr(model, name) for name in (fields or allowed)]
+        query = select(model.updated_at, model.id, *columns).where(model.updated_at <= settled)
+        if last_updated is not None:
+            query = query.where(model.updated_at >= last_updated)
+            query = query.where(or_(model.updated_at > last_updated, model.id > last_id)
+                                if last_id is not None else model.updated_at > last_updated)
+        rows = self.db.execute(query.order_by(model.updated_at, model.id).limit(limit + 1)).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if has_more:
+            last_updated, last_id = rows[-1][0], rows[-1][1]
+        else:
+            # settled 之前的行已全部读取，下次从 settled 之后开始
+            last_updated, last_id = settled, None
+
+        # 删除/归档的行
+        tombstones = self.db.execute(
+            select(DeletedRow.id, DeletedRow.row_id)
+            .where(DeletedRow.kind == kind, DeletedRow.id > tombstone_id, DeletedRow.deleted_at <= settled)
+            .order_by(DeletedRow.id).limit(limit + 1)
+        ).all()
+        if len(tombstones) > limit:
+            has_more = True
+            tombstones = tombstones[:limit]
+        if tombstones:
+            tombstone_id = tombstones[-1][0]
+
+        return {
+            'changes': [record.from_row(row[2:]) for row in rows],
+            'deleted': [row_id for _, row_id in tombstones],
+            'next': self.encode_token(last_updated, last_id, tombstone_id, now),
+            'has_more': has_more
+        }
+
+    def prune_tombstones(self, retention_days: int = CHANGES_TOMBSTONE_RETENTION_DAYS) -> int:
+        """
+        清理超过保留期的删除记录，返回删除的行数
+        """
+        cutoff = datetime.now() - timedelta(days=retention_days)
+        result = self.db.execute(delete(DeletedRow).where(DeletedRow.deleted_at < cutoff))
+        self.db.commit()
+        return result.rowcount
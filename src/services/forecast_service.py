@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+订单交期蒙特卡洛仿真服务
+按生产线工期分布对当前排程做多次重复仿真，估计订单完工日期分位数和延期概率
+"""
+from typing import Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import os
+import time
+import numpy as np
+from sqlalchemy.orm import Session
+from src.services.schedule_snapshot import (
+    ScheduleSnapshot, PLAN_STATUS_CODES, ORDER_STATUS_CODES, seconds_to_datetime
+)
+from src.models.row_records import record_type, DATE_FORMAT
+from src.config import (
+    DEFAULT_DURATION_SIGMA, LINE_DURATION_SIGMA,
+    FORECAST_DEFAULT_REPLICATIONS, FORECAST_MAX_REPLICATIONS, FORECAST_MAX_WORKERS
+)
+from src.utils.metrics import SCHEDULER_RUN_SECONDS
+
+# 单批仿真矩阵（重复次数 x 计划数）的元素上限，控制每个进程的内存占用
+BATCH_ELEMENT_BUDGET = 4_000_000
+# 完工时间分布：每个订单的直方图分箱数，以及确定分箱范围的试算重复次数
+HISTOGRAM_BINS = 256
+PILOT_REPLICATIONS = 64
+
+# 订单仿真结果记录（时间保留原值：按行输出时格式化到分钟，列式输出时为时间戳）
+COMPLETION_FORMAT = '%Y-%m-%d %H:%M'
+ForecastRow = record_type(
+    'ForecastRow',
+    ('order_id', 'due_date', 'planned_completion', 'p50_completion', 'p90_completion', 'miss_probability'),
+    {'due_date': DATE_FORMAT, 'planned_completion': COMPLETION_FORMAT,
+     'p50_completion': COMPLETION_FORMAT, 'p90_completion': COMPLETION_FORMAT}
+)
+
+COMPLETED_PLAN_CODE = PLAN_STATUS_CODES.index('COMPLETED')
+COMPLETED_ORDER_CODE = ORDER_STATUS_CODES.index('COMPLETED')
+
+# 工作进程中的仿真模型（由 initializer 设置，避免每个任务重复传输数组）
+_worker_model = None
+
+
+def _init_worker(model: Dict):
+    global _worker_model
+    _worker_model = model
+
+
+def _simulate_completion(model: Dict, seed, replications: int) -> np.ndarray:
+    """
+    仿真一批重复实验，返回订单完工时间矩阵（重复次数 x 订单数）
+
+    各生产线内计划按顺序串行，工期抽样后用前缀和 + max.accumulate 一次算出整批开始时间
+    """
+    rng = np.random.default_rng(seed)
+
+    release = model['release']
+    duration = model['duration']
+    ends = np.empty((replications, len(release)), dtype=np.float64)
+
+    for lo, hi, sigma in model['segments']:
+        factor = rng.lognormal(mean=-sigma * sigma / 2, sigma=sigma, size=(replications, hi - lo))
+        sampled = duration[lo:hi] * factor
+        offset = np.cumsum(sampled, axis=1) - sampled
+        start = np.maximum.accumulate(release[lo:hi] - offset, axis=1) + offset
+        ends[:, lo:hi] = start + sampled
+
+    # 订单完工时间 = 其计划的最晚结束时间（按订单分组求最大值）
+    completion = np.maximum.reduceat(ends[:, model['order_sort']], model['group_starts'], axis=1)
+    return np.maximum(completion, model['completed_floor'])
+
+
+def _simulate_batches(batches) -> tuple:
+    """
+    依次仿真多批重复实验，把完工时间累加到每个订单的定宽直方图
+
+    直方图首尾各多一个箱，统计落在 [hist_low, hist_low + HISTOGRAM_BINS * hist_width) 之外的值，
+    同时记录完工时间的最小/最大值作为这两个箱的边界。
+
+    Returns:
+        (直方图计数 订单数 x (HISTOGRAM_BINS + 2), 最小值, 最大值, 延期次数)
+    """
+    model = _worker_model
+    order_count = len(model['due'])
+    width = HISTOGRAM_BINS + 2
+    counts = np.zeros(order_count * width, dtype=np.int64)
+    minimum = np.full(order_count, np.inf)
+    maximum = np.full(order_count, -np.inf)
+    missed = np.zeros(order_count, dtype=np.int64)
+    row_offset = np.arange(order_count) * width
+
+    for seed, replications in batches:
+        completion = _simulate_completion(model, seed, replications)
+        bins = np.floor((completion - model['hist_low']) / model['hist_width']).astype(np.int64)
+        bins = np.clip(bins, -1, HISTOGRAM_BINS) + 1
+        counts += np.bincount((bins + row_offset).ravel(), minlength=len(counts))
+        np.minimum(minimum, completion.min(axis=0), out=minimum)
+        np.maximum(maximum, completion.max(axis=0), out=maximum)
+        missed += np.count_nonzero(completion > model['due'], axis=0)
+    return counts.reshape(order_count, width), minimum, maximum, missed
+
+
+def _histogram_percentile(counts: np.ndarray, low: np.ndarray, bin_width: np.ndarray,
+                          minimum: np.ndarray, maximum: np.ndarray, q: float) -> np.ndarray:
+    """
+    由每个订单的直方图求合并样本的分位数（箱内线性插值；首尾溢出箱以实际最小/最大值为边界）
+    """
+    total = counts.sum(axis=1)
+    target = q / 100 * total
+    cumulative = np.cumsum(counts, axis=1)
+    index = np.argmax(cumulative >= target[:, None], axis=1)
+    rows = np.arange(len(counts))
+    before = cumulative[rows, index] - counts[rows, index]
+    fraction = np.where(counts[rows, index] > 0,
+                        (target - before) / np.maximum(counts[rows, index], 1), 0.0)
+
+    lower = low + (index - 1) * bin_width
+    upper = lower + bin_width
+    top = low + HISTOGRAM_BINS * bin_width
+    lower = np.where(index == 0, np.minimum(minimum, low), np.where(index == HISTOGRAM_BINS + 1, top, lower))
+    upper = np.where(index == 0, low, np.where(index == HISTOGRAM_BINS + 1, np.maximum(maximum, top), upper))
+    return np.clip(lower + fraction * (upper - lower), minimum, maximum)
+
+
+class ForecastService:
+    """
+    交期仿真服务类
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def forecast_completion(self, replications: int = FORECAST_DEFAULT_REPLICATIONS,
+                            workers: int = None, seed: int = None,
+                            order_ids: Optional[List[int]] = None,
+                            line_sigma: Optional[Dict[str, float]] = None) -> Dict:
+        """
+        仿真未完成订单的完工日期
+
+        Args:
+            replications: 重复仿真次数
+            workers: 工作进程数（1 时在当前进程内计算），超过 FORECAST_MAX_WORKERS 或CPU核数时取上限
+            seed: 随机种子，相同种子和数据得到相同结果
+            order_ids: 只返回指定订单（仿真仍覆盖整个排程）
+            line_sigma: 覆盖配置中的生产线工期波动
+
+        Returns:
+            各订单 P50/P90 完工日期与延期概率
+
+        Raises:
+            ValueError: 工作进程数小于1
+        """
+        started = time.perf_counter()
+        replications = max(1, min(int(replications), FORECAST_MAX_REPLICATIONS))
+        if workers is not None and workers < 1:
+            raise ValueError("工作进程数必须大于0")
+        workers = min(workers or FORECAST_MAX_WORKERS, FORECAST_MAX_WORKERS, os.cpu_count() or 1)
+
+        snapshot = ScheduleSnapshot.load(self.db)
+        model = self._build_model(snapshot, line_sigma or {})
+        if model is None:
+            return {
+                'replications': replications,
+                'orders': [],
+                'unplanned_orders': self._count_unplanned(snapshot),
+                'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+            }
+
+        # 按内存预算切分批次，每批使用独立的随机数流
+        plan_count = max(len(model['release']), 1)
+        batch_size = int(np.clip(BATCH_ELEMENT_BUDGET // plan_count, 16, 1000))
+        batch_sizes = [batch_size] * (replications // batch_size)
+        if replications % batch_size:
+            batch_sizes.append(replications % batch_size)
+        pilot_seed, *seeds = np.random.SeedSequence(seed).spawn(len(batch_sizes) + 1)
+        batches = list(zip(seeds, batch_sizes))
+
+        # 试算一小批确定每个订单直方图的范围（两侧各留出一倍跨度，至少1小时）
+        pilot = _simulate_completion(model, pilot_seed, PILOT_REPLICATIONS)
+        pilot_low, pilot_high = pilot.min(axis=0), pilot.max(axis=0)
+        margin = np.maximum(pilot_high - pilot_low, 3600.0)
+        model['hist_low'] = pilot_low - margin
+        model['hist_width'] = (pilot_high - pilot_low + 2 * margin) / HISTOGRAM_BINS
+
+        # 每个进程处理一组批次，只返回累加后的直方图（计数为整数，合并结果与进程数无关）
+        process_count = min(workers, len(batches))
+        if process_count <= 1:
+            _init_worker(model)
+            results = [_simulate_batches(batches)]
+        else:
+            groups = [batches[i::process_count] for i in range(process_count)]
+            with ProcessPoolExecutor(max_workers=process_count,
+                                     initializer=_init_worker, initargs=(model,)) as pool:
+                results = list(pool.map(_simulate_batches, groups))
+
+        # 合并：直方图和延期次数求和，分位数取自合并后的全部样本
+        counts = np.sum([r[0] for r in results], axis=0)
+        minimum = np.min([r[1] for r in results], axis=0)
+        maximum = np.max([r[2] for r in results], axis=0)
+        p50, p90 = (_histogram_percentile(counts, model['hist_low'], model['hist_width'], minimum, maximum, q)
+                    for q in (50, 90))
+        miss_probability = np.sum([r[3] for r in results], axis=0) / replications
+
+        base = model['base']
+        order_idx = model['order_idx']
+        orders = []
+        for k in np.argsort(-miss_probability, kind='stable'):
+            i = order_idx[k]
+            order_id = int(snapshot.order_ids[i])
+            if order_ids is not None and order_id not in order_ids:
+                continue
+            orders.append(ForecastRow.from_row((
+                order_id,
+                seconds_to_datetime(snapshot.order_due[i]),
+                self._completion_time(base + model['planned_completion'][k]),
+                self._completion_time(base + p50[k]),
+                self._completion_time(base + p90[k]),
+                round(float(miss_probability[k]), 4)
+            )))
+
+        elapsed = time.perf_counter() - started
+        SCHEDULER_RUN_SECONDS.labels('forecast').observe(elapsed)
+        return {
+            'replications': replications,
+            'workers': workers,
+            'seed': seed,
+            'orders': orders,
+            'unplanned_orders': self._count_unplanned(snapshot),
+            'elapsed_ms': round(elapsed * 1000, 1)
+        }
+
+    def _build_model(self, snapshot: ScheduleSnapshot, line_sigma: Dict[str, float]) -> Optional[Dict]:
+        """
+        构建仿真输入：未完成计划的释放时间、计划工期、按订单分组的下标
+        """
+        open_order = snapshot.order_status != COMPLETED_ORDER_CODE
+        has_order = snapshot.plan_order >= 0
+        plan_open_order = np.zeros(snapshot.plan_count, dtype=bool)
+        plan_open_order[has_order] = open_order[snapshot.plan_order[has_order]]
+
+        completed = snapshot.plan_status == COMPLETED_PLAN_CODE
+        simulated = plan_open_order & ~completed
+        if not simulated.any():
+            return None
+
+        # 以最早开始时间为基准，使用相对秒数保证浮点精度
+        base = int(snapshot.plan_start[simulated].min())
+
+        line = snapshot.plan_line[simulated]
+        release = (snapshot.plan_start[simulated] - base).astype(np.float64)
+        duration = np.maximum(snapshot.plan_end[simulated] - snapshot.plan_start[simulated], 0).astype(np.float64)
+        plan_order = snapshot.plan_order[simulated]
+
+        segments = []
+        for line_idx, name in enumerate(snapshot.lines):
+            lo, hi = np.searchsorted(line, [line_idx, line_idx + 1])
+            if lo < hi:
+                sigma = float(line_sigma.get(name, LINE_DURATION_SIGMA.get(name, DEFAULT_DURATION_SIGMA)))
+                segments.append((int(lo), int(hi), sigma))
+
+        # 订单分组：计划按订单排序后，每组起点供 reduceat 使用
+        order_sort = np.argsort(plan_order, kind='stable')
+        sorted_orders = plan_order[order_sort]
+        group_starts = np.flatnonzero(np.r_[True, sorted_orders[1:] != sorted_orders[:-1]])
+        order_idx = sorted_orders[group_starts]
+
+        # 已完成计划的结束时间作为订单完工时间下限
+        completed_floor = np.full(snapshot.order_count, -np.inf)
+        done = completed & has_order
+        np.maximum.at(completed_floor, snapshot.plan_order[done],
+                      (snapshot.plan_end[done] - base).astype(np.float64))
+
+        planned_end = release + duration
+        planned_completion = np.maximum(
+            np.maximum.reduceat(planned_end[order_sort], group_starts),
+            completed_floor[order_idx]
+        )
+
+        return {
+            'base': base,
+            'release': release,
+            'duration': duration,
+            'segments': segments,
+            'order_sort': order_sort,
+            'group_starts': group_starts,
+            'order_idx': order_idx,
+            'completed_floor': completed_floor[order_idx],
+            'due': (snapshot.order_due[order_idx] - base).astype(np.float64),
+            'planned_completion': planned_completion
+        }
+
+    def _count_unplanned(self, snapshot: ScheduleSnapshot) -> int:
+        """
+        统计没有任何有效计划的未完成订单数
+        """
+        planned = np.zeros(snapshot.order_count, dtype=bool)
+        planned[snapshot.plan_order[snapshot.plan_order >= 0]] = True
+        return int(np.count_nonzero(~planned & (snapshot.order_status != COMPLETED_ORDER_CODE)))
+
+    @staticmethod
+    def _completion_time(seconds: float) -> datetime:
+        return seconds_to_datetime(round(seconds))
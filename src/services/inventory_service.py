@@ -2,10 +2,16 @@
 """
 库存管理业务逻辑服务
 """
-from typing import List, Dict, Optional
+from typing import List, Dict, Iterator, Mapping, Optional, Sequence, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import or_, case, func, select
 from src.models.inventory_model import InventoryItem
+from src.models.row_records import InventoryRow, inventory_columns, projected_type
+from src.services.autocomplete_service import AutocompleteService
+from src.services.change_service import ChangeService
+from src.utils.request_timing import RequestTiming
+from src.utils.identity_cache import identity_cache
+from src.utils.event_bus import event_bus
 
 class InventoryService:
     """
@@ -44,6 +50,9 @@ class InventoryService:
             self.db.add(item)
             self.db.commit()
             self.db.refresh(item)
+            AutocompleteService.on_item_saved(item)
+            event_bus.publish('inventory', {'id': item.id, 'part_code': item.part_code,
+                                            'quantity': item.quantity, 'previous': None})
             
             return item
         except Exception as e:
@@ -62,13 +71,20 @@ class InventoryService:
         """
         return self.db.query(InventoryItem).filter(InventoryItem.part_code == part_code).first()
     
-    def get_items(self, page: int = 1, per_page: int = 20, search: str = None) -> Dict:
+    def get_item_snapshot(self, item_id: int) -> Optional[Mapping]:
         """
-        获取库存物料列表（分页）
+        根据ID获取库存物料的只读快照（经进程内缓存，用于展示；需要修改时使用 get_item_by_id）
+        """
+        def load():
+            item = self.get_item_by_id(item_id)
+            return item.to_dict() if item else None
+        return identity_cache.get_or_load('item', item_id, load)
+    
+    @staticmethod
+    def _apply_search(query, search: str = None):
+        """
+        物料名称或编码模糊搜索（列表页与导出共用）
         """
-        query = self.db.query(InventoryItem)
-        
-        # 物料名称或编码模糊搜索
         if search:
             query = query.filter(
                 or_(
@@ -76,21 +92,79 @@ class InventoryService:
                     InventoryItem.part_code.like(f'%{search}%')
                 )
             )
+        return query
+    
+    def get_items(self, page: int = 1, per_page: int = 20, search: str = None,
+                  fields: Tuple[str, ...] = None) -> Dict:
+        """
+        获取库存物料列表（分页）
+        
+        Args:
+            fields: 只返回这些字段（默认全部）
+        """
+        # 只读展示：按列查询为行记录，不构造ORM对象
+        columns = [getattr(InventoryItem, name) for name in fields] if fields else inventory_columns()
+        record = projected_type(InventoryRow, fields) if fields else InventoryRow
+        query = self._apply_search(self.db.query(*columns), search)
         
-        # 总数
-        total = query.count()
+        with RequestTiming.timed('db'):
+            # 总数
+            total = query.count()
+            
+            # 分页查询
+            rows = query.order_by(InventoryItem.created_at.desc()).offset((page - 1) * per_page).limit(per_page).all()
         
-        # 分页查询
-        items = query.order_by(InventoryItem.created_at.desc()).offset((page - 1) * per_page).limit(per_page).all()
+        with RequestTiming.timed('serialize'):
+            items = [record.from_row(row) for row in rows]
         
         return {
-            'items': [item.to_dict() for item in items],
+            'items': items,
             'total': total,
             'page': page,
             'per_page': per_page,
             'pages': (total + per_page - 1) // per_page
         }
     
+    def get_items_by_ids(self, ids: Sequence[int], fields: Tuple[str, ...] = None) -> Dict:
+        """
+        按ID批量读取库存物料（一次 IN 查询，只查询所需列）
+        
+        Args:
+            ids: 物料ID（按此顺序返回，重复的只返回一次）
+            fields: 只返回这些字段（默认全部）
+        
+        Returns:
+            Dict: {'items': 行记录列表, 'missing': 不存在的ID}
+        """
+        ids = list(dict.fromkeys(ids))
+        columns = [getattr(InventoryItem, name) for name in fields] if fields else inventory_columns()
+        record = projected_type(InventoryRow, fields) if fields else InventoryRow
+        found = {}
+        if ids:
+            with RequestTiming.timed('db'):
+                for row in self.db.execute(select(InventoryItem.id, *columns).where(InventoryItem.id.in_(ids))):
+                    found[row[0]] = record.from_row(row[1:])
+        
+        return {
+            'items': [found[item_id] for item_id in ids if item_id in found],
+            'missing': [item_id for item_id in ids if item_id not in found]
+        }
+    
+    # 导出列（与 iter_export_rows 的列顺序一致）
+    EXPORT_HEADERS = ['id', 'part_code', 'name', 'spec', 'quantity', 'location', 'created_at']
+    
+    def iter_export_rows(self, search: str = None, batch_size: int = 1000) -> Iterator[tuple]:
+        """
+        流式读取导出行（只查询所需列，按批从游标读取，不构造ORM对象）
+        """
+        query = self.db.query(
+            InventoryItem.id, InventoryItem.part_code, InventoryItem.name, InventoryItem.spec,
+            InventoryItem.quantity, InventoryItem.location, InventoryItem.created_at
+        )
+        query = self._apply_search(query, search).order_by(InventoryItem.created_at.desc())
+        for row in query.yield_per(batch_size):
+            yield tuple(row)
+    
     def update_item(self, item_id: int, item_data: Dict) -> Optional[InventoryItem]:
         """
         更新库存物料信息
@@ -99,6 +173,7 @@ class InventoryService:
             item = self.get_item_by_id(item_id)
             if not item:
                 return None
+            previous = item.quantity
             
             # 检查物料编码是否与其他记录冲突
             if 'part_code' in item_data and item_data['part_code'] != item.part_code:
@@ -126,7 +201,11 @@ class InventoryService:
             item.generate_qrcode()
             
             self.db.commit()
+            identity_cache.invalidate('item', item_id)
             self.db.refresh(item)
+            AutocompleteService.on_item_saved(item)
+            event_bus.publish('inventory', {'id': item_id, 'part_code': item.part_code,
+                                            'quantity': item.quantity, 'previous': previous})
             
             return item
         except Exception as e:
@@ -141,9 +220,15 @@ class InventoryService:
             item = self.get_item_by_id(item_id)
             if not item:
                 return False
+            part_code, previous = item.part_code, item.quantity
             
             self.db.delete(item)
+            ChangeService.record_deletions(self.db, 'items', [item_id])
             self.db.commit()
+            identity_cache.invalidate('item', item_id)
+            AutocompleteService.on_item_deleted(item_id)
+            event_bus.publish('inventory', {'id': item_id, 'part_code': part_code, 'quantity': None,
+                                            'previous': previous})
             
             return True
         except Exception as e:
@@ -158,10 +243,15 @@ class InventoryService:
             item = self.get_item_by_id(item_id)
             if not item:
                 return None
+            previous = item.quantity
             
             item.quantity = quantity
             self.db.commit()
+            identity_cache.invalidate('item', item_id)
             self.db.refresh(item)
+            AutocompleteService.on_item_saved(item)
+            event_bus.publish('inventory', {'id': item_id, 'part_code': item.part_code,
+                                            'quantity': item.quantity, 'previous': previous})
             
             return item
         except Exception as e:
@@ -172,25 +262,20 @@ class InventoryService:
         """
         获取库存统计信息
         """
-        total_items = self.db.query(InventoryItem).count()
-        total_quantity = self.db.query(InventoryItem).with_entities(
-            InventoryItem.quantity
-        ).all()
-        
-        total_quantity_sum = sum([item.quantity for item in total_quantity])
+        # 按物料编码前3位分组汇总，在数据库中完成，不加载物料对象
+        prefix = case(
+            (func.length(InventoryItem.part_code) >= 3, func.substr(InventoryItem.part_code, 1, 3)),
+            else_='OTHER'
+        ).label('prefix')
+        with RequestTiming.timed('db'):
+            rows = self.db.query(
+                prefix, func.count(InventoryItem.id), func.coalesce(func.sum(InventoryItem.quantity), 0)
+            ).group_by(prefix).all()
         
-        # 按物料类型统计
-        part_types = {}
-        items = self.db.query(InventoryItem).all()
-        for item in items:
-            prefix = item.part_code[:3] if len(item.part_code) >= 3 else 'OTHER'
-            if prefix not in part_types:
-                part_types[prefix] = {'count': 0, 'quantity': 0}
-            part_types[prefix]['count'] += 1
-            part_types[prefix]['quantity'] += item.quantity
+        part_types = {row[0]: {'count': row[1], 'quantity': row[2]} for row in rows}
         
         return {
-            'total_items': total_items,
-            'total_quantity': total_quantity_sum,
+            'total_items': sum(item['count'] for item in part_types.values()),
+            'total_quantity': sum(item['quantity'] for item in part_types.values()),
             'part_types': part_types
         }
@@ -2,11 +2,18 @@
 """
 订单管理业务逻辑服务
 """
-from typing import List, Dict, Optional
+from typing import List, Dict, Iterator, Mapping, Optional, Sequence, Tuple
 from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import or_, select, func, literal, union_all
 from src.models.order_model import Order
+from src.models.archive_model import ArchivedOrder
+from src.models.row_records import OrderRow, ArchivedOrderRow, order_columns, projected_type, project
+from src.services.autocomplete_service import AutocompleteService
+from src.services.change_service import ChangeService
+from src.utils.request_timing import RequestTiming
+from src.utils.identity_cache import identity_cache
+from src.utils.event_bus import event_bus
 from src.config import ORDER_STATUS
 
 class OrderService:
@@ -36,6 +43,8 @@ class OrderService:
             self.db.add(order)
             self.db.commit()
             self.db.refresh(order)
+            AutocompleteService.on_order_saved(order)
+            event_bus.publish('order', {'id': order.id, 'status': order.status, 'previous': None})
             
             return order
         except Exception as e:
@@ -48,30 +57,163 @@ class OrderService:
         """
         return self.db.query(Order).filter(Order.id == order_id).first()
     
-    def get_orders(self, page: int = 1, per_page: int = 20, search: str = None) -> Dict:
+    def get_order_snapshot(self, order_id: int) -> Optional[Mapping]:
+        """
+        根据ID获取订单的只读快照（经进程内缓存，用于展示；需要修改时使用 get_order_by_id）
+        """
+        def load():
+            order = self.get_order_by_id(order_id)
+            return order.to_dict() if order else None
+        return identity_cache.get_or_load('order', order_id, load)
+    
+    @staticmethod
+    def _apply_search(query, search: str = None, model=Order):
+        """
+        客户名称模糊搜索（列表页与导出共用，model 可为归档订单）
+        """
+        if search:
+            query = query.filter(model.customer.like(f'%{search}%'))
+        return query
+    
+    def get_orders(self, page: int = 1, per_page: int = 20, search: str = None,
+                   include_archived: bool = False, fields: Tuple[str, ...] = None) -> Dict:
         """
         获取订单列表（分页）
+        
+        Args:
+            include_archived: 是否包含已归档的订单（历史查询）
+            fields: 只返回这些字段（默认全部）
         """
-        query = self.db.query(Order)
+        if include_archived:
+            return self._get_orders_with_archive(page, per_page, search, fields)
         
-        # 客户名称模糊搜索
-        if search:
-            query = query.filter(Order.customer.like(f'%{search}%'))
+        # 只读展示：按列查询为行记录，不构造ORM对象
+        columns = [getattr(Order, name) for name in fields] if fields else order_columns()
+        record = projected_type(OrderRow, fields) if fields else OrderRow
+        query = self._apply_search(self.db.query(*columns), search)
         
-        # 总数
-        total = query.count()
+        with RequestTiming.timed('db'):
+            # 总数
+            total = query.count()
+            
+            # 分页查询
+            rows = query.order_by(Order.created_at.desc()).offset((page - 1) * per_page).limit(per_page).all()
         
-        # 分页查询
-        orders = query.order_by(Order.created_at.desc()).offset((page - 1) * per_page).limit(per_page).all()
+        with RequestTiming.timed('serialize'):
+            orders = [record.from_row(row) for row in rows]
         
         return {
-            'orders': [order.to_dict() for order in orders],
+            'orders': orders,
             'total': total,
             'page': page,
             'per_page': per_page,
             'pages': (total + per_page - 1) // per_page
         }
     
+    def _get_orders_with_archive(self, page: int, per_page: int, search: str = None,
+                                 fields: Tuple[str, ...] = None) -> Dict:
+        """
+        主表与归档表合并分页：UNION ALL 只取ID和排序列，再按ID读取当前页的行记录
+        """
+        hot = self._apply_search(select(Order.id, Order.created_at, literal(False).label('archived')), search)
+        cold = self._apply_search(
+            select(ArchivedOrder.id, ArchivedOrder.created_at, literal(True).label('archived')),
+            search, ArchivedOrder
+        )
+        combined = union_all(hot, cold).subquery()
+        
+        with RequestTiming.timed('db'):
+            total = self.db.execute(select(func.count()).select_from(combined)).scalar()
+            rows = self.db.execute(
+                select(combined).order_by(combined.c.created_at.desc(), combined.c.id.desc())
+                .offset((page - 1) * per_page).limit(per_page)
+            ).all()
+            loaded = {}
+            for archived, columns, record in (
+                (False, order_columns(), OrderRow),
+                (True, order_columns(ArchivedOrder) + [ArchivedOrder.archived_at], ArchivedOrderRow)
+            ):
+                ids = [row.id for row in rows if bool(row.archived) == archived]
+                if ids:
+                    loaded[archived] = {
+                        values[0]: record.from_row(values)
+                        for values in self.db.execute(select(*columns).where(columns[0].in_(ids)))
+                    }
+        
+        with RequestTiming.timed('serialize'):
+            orders = [loaded[bool(row.archived)][row.id] for row in rows]
+            if fields:
+                orders = [project(order, fields, OrderRow) for order in orders]
+        
+        return {
+            'orders': orders,
+            'total': total,
+            'page': page,
+            'per_page': per_page,
+            'pages': (total + per_page - 1) // per_page
+        }
+    
+    def get_orders_by_ids(self, ids: Sequence[int], fields: Tuple[str, ...] = None,
+                          include_archived: bool = False) -> Dict:
+        """
+        按ID批量读取订单（每张表一次 IN 查询，只查询所需列）
+        
+        Args:
+            ids: 订单ID（按此顺序返回，重复的只返回一次）
+            fields: 只返回这些字段（默认全部）
+            include_archived: 主表中不存在的ID再到归档表中查找
+        
+        Returns:
+            Dict: {'orders': 行记录列表, 'missing': 不存在的ID}
+        """
+        ids = list(dict.fromkeys(ids))
+        found = {}
+        sources = ((Order, OrderRow), (ArchivedOrder, ArchivedOrderRow)) if include_archived else ((Order, OrderRow),)
+        with RequestTiming.timed('db'):
+            for model, base in sources:
+                pending = [order_id for order_id in ids if order_id not in found]
+                if not pending:
+                    break
+                if fields:
+                    record = projected_type(OrderRow, fields)
+                    columns = [getattr(model, name) for name in fields]
+                else:
+                    record = base
+                    columns = order_columns(model) + ([model.archived_at] if model is ArchivedOrder else [])
+                for row in self.db.execute(select(model.id, *columns).where(model.id.in_(pending))):
+                    found[row[0]] = record.from_row(row[1:])
+        
+        return {
+            'orders': [found[order_id] for order_id in ids if order_id in found],
+            'missing': [order_id for order_id in ids if order_id not in found]
+        }
+    
+    # 导出列（与 iter_export_rows 的列顺序一致）
+    EXPORT_HEADERS = ['id', 'customer', 'vehicle_model', 'quantity', 'due_date',
+                      'status', 'vin_prefix', 'created_at', 'updated_at']
+    
+    def iter_export_rows(self, search: str = None, batch_size: int = 1000,
+                         include_archived: bool = False) -> Iterator[tuple]:
+        """
+        流式读取导出行（只查询所需列，按批从游标读取，不构造ORM对象）
+        
+        Args:
+            include_archived: 是否包含已归档的订单（与列表相同，主表与归档表 UNION ALL 合并）
+        """
+        def export_query(model):
+            return self._apply_search(select(
+                model.id, model.customer, model.vehicle_model, model.quantity, model.due_date,
+                model.status, model.vin_prefix, model.created_at, model.updated_at
+            ), search, model)
+        
+        if include_archived:
+            combined = union_all(export_query(Order), export_query(ArchivedOrder)).subquery()
+            query = select(combined).order_by(combined.c.created_at.desc(), combined.c.id.desc())
+        else:
+            query = export_query(Order).order_by(Order.created_at.desc())
+        for row in self.db.execute(query, execution_options={'yield_per': batch_size}):
+            yield tuple(row)
+    
     def update_order(self, order_id: int, order_data: Dict) -> Optional[Order]:
         """
         更新订单信息
@@ -80,6 +222,7 @@ class OrderService:
             order = self.get_order_by_id(order_id)
             if not order:
                 return None
+            previous = order.status
             
             # 更新字段
             if 'customer' in order_data:
@@ -98,7 +241,10 @@ class OrderService:
             order.updated_at = datetime.now()
             
             self.db.commit()
+            identity_cache.invalidate('order', order_id)
             self.db.refresh(order)
+            AutocompleteService.on_order_saved(order)
+            event_bus.publish('order', {'id': order_id, 'status': order.status, 'previous': previous})
             
             return order
         except Exception as e:
@@ -113,9 +259,14 @@ class OrderService:
             order = self.get_order_by_id(order_id)
             if not order:
                 return False
+            previous = order.status
             
             self.db.delete(order)
+            ChangeService.record_deletions(self.db, 'orders', [order_id])
             self.db.commit()
+            identity_cache.invalidate('order', order_id)
+            AutocompleteService.on_order_deleted(order_id)
+            event_bus.publish('order', {'id': order_id, 'status': None, 'previous': previous})
             
             return True
         except Exception as e:
@@ -133,26 +284,42 @@ class OrderService:
             order = self.get_order_by_id(order_id)
             if not order:
                 return None
+            previous = order.status
             
             order.status = status
             order.updated_at = datetime.now()
             
             self.db.commit()
+            identity_cache.invalidate('order', order_id)
             self.db.refresh(order)
+            AutocompleteService.on_order_saved(order)
+            event_bus.publish('order', {'id': order_id, 'status': status, 'previous': previous})
             
             return order
         except Exception as e:
             self.db.rollback()
             raise Exception(f"更新订单状态失败: {str(e)}")
     
-    def get_order_statistics(self) -> Dict:
+    def get_order_statistics(self, include_archived: bool = False) -> Dict:
         """
         获取订单统计信息
+        
+        Args:
+            include_archived: 是否计入已归档的订单
         """
-        total_orders = self.db.query(Order).count()
-        new_orders = self.db.query(Order).filter(Order.status == 'NEW').count()
-        review_orders = self.db.query(Order).filter(Order.status == 'REVIEW').count()
-        completed_orders = self.db.query(Order).filter(Order.status == 'COMPLETED').count()
+        with RequestTiming.timed('db'):
+            total_orders = self.db.query(Order).count()
+            new_orders = self.db.query(Order).filter(Order.status == 'NEW').count()
+            review_orders = self.db.query(Order).filter(Order.status == 'REVIEW').count()
+            completed_orders = self.db.query(Order).filter(Order.status == 'COMPLETED').count()
+            
+            if include_archived:
+                archived = dict(self.db.query(ArchivedOrder.status, func.count(ArchivedOrder.id))
+                                .group_by(ArchivedOrder.status).all())
+                total_orders += sum(archived.values())
+                new_orders += archived.get('NEW', 0)
+                review_orders += archived.get('REVIEW', 0)
+                completed_orders += archived.get('COMPLETED', 0)
         
         return {
             'total': total_orders,
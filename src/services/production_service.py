@@ -2,13 +2,22 @@
 """
 生产计划业务逻辑服务
 """
-from typing import List, Dict, Optional
+from typing import List, Dict, Iterator, Mapping, Optional, Sequence, Tuple
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, func, select, literal, union_all
 from src.models.production_model import ProductionPlan
 from src.models.order_model import Order
-from src.config import PRODUCTION_STATUS
+from src.models.archive_model import ArchivedOrder, ArchivedProductionPlan
+from src.models.row_records import (ORDER_FIELDS, PlanRow, plan_columns, order_columns, plan_row,
+                                   projected_type, project)
+from src.services.autocomplete_service import AutocompleteService
+from src.services.change_service import ChangeService
+from src.utils.request_timing import RequestTiming
+from src.utils.identity_cache import identity_cache
+from src.utils.event_bus import event_bus
+from src.utils.metrics import SCHEDULER_RUN_SECONDS
+from src.config import PRODUCTION_STATUS, PRODUCTION_LINES, TIMELINE_MAX_BUCKETS
 
 class ProductionService:
     """
@@ -18,17 +27,23 @@ class ProductionService:
     def __init__(self, db: Session):
         self.db = db
     
+    def _plan_code_exists(self, plan_code: str, exclude_id: int = None) -> bool:
+        """
+        计划编号是否已被使用（主表的唯一约束不覆盖归档表，已归档计划的编号同样不可复用）
+        """
+        hot = select(ProductionPlan.id).where(ProductionPlan.plan_code == plan_code)
+        if exclude_id is not None:
+            hot = hot.where(ProductionPlan.id != exclude_id)
+        cold = select(ArchivedProductionPlan.id).where(ArchivedProductionPlan.plan_code == plan_code)
+        return self.db.execute(select(hot.exists() | cold.exists())).scalar()
+    
     def create_plan(self, plan_data: Dict) -> ProductionPlan:
         """
         创建新生产计划
         """
         try:
-            # 检查计划编号是否已存在
-            existing_plan = self.db.query(ProductionPlan).filter(
-                ProductionPlan.plan_code == plan_data.get('plan_code')
-            ).first()
-            
-            if existing_plan:
+            # 检查计划编号是否已存在（含已归档的计划）
+            if self._plan_code_exists(plan_data.get('plan_code')):
                 raise ValueError("计划编号已存在")
             
             # 检查订单是否存在
@@ -62,13 +77,16 @@ class ProductionService:
             self.db.add(plan)
             self.db.commit()
             self.db.refresh(plan)
+            AutocompleteService.on_plan_saved(plan)
+            event_bus.publish('plan', {'id': plan.id, 'status': plan.status, 'previous': None})
             
             return plan
         except Exception as e:
             self.db.rollback()
             raise Exception(f"创建生产计划失败: {str(e)}")
     
-    def _parse_datetime(self, datetime_str: str) -> datetime:
+    @staticmethod
+    def _parse_datetime(datetime_str: str) -> datetime:
         """
         解析时间字符串，支持多种格式
         """
@@ -127,13 +145,22 @@ class ProductionService:
         """
         return self.db.query(ProductionPlan).filter(ProductionPlan.id == plan_id).first()
     
-    def get_plans(self, page: int = 1, per_page: int = 20, search: str = None) -> Dict:
+    def get_plan_snapshot(self, plan_id: int) -> Optional[Mapping]:
         """
-        获取生产计划列表（分页）
+        根据ID获取生产计划的只读快照（经进程内缓存，用于展示；需要修改时使用 get_plan_by_id）
+
+        快照不含 order_info，订单修改时无需使计划失效；需要订单信息时用 OrderService.get_order_snapshot。
+        """
+        def load():
+            plan = self.get_plan_by_id(plan_id)
+            return plan.to_dict(include_order=False) if plan else None
+        return identity_cache.get_or_load('plan', plan_id, load)
+    
+    @staticmethod
+    def _apply_search(query, search: str = None):
+        """
+        计划编号或订单客户名称模糊搜索（列表页与导出共用，query 需已关联 Order）
         """
-        query = self.db.query(ProductionPlan).join(Order)
-        
-        # 计划编号或订单客户名称模糊搜索
         if search:
             query = query.filter(
                 or_(
@@ -141,21 +168,190 @@ class ProductionService:
                     Order.customer.like(f'%{search}%')
                 )
             )
+        return query
+    
+    @staticmethod
+    def _join_archived_orders(query, search: str = None):
+        """
+        归档计划关联订单（订单可能在主表或归档表）并按计划编号或客户名称搜索
+        """
+        query = query.outerjoin(Order, Order.id == ArchivedProductionPlan.order_id).outerjoin(
+            ArchivedOrder, ArchivedOrder.id == ArchivedProductionPlan.order_id
+        )
+        if search:
+            query = query.where(or_(
+                ArchivedProductionPlan.plan_code.like(f'%{search}%'),
+                Order.customer.like(f'%{search}%'),
+                ArchivedOrder.customer.like(f'%{search}%')
+            ))
+        return query
+    
+    def get_plans(self, page: int = 1, per_page: int = 20, search: str = None,
+                  include_archived: bool = False, fields: Tuple[str, ...] = None) -> Dict:
+        """
+        获取生产计划列表（分页）
+        
+        Args:
+            include_archived: 是否包含已归档的计划（历史查询）
+            fields: 只返回这些字段（默认全部，order_info 为嵌套的订单信息）
+        """
+        if include_archived:
+            return self._get_plans_with_archive(page, per_page, search, fields)
         
-        # 总数
-        total = query.count()
+        query = self._apply_search(
+            self.db.query(ProductionPlan.id).join(Order, ProductionPlan.order_id == Order.id), search)
+        
+        with RequestTiming.timed('db'):
+            # 总数
+            total = query.count()
+            
+            # 分页查询：计划列与订单列在同一 JOIN 中读取为行记录（order_info 为嵌套订单记录）
+            rows = query.with_entities(*plan_columns(), *order_columns()).order_by(
+                ProductionPlan.created_at.desc()
+            ).offset((page - 1) * per_page).limit(per_page).all()
         
-        # 分页查询
-        plans = query.order_by(ProductionPlan.created_at.desc()).offset((page - 1) * per_page).limit(per_page).all()
+        with RequestTiming.timed('serialize'):
+            plans = [plan_row(row) for row in rows]
+            if fields:
+                plans = [project(plan, fields) for plan in plans]
         
         return {
-            'plans': [plan.to_dict() for plan in plans],
+            'plans': plans,
             'total': total,
             'page': page,
             'per_page': per_page,
             'pages': (total + per_page - 1) // per_page
         }
     
+    def _get_plans_with_archive(self, page: int, per_page: int, search: str = None,
+                                fields: Tuple[str, ...] = None) -> Dict:
+        """
+        主表与归档表合并分页：UNION ALL 只取ID和排序列，再按ID读取当前页的行记录
+        """
+        hot = self._apply_search(
+            select(ProductionPlan.id, ProductionPlan.created_at, literal(False).label('archived')).join(Order),
+            search
+        )
+        cold = select(ArchivedProductionPlan.id, ArchivedProductionPlan.created_at, literal(True).label('archived'))
+        if search:
+            cold = self._join_archived_orders(cold, search)
+        combined = union_all(hot, cold).subquery()
+        
+        with RequestTiming.timed('db'):
+            total = self.db.execute(select(func.count()).select_from(combined)).scalar()
+            rows = self.db.execute(
+                select(combined).order_by(combined.c.created_at.desc(), combined.c.id.desc())
+                .offset((page - 1) * per_page).limit(per_page)
+            ).all()
+            loaded = {archived: self._load_plan_rows([row.id for row in rows if bool(row.archived) == archived],
+                                                     archived)
+                      for archived in (False, True)}
+        
+        with RequestTiming.timed('serialize'):
+            plans = [loaded[bool(row.archived)][row.id] for row in rows]
+            if fields:
+                plans = [project(plan, fields, PlanRow) for plan in plans]
+        
+        return {
+            'plans': plans,
+            'total': total,
+            'page': page,
+            'per_page': per_page,
+            'pages': (total + per_page - 1) // per_page
+        }
+    
+    def _load_plan_rows(self, ids: Sequence[int], archived: bool = False) -> Dict:
+        """
+        按ID读取计划行记录（含订单信息），返回 {ID: 记录}
+        """
+        if not ids:
+            return {}
+        if not archived:
+            statement = (
+                select(*plan_columns(), *order_columns())
+                .outerjoin(Order, Order.id == ProductionPlan.order_id)
+                .where(ProductionPlan.id.in_(ids))
+            )
+        else:
+            # 归档计划的订单在主表或归档表中的一个，逐列取非空值
+            order_values = [func.coalesce(getattr(Order, name), getattr(ArchivedOrder, name))
+                            for name in ORDER_FIELDS]
+            statement = (
+                select(*plan_columns(ArchivedProductionPlan), *order_values, ArchivedProductionPlan.archived_at)
+                .outerjoin(Order, Order.id == ArchivedProductionPlan.order_id)
+                .outerjoin(ArchivedOrder, ArchivedOrder.id == ArchivedProductionPlan.order_id)
+                .where(ArchivedProductionPlan.id.in_(ids))
+            )
+        return {values[0]: plan_row(values, archived=archived) for values in self.db.execute(statement)}
+    
+    def get_plans_by_ids(self, ids: Sequence[int], fields: Tuple[str, ...] = None,
+                         include_archived: bool = False) -> Dict:
+        """
+        按ID批量读取生产计划（每张表一次 IN 查询；不需要 order_info 时只查询计划表的所需列）
+        
+        Args:
+            ids: 计划ID（按此顺序返回，重复的只返回一次）
+            fields: 只返回这些字段（默认全部）
+            include_archived: 主表中不存在的ID再到归档表中查找
+        
+        Returns:
+            Dict: {'plans': 行记录列表, 'missing': 不存在的ID}
+        """
+        ids = list(dict.fromkeys(ids))
+        found = {}
+        with RequestTiming.timed('db'):
+            for archived in ((False, True) if include_archived else (False,)):
+                pending = [plan_id for plan_id in ids if plan_id not in found]
+                if not pending:
+                    break
+                if fields and 'order_info' not in fields:
+                    model = ArchivedProductionPlan if archived else ProductionPlan
+                    record = projected_type(PlanRow, fields)
+                    columns = [getattr(model, name) for name in fields]
+                    for row in self.db.execute(select(model.id, *columns).where(model.id.in_(pending))):
+                        found[row[0]] = record.from_row(row[1:])
+                else:
+                    for plan_id, plan in self._load_plan_rows(pending, archived).items():
+                        found[plan_id] = project(plan, fields, PlanRow) if fields else plan
+        
+        return {
+            'plans': [found[plan_id] for plan_id in ids if plan_id in found],
+            'missing': [plan_id for plan_id in ids if plan_id not in found]
+        }
+    
+    # 导出列（与 iter_export_rows 的列顺序一致）
+    EXPORT_HEADERS = ['id', 'plan_code', 'order_id', 'customer', 'vehicle_model', 'line',
+                      'start_time', 'end_time', 'status', 'created_at']
+    
+    def iter_export_rows(self, search: str = None, batch_size: int = 1000,
+                         include_archived: bool = False) -> Iterator[tuple]:
+        """
+        流式读取导出行（只查询所需列，按批从游标读取，不构造ORM对象）
+        
+        Args:
+            include_archived: 是否包含已归档的计划（与列表相同，主表与归档表 UNION ALL 合并）
+        """
+        query = self._apply_search(select(
+            ProductionPlan.id, ProductionPlan.plan_code, ProductionPlan.order_id,
+            Order.customer, Order.vehicle_model, ProductionPlan.line,
+            ProductionPlan.start_time, ProductionPlan.end_time, ProductionPlan.status,
+            ProductionPlan.created_at
+        ).join(Order, ProductionPlan.order_id == Order.id), search)
+        if include_archived:
+            cold = self._join_archived_orders(select(
+                ArchivedProductionPlan.id, ArchivedProductionPlan.plan_code, ArchivedProductionPlan.order_id,
+                func.coalesce(Order.customer, ArchivedOrder.customer),
+                func.coalesce(Order.vehicle_model, ArchivedOrder.vehicle_model), ArchivedProductionPlan.line,
+                ArchivedProductionPlan.start_time, ArchivedProductionPlan.end_time, ArchivedProductionPlan.status,
+                ArchivedProductionPlan.created_at
+            ), search)
+            combined = union_all(query, cold).subquery()
+            query = select(combined).order_by(combined.c.created_at.desc(), combined.c.id.desc())
+        else:
+            query = query.order_by(ProductionPlan.created_at.desc())
+        for row in self.db.execute(query, execution_options={'yield_per': batch_size}):
+            yield tuple(row)
+    
     def update_plan(self, plan_id: int, plan_data: Dict) -> Optional[ProductionPlan]:
         """
         更新生产计划信息
@@ -164,15 +360,11 @@ class ProductionService:
             plan = self.get_plan_by_id(plan_id)
             if not plan:
                 return None
+            previous = plan.status
             
             # 检查计划编号是否与其他记录冲突
             if 'plan_code' in plan_data and plan_data['plan_code'] != plan.plan_code:
-                existing_plan = self.db.query(ProductionPlan).filter(
-                    ProductionPlan.plan_code == plan_data['plan_code'],
-                    ProductionPlan.id != plan_id
-                ).first()
-                
-                if existing_plan:
+                if self._plan_code_exists(plan_data['plan_code'], exclude_id=plan_id):
                     raise ValueError("计划编号已存在")
             
             # 更新字段
@@ -196,7 +388,10 @@ class ProductionService:
             plan.updated_at = datetime.now()
             
             self.db.commit()
+            identity_cache.invalidate('plan', plan_id)
             self.db.refresh(plan)
+            AutocompleteService.on_plan_saved(plan)
+            event_bus.publish('plan', {'id': plan.id, 'status': plan.status, 'previous': previous})
             
             return plan
         except Exception as e:
@@ -211,9 +406,14 @@ class ProductionService:
             plan = self.get_plan_by_id(plan_id)
             if not plan:
                 return False
+            previous = plan.status
             
             self.db.delete(plan)
+            ChangeService.record_deletions(self.db, 'plans', [plan_id])
             self.db.commit()
+            identity_cache.invalidate('plan', plan_id)
+            AutocompleteService.on_plan_deleted(plan_id)
+            event_bus.publish('plan', {'id': plan_id, 'status': None, 'previous': previous})
             
             return True
         except Exception as e:
@@ -231,12 +431,16 @@ class ProductionService:
             plan = self.get_plan_by_id(plan_id)
             if not plan:
                 return None
+            previous = plan.status
             
             plan.status = status
             plan.updated_at = datetime.now()
             
             self.db.commit()
+            identity_cache.invalidate('plan', plan_id)
             self.db.refresh(plan)
+            AutocompleteService.on_plan_saved(plan)
+            event_bus.publish('plan', {'id': plan.id, 'status': plan.status, 'previous': previous})
             
             return plan
         except Exception as e:
@@ -247,6 +451,10 @@ class ProductionService:
         """
         自动生成生产计划（简单贪心算法）
         """
+        with SCHEDULER_RUN_SECONDS.labels('generate_plan').time():
+            return self._generate_production_plan(order_id)
+    
+    def _generate_production_plan(self, order_id: int) -> ProductionPlan:
         try:
             # 获取订单信息
             order = self.db.query(Order).filter(Order.id == order_id).first()
@@ -254,7 +462,7 @@ class ProductionService:
                 raise ValueError("订单不存在")
             
             # 获取可用生产线
-            lines = ['Line-A', 'Line-B', 'Line-C', 'Line-D', 'Line-E']
+            lines = PRODUCTION_LINES
             
             # 计算生产时间（根据数量估算）
             production_hours = order.quantity * 2  # 每台车2小时
@@ -308,21 +516,36 @@ class ProductionService:
             self.db.add(plan)
             self.db.commit()
             self.db.refresh(plan)
+            AutocompleteService.on_plan_saved(plan)
+            event_bus.publish('plan', {'id': plan.id, 'status': plan.status, 'previous': None})
             
             return plan
         except Exception as e:
             self.db.rollback()
             raise Exception(f"生成生产计划失败: {str(e)}")
     
-    def get_production_statistics(self) -> Dict:
+    def get_production_statistics(self, include_archived: bool = False) -> Dict:
         """
         获取生产统计信息
+        
+        Args:
+            include_archived: 是否计入已归档的计划
         """
-        total_plans = self.db.query(ProductionPlan).count()
-        planned_plans = self.db.query(ProductionPlan).filter(ProductionPlan.status == 'PLANNED').count()
-        in_progress_plans = self.db.query(ProductionPlan).filter(ProductionPlan.status == 'IN_PROGRESS').count()
-        completed_plans = self.db.query(ProductionPlan).filter(ProductionPlan.status == 'COMPLETED').count()
-        cancelled_plans = self.db.query(ProductionPlan).filter(ProductionPlan.status == 'CANCELLED').count()
+        with RequestTiming.timed('db'):
+            total_plans = self.db.query(ProductionPlan).count()
+            planned_plans = self.db.query(ProductionPlan).filter(ProductionPlan.status == 'PLANNED').count()
+            in_progress_plans = self.db.query(ProductionPlan).filter(ProductionPlan.status == 'IN_PROGRESS').count()
+            completed_plans = self.db.query(ProductionPlan).filter(ProductionPlan.status == 'COMPLETED').count()
+            cancelled_plans = self.db.query(ProductionPlan).filter(ProductionPlan.status == 'CANCELLED').count()
+            
+            if include_archived:
+                archived = dict(self.db.query(ArchivedProductionPlan.status, func.count(ArchivedProductionPlan.id))
+                                .group_by(ArchivedProductionPlan.status).all())
+                total_plans += sum(archived.values())
+                planned_plans += archived.get('PLANNED', 0)
+                in_progress_plans += archived.get('IN_PROGRESS', 0)
+                completed_plans += archived.get('COMPLETED', 0)
+                cancelled_plans += archived.get('CANCELLED', 0)
         
         return {
             'total': total_plans,
@@ -332,3 +555,115 @@ class ProductionService:
             'cancelled': cancelled_plans,
             'completion_rate': round(completed_plans / total_plans * 100, 2) if total_plans > 0 else 0
         }
+    
+    def get_plan_distribution(self) -> Dict:
+        """
+        按状态、生产线统计计划数量（数据库聚合，不加载计划明细）
+        """
+        with RequestTiming.timed('db'):
+            status_rows = self.db.query(
+                ProductionPlan.status, func.count(ProductionPlan.id)
+            ).group_by(ProductionPlan.status).all()
+            line_rows = self.db.query(
+                ProductionPlan.line, func.count(ProductionPlan.id)
+            ).group_by(ProductionPlan.line).all()
+        
+        return {
+            'status': {status: count for status, count in status_rows},
+            'line': {line: count for line, count in line_rows}
+        }
+    
+    def get_timeline(self, start: datetime, end: datetime, resolution: int = None,
+                     lines: List[str] = None, max_buckets: int = TIMELINE_MAX_BUCKETS) -> Dict:
+        """
+        获取时间窗口内的甘特时间轴数据
+        
+        只查询与 [start, end) 重叠的计划（走 line/start_time/end_time 索引）。
+        窗口按 resolution 秒切成时间格，同一生产线上落入相同时间格的相邻计划合并为一个桶，
+        因此每条生产线最多返回 (end - start) / resolution 个条目；
+        桶内只有一个计划时返回计划明细。
+        """
+        if end <= start:
+            raise ValueError("结束时间必须晚于开始时间")
+        
+        window_seconds = (end - start).total_seconds()
+        if not resolution:
+            resolution = max(int(window_seconds // max_buckets), 60)
+        # 限制时间格数量，保证返回数据量有上界
+        resolution = max(int(resolution), int(window_seconds // max_buckets) + 1)
+        
+        query = self.db.query(
+            ProductionPlan.id,
+            ProductionPlan.plan_code,
+            ProductionPlan.order_id,
+            ProductionPlan.line,
+            ProductionPlan.start_time,
+            ProductionPlan.end_time,
+            ProductionPlan.status
+        ).filter(
+            ProductionPlan.start_time < end,
+            ProductionPlan.end_time > start,
+            ProductionPlan.status != 'CANCELLED'
+        )
+        if lines:
+            query = query.filter(ProductionPlan.line.in_(lines))
+        query = query.order_by(ProductionPlan.line, ProductionPlan.start_time)
+        
+        def to_bin(moment: datetime) -> int:
+            return int((moment - start).total_seconds() // resolution)
+        
+        items = []
+        plan_total = 0
+        bucket = None
+        for row in query.yield_per(2000):
+            plan_total += 1
+            first_bin = to_bin(max(row.start_time, start))
+            last_bin = to_bin(min(row.end_time, end) - timedelta(microseconds=1))
+            
+            if bucket and bucket['line'] == row.line and first_bin <= bucket['last_bin']:
+                bucket['end'] = max(bucket['end'], row.end_time)
+                bucket['last_bin'] = max(bucket['last_bin'], last_bin)
+                bucket['count'] += 1
+                bucket['status_counts'][row.status] = bucket['status_counts'].get(row.status, 0) + 1
+                continue
+            
+            if bucket:
+                items.append(self._timeline_item(bucket))
+            bucket = {'line': row.line, 'start': row.start_time, 'end': row.end_time,
+                      'last_bin': last_bin, 'first': row, 'count': 1, 'status_counts': {row.status: 1}}
+        if bucket:
+            items.append(self._timeline_item(bucket))
+        
+        return {
+            'start': start.strftime('%Y-%m-%d %H:%M:%S'),
+            'end': end.strftime('%Y-%m-%d %H:%M:%S'),
+            'resolution': resolution,
+            'plan_total': plan_total,
+            'items': items
+        }
+    
+    def _timeline_item(self, bucket: Dict) -> Dict:
+        """
+        将时间桶转换为返回格式
+        """
+        if bucket['count'] == 1:
+            plan = bucket['first']
+            return {
+                'type': 'plan',
+                'id': plan.id,
+                'plan_code': plan.plan_code,
+                'order_id': plan.order_id,
+                'line': plan.line,
+                'start': plan.start_time.strftime('%Y-%m-%d %H:%M:%S'),
+                'end': plan.end_time.strftime('%Y-%m-%d %H:%M:%S'),
+                'status': plan.status
+            }
+        
+        return {
+            'type': 'bucket',
+            'line': bucket['line'],
+            'start': bucket['start'].strftime('%Y-%m-%d %H:%M:%S'),
+            'end': bucket['end'].strftime('%Y-%m-%d %H:%M:%S'),
+            'count': bucket['count'],
+            'status_counts': bucket['status_counts']
+        }
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+订单交期风险服务
+一次查询取出所有未完成订单及其计划最晚结束时间，用NumPy整体计算交期余量
+"""
+from typing import Dict
+from datetime import datetime
+import numpy as np
+from sqlalchemy import and_, func
+from sqlalchemy.orm import Session
+from src.models.order_model import Order
+from src.models.production_model import ProductionPlan
+from src.models.row_records import record_type, DATE_FORMAT, DATETIME_FORMAT
+from src.config import RISK_SLACK_THRESHOLD_DAYS
+
+SECONDS_PER_DAY = 86400
+
+# 风险订单记录（时间保留原值：按行输出时格式化为字符串，列式输出时为时间戳）
+RiskRow = record_type(
+    'RiskRow',
+    ('order_id', 'customer', 'vehicle_model', 'quantity', 'status', 'due_date', 'planned_end',
+     'slack_days', 'unplanned'),
+    {'due_date': DATE_FORMAT, 'planned_end': DATETIME_FORMAT}
+)
+
+
+class RiskService:
+    """
+    交期风险服务类
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_due_date_risk(self, threshold_days: float = RISK_SLACK_THRESHOLD_DAYS,
+                          limit: int = 100) -> Dict:
+        """
+        计算未完成订单的交期余量（天）= 交期 - 计划最晚结束时间
+
+        余量小于 threshold_days 或尚未排产的订单视为有风险；未排产订单以当前时间计算余量。
+        准时交付率 = 已排产订单中余量 >= 0 的比例
+        """
+        rows = self.db.query(
+            Order.id,
+            Order.customer,
+            Order.vehicle_model,
+            Order.quantity,
+            Order.due_date,
+            Order.status,
+            func.max(ProductionPlan.end_time).label('planned_end')
+        ).outerjoin(
+            ProductionPlan,
+            and_(ProductionPlan.order_id == Order.id, ProductionPlan.status != 'CANCELLED')
+        ).filter(
+            Order.status != 'COMPLETED'
+        ).group_by(Order.id).all()
+
+        if not rows:
+            return {
+                'total_open': 0,
+                'planned': 0,
+                'unplanned': 0,
+                'late': 0,
+                'at_risk_count': 0,
+                'on_time_rate': 0,
+                'threshold_days': threshold_days,
+                'at_risk': []
+            }
+
+        id_col, customer_col, model_col, quantity_col, due_col, status_col, end_col = zip(*rows)
+        due = np.array(due_col, dtype='datetime64[s]')
+        planned_end = np.array(end_col, dtype='datetime64[s]')
+        now = np.datetime64(datetime.now(), 's')
+
+        planned = ~np.isnat(planned_end)
+        reference = np.where(planned, planned_end, now)
+        slack_days = (due - reference).astype(np.float64) / SECONDS_PER_DAY
+
+        late = planned & (slack_days < 0)
+        at_risk = ~planned | (slack_days < threshold_days)
+        planned_count = int(np.count_nonzero(planned))
+        on_time_rate = round((planned_count - int(np.count_nonzero(late))) / planned_count * 100, 2) \
+            if planned_count else 0
+
+        # 余量最小的在前，只对有风险的订单排序
+        risk_idx = np.flatnonzero(at_risk)
+        risk_idx = risk_idx[np.argsort(slack_days[risk_idx], kind='stable')][:limit]
+
+        at_risk_orders = [
+            RiskRow.from_row((id_col[i], customer_col[i], model_col[i], quantity_col[i], status_col[i],
+                              due_col[i], end_col[i], round(float(slack_days[i]), 2), not planned[i]))
+            for i in risk_idx
+        ]
+
+        return {
+            'total_open': len(rows),
+            'planned': planned_count,
+            'unplanned': len(rows) - planned_count,
+            'late': int(np.count_nonzero(late)),
+            'at_risk_count': int(np.count_nonzero(at_risk)),
+            'on_time_rate': on_time_rate,
+            'threshold_days': threshold_days,
+            'at_risk': at_risk_orders
+        }
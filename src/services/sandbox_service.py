@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+"""
+排程沙盘服务
+在内存快照上应用假设变更（停线、插单、取消计划）并重新排程，不写数据库
+"""
+from typing import Dict, List
+from datetime import datetime, timedelta
+import time
+import numpy as np
+from sqlalchemy.orm import Session
+from src.services.schedule_snapshot import (
+    ScheduleSnapshot, PLAN_STATUS_CODES, ORDER_STATUS_CODES,
+    datetimes_to_seconds, seconds_to_datetime
+)
+from src.services.production_service import ProductionService
+from src.utils.metrics import SCHEDULER_RUN_SECONDS
+
+# 与 generate_production_plan 保持一致的排程参数
+HOURS_PER_VEHICLE = 2
+PLAN_GAP_SECONDS = 3600
+RUSH_RELEASE_DELAY = timedelta(days=1)
+
+# 进行中/已完成的计划不参与重排
+FIXED_STATUS_CODES = [PLAN_STATUS_CODES.index('IN_PROGRESS'), PLAN_STATUS_CODES.index('COMPLETED')]
+COMPLETED_ORDER_CODE = ORDER_STATUS_CODES.index('COMPLETED')
+
+
+def pack_sequence(release: np.ndarray, duration: np.ndarray) -> np.ndarray:
+    """
+    同一生产线按顺序串行排程，返回各计划开始时间
+
+    递推式 s[i] = max(release[i], s[i-1] + duration[i-1]) 展开为
+    s[i] = max_{j<=i}(release[j] - C[j]) + C[i]，其中 C 为工期的前缀和（不含自身）
+    """
+    if not len(release):
+        return release.copy()
+    offset = np.concatenate(([0], np.cumsum(duration[:-1])))
+    return np.maximum.accumulate(release - offset) + offset
+
+
+def merge_intervals(starts: np.ndarray, ends: np.ndarray):
+    """
+    合并重叠/相接的时间段，返回按开始时间排序、互不重叠的 (starts, ends)
+    """
+    if not len(starts):
+        return starts, ends
+    order = np.argsort(starts, kind='stable')
+    starts, ends = starts[order], ends[order]
+    reach = np.maximum.accumulate(ends)
+    # 开始时间晚于之前所有时段的最晚结束时间，即为新的一段
+    first = np.concatenate(([True], starts[1:] > reach[:-1]))
+    group = np.cumsum(first) - 1
+    merged_ends = np.full(int(group[-1]) + 1, np.iinfo(np.int64).min, dtype=np.int64)
+    np.maximum.at(merged_ends, group, ends.astype(np.int64))
+    return starts[first], merged_ends.astype(ends.dtype)
+
+
+def schedule_line(release: np.ndarray, duration: np.ndarray, fixed: np.ndarray, windows: List) -> np.ndarray:
+    """
+    单条生产线排程，返回各计划开始时间
+
+    进行中/已完成的计划（fixed）保持原开始时间，与停线窗口一起作为占用时段；
+    可调计划按原顺序串行压缩，与占用时段重叠的推迟到该时段结束。
+    计划只会被推迟，与占用时段重叠的计划不可能再提前到时段之前，因此每轮可同时推迟所有冲突的计划。
+    """
+    start = release.copy()
+    movable = ~fixed
+    if not movable.any():
+        return start
+
+    block_start = np.concatenate((release[fixed], np.array([w[0] for w in windows], dtype=release.dtype)))
+    block_end = np.concatenate((release[fixed] + duration[fixed],
+                                np.array([w[1] for w in windows], dtype=release.dtype)))
+    nonempty = block_end > block_start
+    block_start, block_end = merge_intervals(block_start[nonempty], block_end[nonempty])
+    movable_release = release[movable].copy()
+    movable_duration = duration[movable]
+    while True:
+        packed = pack_sequence(movable_release, movable_duration)
+        if not len(block_start):
+            break
+        # 第一个结束时间晚于计划开始的占用时段，若其开始早于计划结束即为冲突
+        idx = np.searchsorted(block_end, packed, side='right')
+        hit = idx < len(block_start)
+        hit[hit] = block_start[idx[hit]] < packed[hit] + movable_duration[hit]
+        if not hit.any():
+            break
+        movable_release[hit] = block_end[idx[hit]]
+    start[movable] = packed
+    return start
+
+
+class SchedulingSandbox:
+    """
+    排程沙盘
+
+    基于 ScheduleSnapshot 的副本运行，多次 run() 互不影响
+    """
+
+    def __init__(self, snapshot: ScheduleSnapshot, now: datetime = None):
+        self.snapshot = snapshot
+        self.now = datetimes_to_seconds([now or datetime.now()])[0]
+        self.downtimes = []        # [(line_idx, start, end)]
+        self.cancelled = np.zeros(snapshot.plan_count, dtype=bool)
+        self.rush_quantity = []
+        self.rush_due = []
+
+    def add_line_downtime(self, line: str, start: datetime, end: datetime):
+        """
+        假设某生产线在 [start, end) 停线
+        """
+        if end <= start:
+            raise ValueError("停线结束时间必须晚于开始时间")
+        start_s, end_s = datetimes_to_seconds([start, end])
+        self.downtimes.append((self.snapshot.line_index(line), start_s, end_s))
+
+    def add_rush_order(self, quantity: int, due_date: datetime):
+        """
+        假设接入一张新订单
+        """
+        if quantity <= 0:
+            raise ValueError("插单数量必须大于0")
+        self.rush_quantity.append(quantity)
+        self.rush_due.append(datetimes_to_seconds([due_date])[0])
+
+    def cancel_plans(self, plan_ids: List[int]):
+        """
+        假设取消指定计划
+        """
+        self.cancelled |= np.isin(self.snapshot.plan_ids, np.asarray(plan_ids, dtype=np.int64))
+
+    def run(self) -> Dict:
+        """
+        重新排程并计算KPI
+        """
+        snap = self.snapshot
+        keep = ~self.cancelled
+
+        line = snap.plan_line[keep]
+        release = snap.plan_start[keep].copy()
+        duration = np.maximum(snap.plan_end[keep] - snap.plan_start[keep], 0)
+        fixed = np.isin(snap.plan_status[keep], FIXED_STATUS_CODES)
+        order_idx = snap.plan_order[keep]
+
+        start = np.empty_like(release)
+        for line_idx in range(len(snap.lines)):
+            # 快照已按 (line, start) 排序，同线计划为连续区间
+            lo, hi = np.searchsorted(line, [line_idx, line_idx + 1])
+            if lo == hi:
+                continue
+            windows = [(s, e) for l, s, e in self.downtimes if l == line_idx]
+            start[lo:hi] = schedule_line(release[lo:hi], duration[lo:hi], fixed[lo:hi], windows)
+        end = start + duration
+        moved = int(np.count_nonzero(start != snap.plan_start[keep]))
+
+        # 插单：按交期先后，依次放到最早完工的生产线
+        rush_line, rush_start, rush_end = self._schedule_rush_orders(line, end)
+
+        all_line = np.concatenate((line, rush_line))
+        all_start = np.concatenate((start, rush_start))
+        all_end = np.concatenate((end, rush_end))
+        rush_idx = snap.order_count + np.arange(len(self.rush_quantity), dtype=np.int64)
+        all_order = np.concatenate((order_idx, rush_idx))
+
+        kpis = self._compute_kpis(all_line, all_start, all_end, all_order)
+        kpis['moved_plans'] = moved
+        kpis['rush_orders'] = len(self.rush_quantity)
+        return kpis
+
+    def _schedule_rush_orders(self, line: np.ndarray, end: np.ndarray):
+        """
+        贪心安排插单，返回 (line, start, end) 数组
+        """
+        count = len(self.rush_quantity)
+        rush_line = np.zeros(count, dtype=line.dtype)
+        rush_start = np.zeros(count, dtype=np.int64)
+        rush_end = np.zeros(count, dtype=np.int64)
+        if not count:
+            return rush_line, rush_start, rush_end
+
+        release = self.now + int(RUSH_RELEASE_DELAY.total_seconds())
+        line_count = len(self.snapshot.lines)
+        line_free = np.full(line_count, release, dtype=np.int64)
+        if len(end):
+            busy_until = np.full(line_count, np.iinfo(np.int64).min, dtype=np.int64)
+            np.maximum.at(busy_until, line.astype(np.int64), end)
+            line_free = np.maximum(line_free, busy_until + PLAN_GAP_SECONDS)
+
+        for i in np.argsort(self.rush_due, kind='stable'):
+            duration = int(self.rush_quantity[i]) * HOURS_PER_VEHICLE * 3600
+            best_line, best_start = 0, None
+            for line_idx in range(line_count):
+                candidate = self._skip_downtime(line_idx, int(line_free[line_idx]), duration)
+                if best_start is None or candidate < best_start:
+                    best_line, best_start = line_idx, candidate
+            rush_line[i] = best_line
+            rush_start[i] = best_start
+            rush_end[i] = best_start + duration
+            line_free[best_line] = best_start + duration + PLAN_GAP_SECONDS
+        return rush_line, rush_start, rush_end
+
+    def _skip_downtime(self, line_idx: int, start: int, duration: int) -> int:
+        """
+        若 [start, start+duration) 落入停线窗口，顺延到窗口结束
+        """
+        windows = sorted((s, e) for l, s, e in self.downtimes if l == line_idx)
+        for window_start, window_end in windows:
+            if start < window_end and start + duration > window_start:
+                start = int(window_end)
+        return start
+
+    def _compute_kpis(self, line: np.ndarray, start: np.ndarray,
+                      end: np.ndarray, order_idx: np.ndarray) -> Dict:
+        """
+        计算完工时间跨度、延期订单数和各产线利用率
+        """
+        snap = self.snapshot
+        lines = snap.lines
+        if not len(start):
+            return {
+                'plan_count': 0,
+                'makespan_start': None,
+                'makespan_end': None,
+                'makespan_hours': 0,
+                'late_orders': 0,
+                'late_rush_orders': 0,
+                'late_order_ids': [],
+                'line_utilization': {name: 0 for name in lines}
+            }
+
+        horizon_start, horizon_end = int(start.min()), int(end.max())
+        horizon = max(horizon_end - horizon_start, 1)
+
+        # 订单完工时间 = 其所有计划的最晚结束时间
+        order_total = snap.order_count + len(self.rush_quantity)
+        missing = np.iinfo(np.int64).min
+        completion = np.full(order_total, missing, dtype=np.int64)
+        valid = order_idx >= 0
+        np.maximum.at(completion, order_idx[valid], end[valid])
+
+        due = np.concatenate((snap.order_due, np.asarray(self.rush_due, dtype=np.int64)))
+        open_orders = np.concatenate((
+            snap.order_status != COMPLETED_ORDER_CODE,
+            np.ones(len(self.rush_quantity), dtype=bool)
+        ))
+        late = (completion != missing) & open_orders & (completion > due)
+        late_existing = late[:snap.order_count]
+
+        # 延期最严重的订单在前
+        lateness = (completion - due)[:snap.order_count][late_existing]
+        late_ids = snap.order_ids[late_existing][np.argsort(-lateness, kind='stable')]
+
+        # 利用率 = 占用时长 / (时间跨度 - 停线时长)
+        busy = np.bincount(line.astype(np.int64), weights=(end - start).astype(np.float64),
+                           minlength=len(lines))
+        downtime = np.zeros(len(lines), dtype=np.float64)
+        for line_idx, window_start, window_end in self.downtimes:
+            overlap = min(window_end, horizon_end) - max(window_start, horizon_start)
+            downtime[line_idx] += max(overlap, 0)
+        available = np.maximum(horizon - downtime, 1)
+        utilization = np.round(busy / available * 100, 2)
+
+        return {
+            'plan_count': int(len(start)),
+            'makespan_start': seconds_to_datetime(horizon_start).strftime('%Y-%m-%d %H:%M:%S'),
+            'makespan_end': seconds_to_datetime(horizon_end).strftime('%Y-%m-%d %H:%M:%S'),
+            'makespan_hours': round(horizon / 3600, 2),
+            'late_orders': int(np.count_nonzero(late)),
+            'late_rush_orders': int(np.count_nonzero(late[snap.order_count:])),
+            'late_order_ids': late_ids[:50].tolist(),
+            'line_utilization': {name: float(utilization[i]) for i, name in enumerate(lines)}
+        }
+
+
+class SandboxService:
+    """
+    排程沙盘服务类
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def _items(scenario: Dict, key: str, item_type: type, type_name: str) -> List:
+        """
+        取出场景中的列表项并检查类型
+
+        Raises:
+            ValueError: 不是列表，或列表项类型不符
+        """
+        items = scenario.get(key) or []
+        if not isinstance(items, list):
+            raise ValueError(f"{key} 必须是数组")
+        for item in items:
+            if not isinstance(item, item_type) or isinstance(item, bool):
+                raise ValueError(f"{key} 的元素必须是{type_name}: {item!r}")
+        return items
+
+    @staticmethod
+    def _parse_time(value, name: str) -> datetime:
+        if not isinstance(value, str):
+            raise ValueError(f"{name} 必须是时间字符串")
+        return ProductionService._parse_datetime(value)
+
+    @staticmethod
+    def _parse_quantity(value) -> int:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"无效的插单数量: {value!r}")
+
+    def evaluate_scenario(self, scenario: Dict) -> Dict:
+        """
+        评估假设场景，返回基线与场景的KPI对比
+
+        scenario 格式:
+            {
+                "downtimes": [{"line": "Line-C", "start": "...", "end": "..."}],
+                "rush_orders": [{"quantity": 10, "due_date": "2025-10-01"}],
+                "cancel_plan_ids": [1, 2]
+            }
+
+        Raises:
+            ValueError: 场景格式或取值无效
+        """
+        downtimes = self._items(scenario, 'downtimes', dict, '对象')
+        rush_orders = self._items(scenario, 'rush_orders', dict, '对象')
+        cancel_plan_ids = self._items(scenario, 'cancel_plan_ids', int, '整数')
+
+        started = time.perf_counter()
+        snapshot = ScheduleSnapshot.load(self.db)
+        now = datetime.now()
+
+        baseline = SchedulingSandbox(snapshot, now=now).run()
+
+        sandbox = SchedulingSandbox(snapshot, now=now)
+        for downtime in downtimes:
+            sandbox.add_line_downtime(
+                downtime.get('line'),
+                self._parse_time(downtime.get('start'), 'start'),
+                self._parse_time(downtime.get('end'), 'end')
+            )
+        for rush_order in rush_orders:
+            sandbox.add_rush_order(
+                self._parse_quantity(rush_order.get('quantity', 0)),
+                self._parse_time(rush_order.get('due_date'), 'due_date')
+            )
+        if cancel_plan_ids:
+            sandbox.cancel_plans(cancel_plan_ids)
+        result = sandbox.run()
+        elapsed = time.perf_counter() - started
+        SCHEDULER_RUN_SECONDS.labels('sandbox').observe(elapsed)
+
+        return {
+            'baseline': baseline,
+            'scenario': result,
+            'delta': {
+                'makespan_hours': round(result['makespan_hours'] - baseline['makespan_hours'], 2),
+                'late_orders': result['late_orders'] - baseline['late_orders'],
+                'line_utilization': {
+                    line: round(result['line_utilization'][line] - baseline['line_utilization'][line], 2)
+                    for line in snapshot.lines
+                }
+            },
+            'elapsed_ms': round(elapsed * 1000, 1)
+        }
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+生产计划/订单的紧凑数组快照
+供排程沙盘、仿真、利用率等只读分析使用，不修改数据库
+"""
+from typing import List, Optional
+from datetime import datetime
+import numpy as np
+from sqlalchemy.orm import Session
+from src.models.production_model import ProductionPlan
+from src.models.order_model import Order
+from src.config import PRODUCTION_STATUS, ORDER_STATUS, PRODUCTION_LINES
+
+# 状态编码（数组中以下标存储）
+PLAN_STATUS_CODES = list(PRODUCTION_STATUS.keys())
+ORDER_STATUS_CODES = list(ORDER_STATUS.keys())
+
+
+def datetimes_to_seconds(values: List[Optional[datetime]]) -> np.ndarray:
+    """
+    将datetime列表转换为int64秒数组（空值为0）
+    """
+    if not values:
+        return np.zeros(0, dtype=np.int64)
+    return np.array(values, dtype='datetime64[s]').astype(np.int64)
+
+
+def seconds_to_datetime(seconds) -> datetime:
+    """
+    将秒数转换回datetime
+    """
+    return np.datetime64(int(seconds), 's').astype(datetime)
+
+
+class ScheduleSnapshot:
+    """
+    生产计划与订单快照
+
+    计划数组按 (line, start) 排序；plan_order 为订单数组下标，-1 表示订单不存在
+    """
+
+    def __init__(self, lines: List[str],
+                 plan_ids: np.ndarray, plan_line: np.ndarray, plan_order: np.ndarray,
+                 plan_start: np.ndarray, plan_end: np.ndarray, plan_status: np.ndarray,
+                 order_ids: np.ndarray, order_quantity: np.ndarray,
+                 order_due: np.ndarray, order_status: np.ndarray):
+        self.lines = lines
+        self.plan_ids = plan_ids
+        self.plan_line = plan_line
+        self.plan_order = plan_order
+        self.plan_start = plan_start
+        self.plan_end = plan_end
+        self.plan_status = plan_status
+        self.order_ids = order_ids
+        self.order_quantity = order_quantity
+        self.order_due = order_due
+        self.order_status = order_status
+
+    @property
+    def plan_count(self) -> int:
+        return len(self.plan_ids)
+
+    @property
+    def order_count(self) -> int:
+        return len(self.order_ids)
+
+    def line_index(self, line: str) -> int:
+        """
+        获取生产线下标，未知生产线抛出ValueError
+        """
+        try:
+            return self.lines.index(line)
+        except ValueError:
+            raise ValueError(f"未知的生产线: {line}")
+
+    def order_index(self, order_ids) -> np.ndarray:
+        """
+        将订单ID映射为订单数组下标，不存在的订单返回-1
+        """
+        order_ids = np.asarray(order_ids, dtype=np.int64)
+        if not self.order_count:
+            return np.full(len(order_ids), -1, dtype=np.int64)
+        pos = np.searchsorted(self.order_ids, order_ids)
+        pos = np.minimum(pos, self.order_count - 1)
+        return np.where(self.order_ids[pos] == order_ids, pos, -1)
+
+    @staticmethod
+    def load(db: Session, include_cancelled: bool = False) -> 'ScheduleSnapshot':
+        """
+        从数据库一次性读取计划和订单，构建快照
+        """
+        plan_query = db.query(
+            ProductionPlan.id,
+            ProductionPlan.line,
+            ProductionPlan.order_id,
+            ProductionPlan.start_time,
+            ProductionPlan.end_time,
+            ProductionPlan.status
+        )
+        if not include_cancelled:
+            plan_query = plan_query.filter(ProductionPlan.status != 'CANCELLED')
+        plan_rows = plan_query.all()
+
+        order_rows = db.query(
+            Order.id, Order.quantity, Order.due_date, Order.status
+        ).order_by(Order.id).all()
+
+        # 生产线：配置中的生产线在前，数据中出现的其他生产线追加在后
+        lines = list(PRODUCTION_LINES)
+        line_lookup = {line: i for i, line in enumerate(lines)}
+        for row in plan_rows:
+            if row.line not in line_lookup:
+                line_lookup[row.line] = len(lines)
+                lines.append(row.line)
+
+        plan_status_lookup = {status: i for i, status in enumerate(PLAN_STATUS_CODES)}
+        order_status_lookup = {status: i for i, status in enumerate(ORDER_STATUS_CODES)}
+
+        if order_rows:
+            order_id_col, quantity_col, due_col, order_status_col = zip(*order_rows)
+        else:
+            order_id_col, quantity_col, due_col, order_status_col = (), (), (), ()
+
+        snapshot = ScheduleSnapshot(
+            lines=lines,
+            plan_ids=np.zeros(0, dtype=np.int64),
+            plan_line=np.zeros(0, dtype=np.int16),
+            plan_order=np.zeros(0, dtype=np.int64),
+            plan_start=np.zeros(0, dtype=np.int64),
+            plan_end=np.zeros(0, dtype=np.int64),
+            plan_status=np.zeros(0, dtype=np.int8),
+            order_ids=np.array(order_id_col, dtype=np.int64),
+            order_quantity=np.array(quantity_col, dtype=np.int64),
+            order_due=datetimes_to_seconds(list(due_col)),
+            order_status=np.array([order_status_lookup.get(s, -1) for s in order_status_col], dtype=np.int8)
+        )
+
+        if plan_rows:
+            id_col, line_col, plan_order_col, start_col, end_col, status_col = zip(*plan_rows)
+            plan_line = np.array([line_lookup[line] for line in line_col], dtype=np.int16)
+            plan_start = datetimes_to_seconds(list(start_col))
+            order = np.lexsort((plan_start, plan_line))
+
+            snapshot.plan_ids = np.array(id_col, dtype=np.int64)[order]
+            snapshot.plan_line = plan_line[order]
+            snapshot.plan_order = snapshot.order_index(plan_order_col)[order]
+            snapshot.plan_start = plan_start[order]
+            snapshot.plan_end = datetimes_to_seconds(list(end_col))[order]
+            snapshot.plan_status = np.array(
+                [plan_status_lookup.get(s, -1) for s in status_col], dtype=np.int8
+            )[order]
+
+        return snapshot
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+生产线利用率服务
+将计划 (line, start, end) 读为NumPy数组，按小时/天/周分桶计算各生产线占用率
+"""
+from typing import Dict
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy.orm import Session
+from src.models.production_model import ProductionPlan
+from src.services.schedule_snapshot import datetimes_to_seconds
+from src.utils.request_timing import RequestTiming
+from src.config import PRODUCTION_LINES, TIMELINE_RESOLUTIONS
+
+# 单次计算允许的最大时间桶数
+MAX_UTILIZATION_BUCKETS = 20000
+
+BUCKET_LABEL_FORMATS = {
+    'hour': '%m-%d %H:00',
+    'day': '%m-%d',
+    'week': '%Y-%m-%d'
+}
+
+
+def compute_occupancy(line: np.ndarray, start: np.ndarray, end: np.ndarray,
+                      line_count: int, bucket_seconds: int, bucket_count: int,
+                      window_seconds: int = None) -> np.ndarray:
+    """
+    计算每条生产线在每个时间桶内被占用的秒数
+
+    时间以窗口起点为0的秒数表示。区间首尾两个不完整的桶用 np.add.at 累加实际重叠秒数，
+    中间的整桶用差分数组 +1/-1 标记后沿时间轴 cumsum 展开，整体无Python循环。
+
+    Args:
+        window_seconds: 窗口实际时长（默认为整数个桶）；窗口不是整数个桶时最后一个桶不完整，
+                        区间裁剪到窗口结束，占用秒数不超过该桶的实际时长
+
+    Returns:
+        形状为 (line_count, bucket_count) 的占用秒数矩阵
+    """
+    total = bucket_seconds * bucket_count if window_seconds is None else window_seconds
+    start = np.clip(start, 0, total)
+    end = np.clip(end, 0, total)
+    keep = end > start
+    line, start, end = line[keep], start[keep], end[keep]
+
+    busy = np.zeros((line_count, bucket_count), dtype=np.float64)
+    if not len(line):
+        return busy
+
+    first = start // bucket_seconds
+    last = (end - 1) // bucket_seconds
+
+    # 起止落在同一个桶内
+    same = first == last
+    np.add.at(busy, (line[same], first[same]), end[same] - start[same])
+
+    # 跨桶：首桶和末桶为部分占用
+    span = ~same
+    line, start, end, first, last = line[span], start[span], end[span], first[span], last[span]
+    np.add.at(busy, (line, first), (first + 1) * bucket_seconds - start)
+    np.add.at(busy, (line, last), end - last * bucket_seconds)
+
+    # 中间整桶：差分数组
+    diff = np.zeros((line_count, bucket_count + 1), dtype=np.int64)
+    np.add.at(diff, (line, first + 1), 1)
+    np.add.at(diff, (line, last), -1)
+    busy += np.cumsum(diff, axis=1)[:, :bucket_count] * bucket_seconds
+    return busy
+
+
+class UtilizationService:
+    """
+    生产线利用率服务类
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_line_utilization(self, start: datetime, end: datetime, granularity: str = 'day') -> Dict:
+        """
+        获取生产线 x 时间 的占用率矩阵（百分比）
+
+        占用率超过100表示同一生产线的计划存在时间重叠
+        """
+        if granularity not in TIMELINE_RESOLUTIONS:
+            raise ValueError(f"无效的时间粒度: {granularity}")
+        if end <= start:
+            raise ValueError("结束时间必须晚于开始时间")
+
+        bucket_seconds = TIMELINE_RESOLUTIONS[granularity]
+        window_seconds = int((end - start).total_seconds())
+        bucket_count = -(-window_seconds // bucket_seconds)
+        if bucket_count > MAX_UTILIZATION_BUCKETS:
+            raise ValueError("时间范围过大，请缩小范围或使用更粗的粒度")
+
+        with RequestTiming.timed('db'):
+            rows = self.db.query(
+                ProductionPlan.line, ProductionPlan.start_time, ProductionPlan.end_time
+            ).filter(
+                ProductionPlan.start_time < end,
+                ProductionPlan.end_time > start,
+                ProductionPlan.status != 'CANCELLED'
+            ).all()
+
+        lines = list(PRODUCTION_LINES)
+        line_lookup = {line: i for i, line in enumerate(lines)}
+        for row in rows:
+            if row.line not in line_lookup:
+                line_lookup[row.line] = len(lines)
+                lines.append(row.line)
+
+        if rows:
+            line_col, start_col, end_col = zip(*rows)
+            origin = datetimes_to_seconds([start])[0]
+            line_idx = np.array([line_lookup[line] for line in line_col], dtype=np.int64)
+            plan_start = datetimes_to_seconds(list(start_col)) - origin
+            plan_end = datetimes_to_seconds(list(end_col)) - origin
+        else:
+            line_idx = plan_start = plan_end = np.zeros(0, dtype=np.int64)
+
+        busy = compute_occupancy(line_idx, plan_start, plan_end, len(lines), bucket_seconds, bucket_count,
+                                 window_seconds)
+
+        # 最后一个桶可能不完整，按实际时长计算容量
+        capacity = np.full(bucket_count, bucket_seconds, dtype=np.float64)
+        capacity[-1] = window_seconds - (bucket_count - 1) * bucket_seconds
+        utilization = np.round(busy / capacity * 100, 1)
+
+        label_format = BUCKET_LABEL_FORMATS[granularity]
+        buckets = [(start + timedelta(seconds=i * bucket_seconds)).strftime(label_format)
+                   for i in range(bucket_count)]
+
+        return {
+            'granularity': granularity,
+            'start': start.strftime('%Y-%m-%d %H:%M:%S'),
+            'end': end.strftime('%Y-%m-%d %H:%M:%S'),
+            'lines': lines,
+            'buckets': buckets,
+            'utilization': utilization.tolist(),
+            'average': {line: float(np.round(busy[i].sum() / window_seconds * 100, 1))
+                        for i, line in enumerate(lines)}
+        }
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+冷数据归档命令
+
+把超过保留期的已完成订单和已完成/已取消生产计划分批移入归档表（orders_archive /
+production_plans_archive），主表只保留仍在流转的数据。每批单独提交并短暂停顿，
+可以在应用运行时执行；中途中断后重跑会从剩余数据继续。
+同时清理超过保留期的删除记录（增量同步用，CHANGES_TOMBSTONE_RETENTION_DAYS）。
+
+用法:
+    python -m src.tools.archive --dry-run
+    python -m src.tools.archive [--database sqlite:///data/ev_mes.db] [--retention-days 90] [--batch-size 1000]
+"""
+import argparse
+import os
+import sys
+import time
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='归档已结束的订单和生产计划')
+    parser.add_argument('--database', help='数据库URI（默认使用 EV_MES_DATABASE_URI 或配置文件中的数据库）')
+    parser.add_argument('--retention-days', type=int, help='保留天数（默认为配置中的 ARCHIVE_RETENTION_DAYS）')
+    parser.add_argument('--batch-size', type=int, help='每批移动的行数（默认为配置中的 ARCHIVE_BATCH_SIZE）')
+    parser.add_argument('--max-batches', type=int, help='每张表最多执行的批数（默认不限）')
+    parser.add_argument('--dry-run', action='store_true', help='只统计待归档的行数，不移动数据')
+    args = parser.parse_args(argv)
+
+    # 必须在导入数据库模块之前设置，引擎在导入时创建
+    if args.database:
+        os.environ['EV_MES_DATABASE_URI'] = args.database
+
+    from src.config import ARCHIVE_RETENTION_DAYS, ARCHIVE_BATCH_SIZE
+    from src.models.database import engine, session_factory
+    from src.models.migrations import run_migrations
+    from src.services.archive_service import ArchiveService
+    from src.services.change_service import ChangeService
+
+    run_migrations(engine)
+
+    db = session_factory()
+    try:
+        service = ArchiveService(db)
+        t = time.perf_counter()
+        result = service.run(
+            retention_days=args.retention_days if args.retention_days is not None else ARCHIVE_RETENTION_DAYS,
+            batch_size=args.batch_size or ARCHIVE_BATCH_SIZE,
+            max_batches=args.max_batches,
+            dry_run=args.dry_run
+        )
+        action = '待归档' if args.dry_run else '已归档'
+        print(f"截止时间: {result['cutoff']}")
+        print(f"{action}: 生产计划 {result['plans']} 条, 订单 {result['orders']} 条 "
+              f"({time.perf_counter() - t:.2f}s)")
+        if not args.dry_run:
+            print(f"清理过期的删除记录: {ChangeService(db).prune_tombstones()} 条")
+
+        stats = service.get_archive_statistics()
+        print(f"主表: 订单 {stats['orders']} / 生产计划 {stats['plans']}; "
+              f"归档表: 订单 {stats['orders_archived']} / 生产计划 {stats['plans_archived']}")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
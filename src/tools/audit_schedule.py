@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+生产排程完整性审计命令
+
+用法:
+    python -m src.tools.audit_schedule [--output report.ndjson] [--fail-on-issues]
+"""
+import argparse
+import json
+import sys
+from src.models.database import session_factory, init_database
+from src.services.schedule_audit_service import ScheduleAuditService
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='审计生产计划的时间重叠、无效时间段和异常订单关联')
+    parser.add_argument('--output', '-o', help='输出文件路径（默认输出到标准输出）')
+    parser.add_argument('--batch-size', type=int, default=2000, help='流式读取的批大小')
+    parser.add_argument('--fail-on-issues', action='store_true', help='发现问题时以退出码1结束')
+    args = parser.parse_args(argv)
+
+    init_database()
+    db = session_factory()
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    summary = {}
+    try:
+        for issue in ScheduleAuditService(db).iter_issues(batch_size=args.batch_size):
+            output.write(json.dumps(issue, ensure_ascii=False) + '\n')
+            if issue['type'] == 'summary':
+                summary = issue
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        db.close()
+
+    if args.fail_on_issues and any(summary.get('issues', {}).values()):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+"""
+服务层基准测试命令
+
+按数据规模档位（10k / 100k / 1m）生成夹具数据库，对各服务方法的搜索、深分页、统计和写入场景
+计时，记录 p50/p95 延迟、SQL查询次数和峰值内存，结果写入JSON；可与保存的基线对比以发现性能回退。
+失败的场景只在结果中记录错误信息，不中断其余场景。
+
+用法:
+    python -m src.tools.benchmark [--tiers 10k,100k] [--repeat 20] [--output bench.json]
+    python -m src.tools.benchmark --tiers 10k --compare baseline.json [--threshold 0.2]
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import create_engine, event, func
+from sqlalchemy.orm import sessionmaker
+from src.config import DATA_DIR
+from src.models.order_model import Order
+from src.models.inventory_model import InventoryItem
+from src.models.production_model import ProductionPlan
+from src.services.order_service import OrderService
+from src.services.inventory_service import InventoryService
+from src.services.production_service import ProductionService
+from src.tools.generate_data import build_database
+
+# 档位 -> (订单数, 物料数, 计划数)
+TIERS = {
+    '10k': (10000, 10000, 10000),
+    '100k': (100000, 100000, 100000),
+    '1m': (1000000, 1000000, 1000000)
+}
+
+FIXTURES_DIR = os.path.join(DATA_DIR, 'bench')
+
+# 夹具数据固定参数，保证不同机器/不同时间生成的夹具一致
+# （as_of / start_date 不随生成当天变化；10k 档排程约持续到 2027 年年中，100k 及以上档远超于此）
+FIXTURE_SEED = 20240101
+FIXTURE_LINES = 20
+FIXTURE_AS_OF = '2026-01-01'
+FIXTURE_START_DATE = '2025-01-01'
+
+
+class BenchContext:
+    """
+    场景运行所需的夹具信息（在每个档位开始时读取一次）
+    """
+
+    def __init__(self, session):
+        self.order_count = session.query(func.count(Order.id)).scalar()
+        self.max_order_id = session.query(func.max(Order.id)).scalar() or 0
+        self.item_count = session.query(func.count(InventoryItem.id)).scalar()
+        self.plan_count = session.query(func.count(ProductionPlan.id)).scalar()
+        self.first_start = session.query(func.min(ProductionPlan.start_time)).scalar()
+        self.last_end = session.query(func.max(ProductionPlan.end_time)).scalar()
+        self.line = session.query(ProductionPlan.line).limit(1).scalar()
+        self._write_seq = 0
+
+    def deep_page(self, total: int, per_page: int = 20) -> int:
+        """
+        深分页页码（约90%位置）
+        """
+        return max(1, int(total / per_page * 0.9))
+
+    def mid_time(self) -> datetime:
+        return self.first_start + (self.last_end - self.first_start) / 2
+
+    def next_order_id(self) -> int:
+        """
+        写入场景逐次使用不同的订单，避免生成的计划编号重复
+        """
+        self._write_seq += 1
+        return (self._write_seq * 7919) % self.max_order_id + 1
+
+
+def _conflict_probe(db, ctx: BenchContext):
+    start = ctx.mid_time()
+    plan = ProductionPlan(line=ctx.line, start_time=start, end_time=start + timedelta(hours=8))
+    return ProductionService(db)._check_time_conflict(plan)
+
+
+# 场景名 -> (类型, 执行函数)
+SCENARIOS = {
+    'get_orders.first_page': ('read', lambda db, ctx: OrderService(db).get_orders(page=1, per_page=20)),
+    'get_orders.search': ('read', lambda db, ctx: OrderService(db).get_orders(page=1, per_page=20, search='比亚迪')),
+    'get_orders.deep_page': ('read', lambda db, ctx: OrderService(db).get_orders(
+        page=ctx.deep_page(ctx.order_count), per_page=20)),
+    'get_items.first_page': ('read', lambda db, ctx: InventoryService(db).get_items(page=1, per_page=20)),
+    'get_items.search': ('read', lambda db, ctx: InventoryService(db).get_items(page=1, per_page=20, search='BAT')),
+    'get_items.deep_page': ('read', lambda db, ctx: InventoryService(db).get_items(
+        page=ctx.deep_page(ctx.item_count), per_page=20)),
+    'get_plans.first_page': ('read', lambda db, ctx: ProductionService(db).get_plans(page=1, per_page=20)),
+    'get_plans.search': ('read', lambda db, ctx: ProductionService(db).get_plans(page=1, per_page=20, search='PLN-0000')),
+    'get_plans.deep_page': ('read', lambda db, ctx: ProductionService(db).get_plans(
+        page=ctx.deep_page(ctx.plan_count), per_page=20)),
+    'get_order_statistics': ('read', lambda db, ctx: OrderService(db).get_order_statistics()),
+    'get_inventory_statistics': ('read', lambda db, ctx: InventoryService(db).get_inventory_statistics()),
+    'get_production_statistics': ('read', lambda db, ctx: ProductionService(db).get_production_statistics()),
+    '_check_time_conflict': ('read', _conflict_probe),
+    'update_order_status': ('write', lambda db, ctx: OrderService(db).update_order_status(
+        ctx.next_order_id(), 'REVIEW')),
+    'generate_production_plan': ('write', lambda db, ctx: ProductionService(db).generate_production_plan(
+        ctx.next_order_id())),
+}
+
+
+def fixture_path(tier: str, fixtures_dir: str = FIXTURES_DIR) -> str:
+    return os.path.join(fixtures_dir, f'bench_{tier}.db')
+
+
+def ensure_fixture(tier: str, fixtures_dir: str = FIXTURES_DIR, rebuild: bool = False) -> str:
+    """
+    生成（或复用已有的）档位夹具数据库
+    """
+    path = fixture_path(tier, fixtures_dir)
+    if os.path.exists(path) and not rebuild:
+        return path
+
+    os.makedirs(fixtures_dir, exist_ok=True)
+    if os.path.exists(path):
+        os.remove(path)
+    orders, items, plans = TIERS[tier]
+    print(f"[{tier}] 生成夹具数据库 {path}")
+    engine = create_engine(f'sqlite:///{path}')
+    try:
+        build_database(engine, orders=orders, items=items, plans=plans, seed=FIXTURE_SEED,
+                       start_date=FIXTURE_START_DATE, as_of=FIXTURE_AS_OF, line_count=FIXTURE_LINES)
+    finally:
+        engine.dispose()
+    return path
+
+
+def run_scenario(session_maker, ctx: BenchContext, fn, repeat: int, warmup: int, query_counter: list) -> dict:
+    """
+    运行单个场景：每次迭代使用新会话，先预热，再计时；最后单独跑一次测量峰值内存
+    """
+    for _ in range(warmup):
+        db = session_maker()
+        try:
+            fn(db, ctx)
+        finally:
+            db.close()
+
+    timings = []
+    queries = []
+    for _ in range(repeat):
+        db = session_maker()
+        query_counter[0] = 0
+        try:
+            started = time.perf_counter()
+            fn(db, ctx)
+            timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            db.close()
+        queries.append(query_counter[0])
+
+    # tracemalloc 会显著拖慢执行，因此与计时分开
+    db = session_maker()
+    tracemalloc.start()
+    try:
+        fn(db, ctx)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        db.close()
+
+    timings = np.array(timings)
+    return {
+        'repeat': repeat,
+        'p50_ms': round(float(np.percentile(timings, 50)), 3),
+        'p95_ms': round(float(np.percentile(timings, 95)), 3),
+        'mean_ms': round(float(timings.mean()), 3),
+        'queries': int(max(queries)),
+        'peak_kb': round(peak / 1024, 1)
+    }
+
+
+def run_tier(tier: str, scenarios: dict, repeat: int, warmup: int, fixtures_dir: str, rebuild: bool) -> dict:
+    """
+    在夹具副本上运行所有场景（写入场景不会污染夹具）
+    """
+    source = ensure_fixture(tier, fixtures_dir, rebuild)
+    fd, work_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    shutil.copyfile(source, work_path)
+
+    engine = create_engine(f'sqlite:///{work_path}')
+    query_counter = [0]
+
+    def count_query(conn, cursor, statement, parameters, context, executemany):
+        query_counter[0] += 1
+
+    event.listen(engine, 'before_cursor_execute', count_query)
+    session_maker = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    results = {}
+    try:
+        setup = session_maker()
+        try:
+            ctx = BenchContext(setup)
+        finally:
+            setup.close()
+
+        for name, (kind, fn) in scenarios.items():
+            try:
+                results[name] = run_scenario(session_maker, ctx, fn, repeat, warmup, query_counter)
+            except Exception as e:
+                # 单个场景失败（如夹具排程已过期导致无法生成计划）只记录错误，继续后续场景
+                results[name] = {'kind': kind, 'error': str(e)}
+                print(f"[{tier}] {name:<28} 失败: {e}")
+                continue
+            results[name]['kind'] = kind
+            print(f"[{tier}] {name:<28} p50={results[name]['p50_ms']:>9.2f}ms "
+                  f"p95={results[name]['p95_ms']:>9.2f}ms queries={results[name]['queries']:>3} "
+                  f"peak={results[name]['peak_kb']:>9.1f}KB")
+    finally:
+        engine.dispose()
+        os.remove(work_path)
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float, min_delta_ms: float = 1.0) -> list:
+    """
+    与基线对比，返回回退项列表
+
+    p50 超过基线 (1 + threshold) 倍且绝对差值超过 min_delta_ms，或查询次数增加，视为回退；
+    基线中成功而本次失败的场景也视为回退
+    """
+    regressions = []
+    for tier, scenarios in current.get('results', {}).items():
+        for name, result in scenarios.items():
+            base = baseline.get('results', {}).get(tier, {}).get(name)
+            if not base or 'error' in base:
+                continue
+            if 'error' in result:
+                regressions.append({
+                    'tier': tier, 'scenario': name, 'metric': 'error',
+                    'baseline': 'ok', 'current': result['error']
+                })
+                continue
+            if result['p50_ms'] > base['p50_ms'] * (1 + threshold) and \
+                    result['p50_ms'] - base['p50_ms'] > min_delta_ms:
+                regressions.append({
+                    'tier': tier, 'scenario': name, 'metric': 'p50_ms',
+                    'baseline': base['p50_ms'], 'current': result['p50_ms']
+                })
+            if result['queries'] > base['queries']:
+                regressions.append({
+                    'tier': tier, 'scenario': name, 'metric': 'queries',
+                    'baseline': base['queries'], 'current': result['queries']
+                })
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='服务层基准测试')
+    parser.add_argument('--tiers', default='10k', help=f'数据规模档位，逗号分隔（可选: {",".join(TIERS)}）')
+    parser.add_argument('--scenarios', help='只运行名称包含该子串的场景')
+    parser.add_argument('--repeat', type=int, default=20, help='每个场景的计时次数')
+    parser.add_argument('--warmup', type=int, default=2, help='每个场景的预热次数')
+    parser.add_argument('--output', '-o', help='结果JSON输出路径')
+    parser.add_argument('--compare', help='基线JSON路径，对比后发现回退则以退出码1结束')
+    parser.add_argument('--threshold', type=float, default=0.2, help='判定回退的p50增幅比例')
+    parser.add_argument('--fixtures-dir', default=FIXTURES_DIR, help='夹具数据库目录')
+    parser.add_argument('--rebuild', action='store_true', help='重新生成夹具数据库')
+    args = parser.parse_args(argv)
+
+    tiers = [tier.strip().lower() for tier in args.tiers.split(',') if tier.strip()]
+    unknown = [tier for tier in tiers if tier not in TIERS]
+    if unknown:
+        parser.error(f"未知档位: {', '.join(unknown)}")
+
+    scenarios = {name: spec for name, spec in SCENARIOS.items()
+                 if not args.scenarios or args.scenarios in name}
+
+    report = {
+        'meta': {
+            'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'tiers': tiers
+        },
+        'results': {},
+        'errors': {}
+    }
+    for tier in tiers:
+        try:
+            report['results'][tier] = run_tier(tier, scenarios, args.repeat, args.warmup,
+                                               args.fixtures_dir, args.rebuild)
+        except Exception as e:
+            # 夹具生成或读取失败时记录该档位的错误，继续其他档位并照常输出报告
+            report['errors'][tier] = str(e)
+            print(f"[{tier}] 档位运行失败: {e}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for item in regressions:
+            print(f"回退 [{item['tier']}] {item['scenario']} {item['metric']}: "
+                  f"{item['baseline']} -> {item['current']}")
+        if regressions:
+            return 1
+        print("未发现性能回退")
+    return 1 if report['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
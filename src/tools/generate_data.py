@@ -0,0 +1,363 @@
+# -*- coding: utf-8 -*-
+"""
+压测数据生成命令
+
+以固定随机种子批量生成订单、库存物料和生产计划：字段用NumPy整体生成，通过Core批量插入，
+同一种子、同一 --as-of 日期在同一初始数据库上生成的数据完全一致。
+
+时间以 --as-of（默认今天）为当前时间：订单和物料创建于其之前，排程默认以其为中点前后展开，
+计划状态按其推算，创建/更新时间都不晚于它（列表排序、增量同步与风险/仿真使用的当前时间一致）。
+
+用法:
+    python -m src.tools.generate_data --orders 100000 --items 50000 --plans 200000 [--seed 42]
+        [--database sqlite:///data/loadtest.db] [--lines 20] [--qrcodes none|serial|parallel] [--workers 4]
+
+编码规则:
+    物料编码 = 类别前缀-记录ID（如 BAT-00012345），计划编号 = PLN-记录ID；
+    记录ID从表中当前最大ID之后连续分配，因此多次运行之间也不会冲突
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+import numpy as np
+
+# 每次生成的行数（固定值，保证结果与插入批大小无关）
+GENERATE_CHUNK = 50000
+
+CUSTOMERS = [
+    '比亚迪汽车', '特斯拉中国', '蔚来汽车', '理想汽车', '小鹏汽车',
+    '长城汽车', '吉利汽车', '奇瑞汽车', '江淮汽车', '北汽新能源',
+    '广汽埃安', '上汽荣威', '东风岚图', '长安深蓝', '零跑汽车'
+]
+VEHICLE_MODELS = [
+    'Model 3', 'Model Y', 'ES6', 'ES8', '理想ONE', '理想L9',
+    'P7', 'P5', '欧拉好猫', '欧拉黑猫', '汉EV', '唐EV',
+    '秦PLUS EV', '宋PLUS EV', '元PLUS', '海豚', '海豹'
+]
+VIN_PREFIXES = ['LHG', 'LSG', 'LNB', 'LFP', 'LGB', 'LDC', 'LFA', 'LFB']
+ORDER_STATUSES = ['NEW', 'REVIEW', 'COMPLETED']
+ORDER_STATUS_WEIGHTS = [0.4, 0.3, 0.3]
+
+# 物料类别前缀 -> 可选名称
+PART_CATEGORIES = {
+    'BAT': ['动力电池包', '电池模组', '电池管理系统'],
+    'MOT': ['永磁同步电机', '异步电机', '减速器'],
+    'CTL': ['电机控制器', '整车控制器', 'DC-DC转换器'],
+    'BOD': ['车身框架', '车门总成', '引擎盖'],
+    'INT': ['仪表盘总成', '座椅总成', '中控屏'],
+    'EXT': ['前大灯总成', '后尾灯总成', '保险杠'],
+    'HWD': ['线束总成', '充电接口', '高压连接器'],
+    'SEN': ['毫米波雷达', '摄像头模组', '激光雷达']
+}
+PART_SPECS = [
+    '100kWh', '150kW', 'V1.0', '铝合金', '碳纤维', '钢制', 'V2.1', 'V3.0',
+    'Type-A', 'Type-B', 'Type-C', '标准型', '加强型', '轻量化', '高性能'
+]
+LOCATION_ZONES = list('ABCDEFGHIJ')
+
+# 生产计划时长与间隔（小时）
+PLAN_DURATION_HOURS = (4, 72)
+PLAN_GAP_HOURS = (0, 12)
+PLAN_CANCEL_RATE = 0.03
+
+
+def _to_datetimes(seconds: np.ndarray) -> list:
+    """
+    epoch秒数组 -> datetime 列表
+    """
+    return seconds.astype('datetime64[s]').tolist()
+
+
+def _chunks(total: int):
+    for offset in range(0, total, GENERATE_CHUNK):
+        yield offset, min(GENERATE_CHUNK, total - offset)
+
+
+def _insert(conn, table, columns: dict, batch_size: int):
+    """
+    按列数据批量插入（Core executemany）
+    """
+    keys = list(columns.keys())
+    rows = [dict(zip(keys, values)) for values in zip(*columns.values())]
+    for offset in range(0, len(rows), batch_size):
+        conn.execute(table.insert(), rows[offset:offset + batch_size])
+
+
+def _next_id(conn, table) -> int:
+    from sqlalchemy import func, select
+    next_id = (conn.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+    if conn.dialect.name == 'sqlite' and table.dialect_options['sqlite']['autoincrement']:
+        # AUTOINCREMENT 表已分配过的ID（含已归档的行）记录在 sqlite_sequence 中
+        seq = conn.exec_driver_sql('SELECT seq FROM sqlite_sequence WHERE name = ?', (table.name,)).scalar()
+        next_id = max(next_id, (seq or 0) + 1)
+    return next_id
+
+
+def generate_orders(conn, table, count: int, rng: np.random.Generator, as_of: int, batch_size: int) -> int:
+    """
+    生成订单（创建于 as_of 之前90天内）
+    """
+    next_id = _next_id(conn, table)
+    for offset, n in _chunks(count):
+        created = as_of - rng.integers(0, 90 * 86400, size=n)
+        due = as_of + rng.integers(7, 365, size=n) * 86400
+        _insert(conn, table, {
+            'id': range(next_id + offset, next_id + offset + n),
+            'customer': np.array(CUSTOMERS)[rng.integers(len(CUSTOMERS), size=n)].tolist(),
+            'vehicle_model': np.array(VEHICLE_MODELS)[rng.integers(len(VEHICLE_MODELS), size=n)].tolist(),
+            'quantity': rng.integers(1, 51, size=n).tolist(),
+            'due_date': _to_datetimes(due),
+            'status': rng.choice(ORDER_STATUSES, size=n, p=ORDER_STATUS_WEIGHTS).tolist(),
+            'vin_prefix': np.array(VIN_PREFIXES)[rng.integers(len(VIN_PREFIXES), size=n)].tolist(),
+            'created_at': _to_datetimes(created),
+            'updated_at': _to_datetimes(created)
+        }, batch_size)
+    return count
+
+
+def generate_items(conn, table, count: int, rng: np.random.Generator, as_of: int, batch_size: int,
+                   collect_qrcodes: bool = False) -> list:
+    """
+    生成库存物料，collect_qrcodes 为 True 时返回用于生成二维码的 (编码, 名称, 规格, 数量) 列表
+    （否则返回空列表，不为每个物料保留一份数据）
+    """
+    prefixes = list(PART_CATEGORIES.keys())
+    next_id = _next_id(conn, table)
+    qr_rows = []
+    for offset, n in _chunks(count):
+        ids = np.arange(next_id + offset, next_id + offset + n)
+        category = rng.integers(len(prefixes), size=n)
+        # 名称在所属类别内选择
+        name_pick = rng.integers(0, 3, size=n)
+        spec = np.char.add(np.char.add(np.array(PART_SPECS)[rng.integers(len(PART_SPECS), size=n)], '-'),
+                           rng.integers(1, 10, size=n).astype(str))
+        location = np.char.add(np.char.add(np.array(LOCATION_ZONES)[rng.integers(len(LOCATION_ZONES), size=n)], '区-'),
+                               np.char.zfill(rng.integers(1, 21, size=n).astype(str), 2))
+        created = as_of - rng.integers(0, 180 * 86400, size=n)
+
+        part_code = [f"{prefixes[c]}-{i:08d}" for c, i in zip(category.tolist(), ids.tolist())]
+        name = [PART_CATEGORIES[prefixes[c]][k] for c, k in zip(category.tolist(), name_pick.tolist())]
+        quantity = rng.integers(0, 1001, size=n).tolist()
+        spec = spec.tolist()
+
+        _insert(conn, table, {
+            'id': ids.tolist(),
+            'part_code': part_code,
+            'name': name,
+            'spec': spec,
+            'quantity': quantity,
+            'location': location.tolist(),
+            'created_at': _to_datetimes(created),
+            'updated_at': _to_datetimes(created)
+        }, batch_size)
+        if collect_qrcodes:
+            qr_rows.extend(zip(part_code, name, spec, quantity))
+    return qr_rows
+
+
+def generate_plans(conn, plan_table, order_table, count: int, rng: np.random.Generator,
+                   origin: int, as_of: int, lines: list, batch_size: int) -> int:
+    """
+    生成生产计划
+
+    每条生产线上的计划首尾相接（时长 + 随机间隔做前缀和），从该生产线现有计划的最晚结束时间之后开始，
+    因此同一生产线上不会产生时间重叠
+    """
+    from sqlalchemy import func, select
+
+    order_ids = np.fromiter((row[0] for row in conn.execute(select(order_table.c.id))), dtype=np.int64)
+    if not len(order_ids):
+        raise ValueError("数据库中没有订单，无法生成生产计划")
+    order_ids.sort()
+
+    # 各生产线的排程游标 = max(起始时间, 现有计划最晚结束时间)
+    cursor = np.full(len(lines), origin, dtype=np.int64)
+    existing = conn.execute(
+        select(plan_table.c.line, func.max(plan_table.c.end_time)).group_by(plan_table.c.line)
+    ).all()
+    for line, end_time in existing:
+        if line in lines and end_time is not None:
+            cursor[lines.index(line)] = max(cursor[lines.index(line)],
+                                            int(np.datetime64(end_time, 's').astype(np.int64)))
+
+    next_id = _next_id(conn, plan_table)
+    for offset, n in _chunks(count):
+        ids = np.arange(next_id + offset, next_id + offset + n)
+        line_idx = rng.integers(len(lines), size=n)
+        duration = rng.integers(PLAN_DURATION_HOURS[0], PLAN_DURATION_HOURS[1] + 1, size=n) * 3600
+        gap = rng.integers(PLAN_GAP_HOURS[0], PLAN_GAP_HOURS[1] + 1, size=n) * 3600
+
+        # 按生产线分组后做分组前缀和
+        order = np.argsort(line_idx, kind='stable')
+        sorted_line = line_idx[order]
+        step = (gap + duration)[order]
+        csum = np.cumsum(step)
+        group_start = np.r_[0, np.flatnonzero(np.diff(sorted_line)) + 1]
+        group_size = np.diff(np.r_[group_start, n])
+        group_base = np.repeat(csum[group_start] - step[group_start], group_size)
+        end_sorted = cursor[sorted_line] + csum - group_base
+
+        group_last = group_start + group_size - 1
+        cursor[sorted_line[group_last]] = end_sorted[group_last]
+
+        end = np.empty(n, dtype=np.int64)
+        end[order] = end_sorted
+        start = end - duration
+
+        status = np.select(
+            [end <= as_of, start <= as_of],
+            ['COMPLETED', 'IN_PROGRESS'],
+            default='PLANNED'
+        )
+        status[rng.random(n) < PLAN_CANCEL_RATE] = 'CANCELLED'
+        # 创建于开始前1小时 ~ 14天，且不晚于当前时间（未来的计划视为已提前排好）
+        created = np.minimum(start - rng.integers(3600, 14 * 86400, size=n), as_of)
+
+        _insert(conn, plan_table, {
+            'id': ids.tolist(),
+            'plan_code': [f"PLN-{i:09d}" for i in ids.tolist()],
+            'order_id': order_ids[rng.integers(len(order_ids), size=n)].tolist(),
+            'line': np.array(lines)[line_idx].tolist(),
+            'start_time': _to_datetimes(start),
+            'end_time': _to_datetimes(end),
+            'status': status.tolist(),
+            'created_at': _to_datetimes(created),
+            'updated_at': _to_datetimes(created)
+        }, batch_size)
+    return count
+
+
+def build_database(engine, orders: int = 0, items: int = 0, plans: int = 0, seed: int = 42,
+                   start_date: str = None, as_of: str = None, line_count: int = None,
+                   batch_size: int = 10000, verbose: bool = True, collect_qrcodes: bool = False) -> list:
+    """
+    在指定引擎对应的数据库中建表并生成数据
+
+    Args:
+        engine: SQLAlchemy 引擎（基准测试会传入独立的夹具库引擎）
+        orders / items / plans: 各表生成数量
+        seed: 随机种子
+        start_date: 排程起始日期（YYYY-MM-DD），默认使 as_of 位于排程时间跨度的中点
+        as_of: 当前日期（YYYY-MM-DD），用于推算计划状态和生成创建时间，默认为今天
+        line_count: 生产线数量，默认为配置中的生产线
+        batch_size: 每次插入的行数
+        verbose: 是否输出各表耗时
+        collect_qrcodes: 是否返回新物料的二维码数据
+
+    Returns:
+        新物料的 (编码, 名称, 规格, 数量) 列表，用于生成二维码（collect_qrcodes 为 False 时为空）
+    """
+    from src.models.migrations import run_migrations
+    from src.models.order_model import Order
+    from src.models.inventory_model import InventoryItem
+    from src.models.production_model import ProductionPlan
+    from src.config import PRODUCTION_LINES
+
+    run_migrations(engine)
+    lines = list(PRODUCTION_LINES)
+    if line_count:
+        lines = (lines + [f"Line-{i + 1:02d}" for i in range(len(lines), line_count)])[:line_count]
+
+    as_of_seconds = int(np.datetime64(datetime.strptime(as_of or date.today().isoformat(), '%Y-%m-%d'), 's')
+                        .astype(np.int64))
+    if start_date:
+        origin = int(np.datetime64(datetime.strptime(start_date, '%Y-%m-%d'), 's').astype(np.int64))
+    else:
+        # 从当前日期向前推每条生产线期望排程跨度的一半，使已完成/进行中/计划中的比例大致均衡
+        mean_step = (sum(PLAN_DURATION_HOURS) + sum(PLAN_GAP_HOURS)) / 2 * 3600
+        origin = as_of_seconds - int(plans / len(lines) * mean_step / 2)
+
+    # 每张表使用独立的随机流，改变某张表的数量不影响其他表的数据
+    order_rng, item_rng, plan_rng = (np.random.default_rng(s)
+                                     for s in np.random.SeedSequence(seed).spawn(3))
+
+    def report(label, count, started):
+        if verbose:
+            print(f"{label}: {count} 条, {time.perf_counter() - started:.2f}s")
+
+    with engine.connect() as conn:
+        synchronous = None
+        if engine.dialect.name == 'sqlite':
+            # 仅本次批量导入期间放宽同步策略，提交后恢复（连接归还连接池后还会被复用；
+            # 同步策略只能在事务之外修改）
+            synchronous = conn.exec_driver_sql('PRAGMA synchronous').scalar()
+            conn.exec_driver_sql('PRAGMA synchronous = OFF')
+            conn.commit()
+        try:
+            with conn.begin():
+                t = time.perf_counter()
+                generate_orders(conn, Order.__table__, orders, order_rng, as_of_seconds, batch_size)
+                report('订单', orders, t)
+
+                t = time.perf_counter()
+                qr_rows = generate_items(conn, InventoryItem.__table__, items, item_rng, as_of_seconds,
+                                         batch_size, collect_qrcodes)
+                report('库存物料', items, t)
+
+                if plans:
+                    t = time.perf_counter()
+                    generate_plans(conn, ProductionPlan.__table__, Order.__table__, plans, plan_rng,
+                                   origin, as_of_seconds, lines, batch_size)
+                    report('生产计划', plans, t)
+        finally:
+            if synchronous is not None:
+                conn.exec_driver_sql(f'PRAGMA synchronous = {int(synchronous)}')
+                conn.commit()
+    return qr_rows
+
+
+def _render_qrcode(row) -> bool:
+    from src.models.inventory_model import InventoryItem
+    return InventoryItem.render_qrcode(*row)
+
+
+def render_qrcodes(rows: list, mode: str, workers: int) -> int:
+    """
+    生成二维码图片，返回成功数量
+    """
+    if mode == 'serial':
+        return sum(1 for row in rows if _render_qrcode(row))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return sum(1 for ok in executor.map(_render_qrcode, rows, chunksize=256) if ok)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='批量生成可复现的压测数据')
+    parser.add_argument('--orders', type=int, default=0, help='生成订单数量')
+    parser.add_argument('--items', type=int, default=0, help='生成库存物料数量')
+    parser.add_argument('--plans', type=int, default=0, help='生成生产计划数量')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--database', help='数据库URI（默认使用 EV_MES_DATABASE_URI 或配置文件中的数据库）')
+    parser.add_argument('--start-date', help='排程起始日期（YYYY-MM-DD），默认使当前日期位于排程时间跨度的中点')
+    parser.add_argument('--as-of', help='当前日期（YYYY-MM-DD），用于推算计划状态和生成创建时间，默认为今天')
+    parser.add_argument('--lines', type=int, help='生产线数量（默认为配置中的生产线，超出部分自动命名）')
+    parser.add_argument('--batch-size', type=int, default=10000, help='每次插入的行数')
+    parser.add_argument('--qrcodes', choices=['none', 'serial', 'parallel'], default='none',
+                        help='是否为新物料生成二维码图片')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='并行生成二维码的进程数')
+    args = parser.parse_args(argv)
+
+    # 必须在导入数据库模块之前设置，引擎在导入时创建
+    if args.database:
+        os.environ['EV_MES_DATABASE_URI'] = args.database
+
+    from src.models.database import engine
+
+    qr_rows = build_database(
+        engine, orders=args.orders, items=args.items, plans=args.plans, seed=args.seed,
+        start_date=args.start_date, as_of=args.as_of, line_count=args.lines, batch_size=args.batch_size,
+        collect_qrcodes=args.qrcodes != 'none'
+    )
+
+    if qr_rows:
+        t = time.perf_counter()
+        rendered = render_qrcodes(qr_rows, args.qrcodes, args.workers)
+        print(f"二维码: {rendered}/{len(qr_rows)} 张, {time.perf_counter() - t:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,454 @@
+# -*- coding: utf-8 -*-
+"""
+索引建议命令
+
+在数据库副本上运行基准测试场景和/或脚本化流量回放，捕获服务层发出的每条不同语句，逐条执行
+EXPLAIN QUERY PLAN，标记全表扫描（SCAN）和临时B树排序（USE TEMP B-TREE），根据语句中的
+等值条件、范围条件、排序/分组列推导（尽可能覆盖的）索引建议，并在副本上逐个建索引测量前后耗时。
+
+用法:
+    python -m src.tools.index_advisor [--database sqlite:///data/ev_mes.db] [--workload bench,traffic]
+    python -m src.tools.index_advisor --tier 100k --requests 500 --output advice.json
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+import numpy as np
+
+# 覆盖索引最多包含的列数（超过时只建议用于查找/排序的列）
+COVERING_MAX_COLUMNS = 5
+
+_PLAN_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+_PLAN_TEMP_BTREE = re.compile(r'USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT|RIGHT PART OF ORDER BY)')
+_TABLE_REF = re.compile(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+AS\s+(\w+))?', re.IGNORECASE)
+_PREDICATE = re.compile(r'\b(\w+)\.(\w+)\s*(=|!=|<>|<=|>=|<|>|IN\b|NOT\s+IN\b|BETWEEN\b|LIKE\b|IS\b)', re.IGNORECASE)
+_COLUMN_REF = re.compile(r'\b(\w+)\.(\w+)\b')
+_CLAUSE = re.compile(r'\b(WHERE|GROUP BY|ORDER BY|HAVING|LIMIT)\b', re.IGNORECASE)
+
+_EQUALITY_OPS = ('=', 'IN', 'IS')
+_RANGE_OPS = ('<', '>', '<=', '>=', 'BETWEEN')
+
+
+def resolve_sqlite_path(uri: str) -> str:
+    """
+    从 sqlite:/// URI（或直接给出的文件路径）得到数据库文件路径
+    """
+    if uri.startswith('sqlite:///'):
+        return uri[len('sqlite:///'):]
+    if '://' in uri:
+        raise ValueError(f"只支持SQLite数据库: {uri}")
+    return uri
+
+
+class StatementCapture:
+    """
+    按语句指纹去重捕获执行过的语句（保留首次出现的参数用于 EXPLAIN 和计时）
+    """
+
+    def __init__(self):
+        self.statements = OrderedDict()
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if executemany:
+            return
+        verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ''
+        if verb not in ('SELECT', 'UPDATE', 'DELETE', 'WITH'):
+            return
+        from src.utils.query_stats import QueryStats
+
+        key = QueryStats.fingerprint(statement)
+        entry = self.statements.get(key)
+        if entry is None:
+            self.statements[key] = {'statement': statement, 'parameters': parameters, 'executions': 1}
+        else:
+            entry['executions'] += 1
+
+
+def run_bench_workload(session_maker) -> list:
+    """
+    运行一遍基准测试的所有场景
+
+    单个场景失败时记录错误并继续，已捕获的语句照常参与分析
+
+    Returns:
+        失败场景列表
+    """
+    from src.tools.benchmark import SCENARIOS, BenchContext
+
+    db = session_maker()
+    try:
+        ctx = BenchContext(db)
+    finally:
+        db.close()
+    failures = []
+    for name, (kind, fn) in SCENARIOS.items():
+        db = session_maker()
+        try:
+            fn(db, ctx)
+        except Exception as e:
+            failures.append({'workload': 'bench', 'name': name, 'error': str(e)})
+            print(f"  场景 {name} 失败: {e}", file=sys.stderr)
+        finally:
+            db.close()
+    return failures
+
+
+def run_traffic_workload(requests: int, seed: int) -> list:
+    """
+    用测试客户端按压测流量组合回放 requests 个请求（包含写入请求，只作用于副本）
+
+    请求抛出异常或返回 5xx 时记录错误并继续
+
+    Returns:
+        失败请求列表
+    """
+    from app import create_app
+    from src.tools.loadtest import TrafficMix, load_sample_ids
+
+    client = create_app().test_client()
+    mix = TrafficMix(load_sample_ids())
+    rng = np.random.default_rng(seed)
+    failures = []
+    for _ in range(requests):
+        _, method, path, form = mix.next_request(rng)
+        try:
+            response = client.open(path, method=method, data=form)
+        except Exception as e:
+            error = str(e)
+        else:
+            if response.status_code < 500:
+                continue
+            error = f'HTTP {response.status_code}'
+        failures.append({'workload': 'traffic', 'name': f'{method} {path}', 'error': error})
+        print(f"  请求 {method} {path} 失败: {error}", file=sys.stderr)
+    return failures
+
+
+def explain(raw_connection, statement: str, parameters) -> list:
+    """
+    执行 EXPLAIN QUERY PLAN，返回计划明细行
+    """
+    cursor = raw_connection.cursor()
+    try:
+        cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+        return [row[3] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def plan_issues(plan: list) -> list:
+    """
+    从查询计划中找出全表扫描和临时B树排序
+    """
+    issues = []
+    for detail in plan:
+        match = _PLAN_SCAN.match(detail)
+        if match:
+            issues.append({'type': 'scan', 'table': match.group(1), 'detail': detail})
+            continue
+        match = _PLAN_TEMP_BTREE.search(detail)
+        if match:
+            issues.append({'type': 'temp_btree', 'table': None, 'detail': detail})
+    return issues
+
+
+def _split_clauses(statement: str) -> dict:
+    """
+    粗略拆分最外层的 WHERE / GROUP BY / ORDER BY 子句（取最后一次出现，足以处理服务层生成的语句）
+    """
+    clauses = {}
+    positions = [(match.start(), match.end(), match.group(1).upper()) for match in _CLAUSE.finditer(statement)]
+    for i, (start, end, name) in enumerate(positions):
+        stop = positions[i + 1][0] if i + 1 < len(positions) else len(statement)
+        clauses[name] = statement[end:stop]
+    return clauses
+
+
+def propose_index(statement: str, table: str, table_columns: list) -> dict:
+    """
+    为语句中的某个表推导索引：等值列在前，其后是分组/排序列（或第一个范围列），
+    列数不多时补上语句引用到的其余列成为覆盖索引
+
+    Returns:
+        dict: {'columns': [...], 'covering': bool, 'notes': [...]}，无法推导时 columns 为空
+    """
+    aliases = {table}
+    for name, alias in _TABLE_REF.findall(statement):
+        if name == table and alias:
+            aliases.add(alias)
+
+    clauses = _split_clauses(statement)
+    equality, ranges, notes = [], [], []
+    for alias, column, op in _PREDICATE.findall(clauses.get('WHERE', '')):
+        if alias not in aliases or column not in table_columns:
+            continue
+        op = ' '.join(op.upper().split())
+        if op in _EQUALITY_OPS and column not in equality:
+            equality.append(column)
+        elif op in _RANGE_OPS and column not in ranges:
+            ranges.append(column)
+        elif op == 'LIKE':
+            notes.append(f"{column} 使用 LIKE 匹配，前缀通配时无法使用索引")
+
+    def clause_columns(name):
+        return [column for alias, column in _COLUMN_REF.findall(clauses.get(name, ''))
+                if alias in aliases and column in table_columns]
+
+    ordering = clause_columns('GROUP BY') or clause_columns('ORDER BY')
+    columns = list(equality)
+    for column in ordering or ranges[:1]:
+        if column not in columns:
+            columns.append(column)
+
+    covering = False
+    if columns:
+        referenced = [column for alias, column in _COLUMN_REF.findall(statement)
+                      if alias in aliases and column in table_columns]
+        extra = [column for column in dict.fromkeys(referenced) if column not in columns and column != 'id']
+        if len(columns) + len(extra) <= COVERING_MAX_COLUMNS:
+            columns += extra
+            covering = True
+    else:
+        notes.append("没有可用于索引的条件或排序列")
+    return {'columns': columns, 'covering': covering, 'notes': sorted(set(notes))}
+
+
+def existing_indexes(raw_connection, table: str) -> list:
+    """
+    表上已有索引的列序列
+    """
+    cursor = raw_connection.cursor()
+    try:
+        indexes = []
+        for row in cursor.execute(f'PRAGMA index_list("{table}")').fetchall():
+            columns = [info[2] for info in cursor.execute(f'PRAGMA index_info("{row[1]}")').fetchall()]
+            indexes.append(columns)
+        return indexes
+    finally:
+        cursor.close()
+
+
+def time_statement(raw_connection, statement: str, parameters, repeat: int) -> float:
+    """
+    语句执行耗时中位数（毫秒，包含取完全部结果；写入语句在事务内执行后回滚）
+    """
+    timings = []
+    for _ in range(repeat):
+        cursor = raw_connection.cursor()
+        try:
+            started = time.perf_counter()
+            cursor.execute(statement, parameters)
+            cursor.fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            cursor.close()
+            raw_connection.rollback()
+    return float(np.median(timings))
+
+
+def analyze(engine, statements: OrderedDict) -> tuple:
+    """
+    对捕获的语句逐条 EXPLAIN，返回 (语句分析结果列表, 按索引聚合的建议)
+    """
+    from sqlalchemy import inspect
+
+    inspector = inspect(engine)
+    table_columns = {table: [column['name'] for column in inspector.get_columns(table)]
+                     for table in inspector.get_table_names()}
+
+    raw = engine.raw_connection()
+    findings = []
+    proposals = OrderedDict()
+    try:
+        for entry in statements.values():
+            statement, parameters = entry['statement'], entry['parameters']
+            plan = explain(raw, statement, parameters)
+            issues = plan_issues(plan)
+            finding = {'statement': statement, 'executions': entry['executions'], 'plan': plan,
+                       'issues': issues, 'proposals': []}
+            findings.append(finding)
+            if not issues:
+                continue
+
+            # 临时B树排序的计划行不带表名，归到语句 FROM 的主表
+            main_table = next((name for name, _ in _TABLE_REF.findall(statement) if name in table_columns), None)
+            tables = dict.fromkeys(issue['table'] or main_table for issue in issues)
+            for table in tables:
+                # 计划中的表名可能是别名
+                table = next((name for name, alias in _TABLE_REF.findall(statement) if alias == table), table)
+                if table not in table_columns:
+                    continue
+                proposal = propose_index(statement, table, table_columns[table])
+                finding['proposals'].append(dict(proposal, table=table))
+                columns = proposal['columns']
+                if not columns:
+                    continue
+                if any(index[:len(columns)] == columns for index in existing_indexes(raw, table)):
+                    continue
+                key = (table, tuple(columns))
+                if key not in proposals:
+                    proposals[key] = {
+                        'table': table,
+                        'columns': columns,
+                        'covering': proposal['covering'],
+                        'name': f"ix_{table}_{'_'.join(columns)}"[:60],
+                        'statements': []
+                    }
+                proposals[key]['statements'].append(entry)
+    finally:
+        raw.close()
+    return findings, list(proposals.values())
+
+
+def measure(engine, proposals: list, repeat: int):
+    """
+    逐个建议索引：测量受影响语句建索引前后的耗时和新的查询计划，测完删除索引
+    """
+    raw = engine.raw_connection()
+    try:
+        for proposal in proposals:
+            ddl = f'CREATE INDEX "{proposal["name"]}" ON "{proposal["table"]}" ({", ".join(proposal["columns"])})'
+            proposal['ddl'] = ddl
+            before = [time_statement(raw, entry['statement'], entry['parameters'], repeat)
+                      for entry in proposal['statements']]
+
+            cursor = raw.cursor()
+            started = time.perf_counter()
+            cursor.execute(ddl)
+            raw.commit()
+            proposal['build_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+            after = [time_statement(raw, entry['statement'], entry['parameters'], repeat)
+                     for entry in proposal['statements']]
+            proposal['results'] = [{
+                'statement': entry['statement'],
+                'before_ms': round(b, 3),
+                'after_ms': round(a, 3),
+                'plan_after': explain(raw, entry['statement'], entry['parameters'])
+            } for entry, b, a in zip(proposal['statements'], before, after)]
+            proposal['before_ms'] = round(sum(before), 3)
+            proposal['after_ms'] = round(sum(after), 3)
+
+            cursor.execute(f'DROP INDEX "{proposal["name"]}"')
+            raw.commit()
+            cursor.close()
+    finally:
+        raw.close()
+
+
+def print_report(findings: list, proposals: list):
+    flagged = [finding for finding in findings if finding['issues']]
+    print(f"\n捕获 {len(findings)} 条不同语句，其中 {len(flagged)} 条存在全表扫描或临时排序\n")
+    for finding in flagged:
+        print('-' * 80)
+        print(finding['statement'].strip()[:400])
+        print(f"  执行次数: {finding['executions']}")
+        for issue in finding['issues']:
+            print(f"  [{issue['type']}] {issue['detail']}")
+        for proposal in finding['proposals']:
+            if proposal['columns']:
+                kind = '覆盖索引' if proposal['covering'] else '索引'
+                print(f"  建议{kind}: {proposal['table']}({', '.join(proposal['columns'])})")
+            for note in proposal['notes']:
+                print(f"  说明: {note}")
+
+    if not proposals:
+        print("\n没有新的索引建议")
+        return
+    print('\n' + '=' * 80)
+    print(f"{'索引':<52}{'语句':>5}{'建索引':>10}{'前(ms)':>11}{'后(ms)':>11}{'加速':>8}")
+    for proposal in sorted(proposals, key=lambda p: p['before_ms'] - p['after_ms'], reverse=True):
+        speedup = proposal['before_ms'] / proposal['after_ms'] if proposal['after_ms'] else float('inf')
+        print(f"{proposal['name']:<52}{len(proposal['results']):>5}{proposal['build_ms']:>10}"
+              f"{proposal['before_ms']:>11.2f}{proposal['after_ms']:>11.2f}{speedup:>7.1f}x")
+    print('\n建议的DDL:')
+    for proposal in proposals:
+        print(f"  {proposal['ddl']};")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='基于 EXPLAIN QUERY PLAN 的索引建议')
+    parser.add_argument('--database', help='源数据库URI或文件路径（只读，分析在副本上进行；默认使用 EV_MES_DATABASE_URI '
+                                           '或 data/ev_mes.db）')
+    parser.add_argument('--tier', help='改用基准测试夹具档位（10k / 100k / 1m）作为源数据库')
+    parser.add_argument('--workload', default='bench,traffic', help='捕获语句的负载: bench, traffic（逗号分隔）')
+    parser.add_argument('--requests', type=int, default=300, help='流量回放的请求数')
+    parser.add_argument('--seed', type=int, default=42, help='流量回放随机种子')
+    parser.add_argument('--repeat', type=int, default=5, help='每条语句计时次数')
+    parser.add_argument('--output', '-o', help='结果JSON输出路径')
+    args = parser.parse_args(argv)
+
+    workloads = [name.strip() for name in args.workload.split(',') if name.strip()]
+    unknown = [name for name in workloads if name not in ('bench', 'traffic')]
+    if unknown:
+        parser.error(f"未知负载: {', '.join(unknown)}")
+
+    # 源数据库在改写环境变量之前确定（与 src.config 的默认值一致）
+    source_uri = args.database or os.environ.get('EV_MES_DATABASE_URI', 'sqlite:///data/ev_mes.db')
+
+    fd, work_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    # 必须在导入 src.config 和数据库模块之前设置，引擎在导入时创建（首次使用时才连接）
+    os.environ['EV_MES_DATABASE_URI'] = f'sqlite:///{work_path}'
+
+    from sqlalchemy import event
+    from src.models.database import engine, SessionLocal
+    try:
+        # 负载会写入数据库、measure 会建删索引，绝不能落到源数据库上
+        if engine.url.database != work_path:
+            raise RuntimeError(f"引擎未指向副本: {engine.url.database}")
+
+        if args.tier:
+            from src.tools.benchmark import TIERS, ensure_fixture
+            if args.tier not in TIERS:
+                parser.error(f"未知档位: {args.tier}")
+            source = ensure_fixture(args.tier)
+        else:
+            source = resolve_sqlite_path(source_uri)
+        if not os.path.exists(source):
+            parser.error(f"数据库文件不存在: {source}")
+        shutil.copyfile(source, work_path)
+        # 先把副本升级到最新结构，避免把迁移语句（其中的临时列随后即被删除）当作负载捕获
+        from src.models.migrations import run_migrations
+        run_migrations(engine)
+
+        capture = StatementCapture()
+        failures = []
+        event.listen(engine, 'before_cursor_execute', capture)
+        try:
+            if 'bench' in workloads:
+                print("运行基准测试场景...")
+                failures += run_bench_workload(SessionLocal)
+            if 'traffic' in workloads:
+                print(f"回放 {args.requests} 个请求...")
+                failures += run_traffic_workload(args.requests, args.seed)
+        finally:
+            event.remove(engine, 'before_cursor_execute', capture)
+        if failures:
+            print(f"负载中有 {len(failures)} 个场景/请求失败，继续分析已捕获的语句")
+
+        findings, proposals = analyze(engine, capture.statements)
+        measure(engine, proposals, args.repeat)
+        print_report(findings, proposals)
+
+        if args.output:
+            for proposal in proposals:
+                proposal.pop('statements')
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump({'source': source, 'workloads': workloads, 'failures': failures,
+                           'findings': findings, 'proposals': proposals},
+                          f, ensure_ascii=False, indent=2, default=str)
+    finally:
+        engine.dispose()
+        os.remove(work_path)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP压测命令
+
+在本进程内以多线程WSGI服务器启动应用（或指向已运行的地址），用N个并发工作线程按权重发送
+列表搜索、图表页、状态更新和计划生成等请求，按路由输出吞吐量和延迟分布。
+
+写入类请求会修改数据库，建议配合 generate_data 生成的独立数据库使用:
+    python -m src.tools.generate_data --database sqlite:///data/loadtest.db --orders 100000 --items 50000 --plans 200000
+    python -m src.tools.loadtest --database sqlite:///data/loadtest.db --workers 8 --duration 30 [--read-only]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+import numpy as np
+
+# 延迟直方图桶上限（毫秒）
+HISTOGRAM_BOUNDS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+SEARCH_TERMS = {
+    'orders': ['比亚迪', '特斯拉', '蔚来', '理想', ''],
+    'items': ['BAT', 'MOT', '电池', '传感器', ''],
+    'plans': ['PLN-0001', 'PLAN', '比亚迪', '']
+}
+
+
+class TrafficMix:
+    """
+    请求组合：每项为 (路由名, 权重, 生成 (方法, 路径, 表单) 的函数)
+    """
+
+    def __init__(self, sample_ids: dict, read_only: bool = False):
+        self.ids = sample_ids
+        self.routes = [
+            ('GET /dashboard/', 10, lambda rng: ('GET', '/dashboard/', None)),
+            ('GET /order/?search', 12, lambda rng: ('GET', '/order/?' + self._list_query(rng, 'orders'), None)),
+            ('GET /inventory/?search', 12, lambda rng: ('GET', '/inventory/?' + self._list_query(rng, 'items'), None)),
+            ('GET /production/?search', 12, lambda rng: ('GET', '/production/?' + self._list_query(rng, 'plans'), None)),
+            ('GET /order/charts', 4, lambda rng: ('GET', '/order/charts', None)),
+            ('GET /inventory/charts', 4, lambda rng: ('GET', '/inventory/charts', None)),
+            ('GET /production/gantt', 4, lambda rng: ('GET', '/production/gantt', None)),
+        ]
+        if not read_only:
+            self.routes += [
+                ('POST /order/<id>/status', 3, lambda rng: (
+                    'POST', f"/order/{self._pick(rng, 'orders')}/status",
+                    {'status': str(rng.choice(['NEW', 'REVIEW', 'COMPLETED']))})),
+                ('POST /production/<id>/status', 3, lambda rng: (
+                    'POST', f"/production/{self._pick(rng, 'plans')}/status",
+                    {'status': str(rng.choice(['PLANNED', 'IN_PROGRESS', 'COMPLETED']))})),
+                ('POST /production/generate/<order_id>', 1, lambda rng: (
+                    'POST', f"/production/generate/{self._pick(rng, 'orders')}", {})),
+            ]
+        weights = np.array([weight for _, weight, _ in self.routes], dtype=np.float64)
+        self.probabilities = weights / weights.sum()
+
+    def _pick(self, rng, kind: str) -> int:
+        ids = self.ids.get(kind)
+        return int(rng.choice(ids)) if ids is not None and len(ids) else 1
+
+    def _list_query(self, rng, kind: str) -> str:
+        params = {'search': str(rng.choice(SEARCH_TERMS[kind]))}
+        # 少量请求访问较深的分页
+        if rng.random() < 0.2:
+            params['page'] = int(rng.integers(2, 200))
+        return urllib.parse.urlencode(params)
+
+    def next_request(self, rng):
+        name, _, build = self.routes[rng.choice(len(self.routes), p=self.probabilities)]
+        method, path, form = build(rng)
+        return name, method, path, form
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """
+    不跟随重定向：POST 后的 302 作为该路由本身的响应计时
+    """
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+def load_sample_ids(limit: int = 5000) -> dict:
+    """
+    从数据库读取用于构造请求的ID样本
+    """
+    from src.models.database import session_factory
+    from src.models.order_model import Order
+    from src.models.inventory_model import InventoryItem
+    from src.models.production_model import ProductionPlan
+
+    db = session_factory()
+    try:
+        return {
+            'orders': np.array([row[0] for row in db.query(Order.id).limit(limit)], dtype=np.int64),
+            'items': np.array([row[0] for row in db.query(InventoryItem.id).limit(limit)], dtype=np.int64),
+            'plans': np.array([row[0] for row in db.query(ProductionPlan.id).limit(limit)], dtype=np.int64)
+        }
+    finally:
+        db.close()
+
+
+def start_server(host: str = '127.0.0.1', port: int = 0):
+    """
+    在后台线程中启动多线程WSGI服务器，返回 (server, base_url)
+    """
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    server = make_server(host, port, create_app(), threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f'http://{host}:{server.server_port}'
+
+
+def worker(base_url: str, mix: TrafficMix, seed, deadline: float, max_requests: int,
+           counter: list, counter_lock: threading.Lock, records: list, timeout: float):
+    """
+    工作线程：循环发送请求直到到达截止时间或总请求数
+    """
+    rng = np.random.default_rng(seed)
+    opener = urllib.request.build_opener(_NoRedirect)
+    while time.perf_counter() < deadline:
+        with counter_lock:
+            if max_requests and counter[0] >= max_requests:
+                return
+            counter[0] += 1
+
+        name, method, path, form = mix.next_request(rng)
+        data = urllib.parse.urlencode(form).encode('utf-8') if form is not None else None
+        request = urllib.request.Request(base_url + path, data=data, method=method)
+        started = time.perf_counter()
+        try:
+            with opener.open(request, timeout=timeout) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except Exception:
+            status = 0
+        records.append((name, status, (time.perf_counter() - started) * 1000))
+
+
+def summarize(records: list, elapsed: float) -> dict:
+    """
+    按路由汇总吞吐量、延迟分位数和直方图（状态码 >= 500 或连接失败计为错误）
+    """
+    by_route = defaultdict(list)
+    errors = defaultdict(int)
+    for name, status, latency in records:
+        by_route[name].append(latency)
+        if status == 0 or status >= 500:
+            errors[name] += 1
+
+    def stats(latencies, error_count):
+        values = np.array(latencies)
+        counts = np.histogram(values, bins=[0] + HISTOGRAM_BOUNDS_MS + [np.inf])[0]
+        return {
+            'requests': len(values),
+            'errors': error_count,
+            'rps': round(len(values) / elapsed, 2),
+            'p50_ms': round(float(np.percentile(values, 50)), 2),
+            'p90_ms': round(float(np.percentile(values, 90)), 2),
+            'p99_ms': round(float(np.percentile(values, 99)), 2),
+            'max_ms': round(float(values.max()), 2),
+            'histogram': {f'<={bound}ms' if bound != np.inf else f'>{HISTOGRAM_BOUNDS_MS[-1]}ms': int(count)
+                          for bound, count in zip(HISTOGRAM_BOUNDS_MS + [np.inf], counts)}
+        }
+
+    routes = {name: stats(latencies, errors[name]) for name, latencies in sorted(by_route.items())}
+    total = stats([latency for _, _, latency in records], sum(errors.values())) if records else {}
+    return {'elapsed_s': round(elapsed, 2), 'total': total, 'routes': routes}
+
+
+def print_report(report: dict):
+    total = report['total']
+    if not total:
+        print("没有完成任何请求")
+        return
+    print(f"\n总计: {total['requests']} 请求, {total['rps']} req/s, 错误 {total['errors']}, "
+          f"p50={total['p50_ms']}ms p99={total['p99_ms']}ms ({report['elapsed_s']}s)\n")
+    print(f"{'路由':<40}{'请求':>8}{'错误':>6}{'req/s':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}")
+    for name, route in report['routes'].items():
+        print(f"{name:<40}{route['requests']:>8}{route['errors']:>6}{route['rps']:>9}"
+              f"{route['p50_ms']:>9}{route['p90_ms']:>9}{route['p99_ms']:>9}{route['max_ms']:>9}")
+
+    for name, route in report['routes'].items():
+        print(f"\n{name}")
+        peak = max(route['histogram'].values()) or 1
+        for bucket, count in route['histogram'].items():
+            print(f"  {bucket:>10} {count:>7} {'#' * int(40 * count / peak)}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='按脚本化流量组合压测各蓝图路由')
+    parser.add_argument('--database', help='数据库URI（默认使用 EV_MES_DATABASE_URI 或配置文件中的数据库）')
+    parser.add_argument('--url', help='已运行服务的地址；不指定时在本进程内启动服务器')
+    parser.add_argument('--workers', type=int, default=4, help='并发工作线程数')
+    parser.add_argument('--duration', type=float, default=30, help='压测时长（秒）')
+    parser.add_argument('--requests', type=int, default=0, help='总请求数上限（0 表示只按时长）')
+    parser.add_argument('--timeout', type=float, default=30, help='单个请求超时（秒）')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--read-only', action='store_true', help='只发送GET请求')
+    parser.add_argument('--output', '-o', help='结果JSON输出路径')
+    args = parser.parse_args(argv)
+
+    # 必须在导入数据库模块之前设置，引擎在导入时创建
+    if args.database:
+        os.environ['EV_MES_DATABASE_URI'] = args.database
+
+    server = None
+    base_url = args.url.rstrip('/') if args.url else None
+    if not base_url:
+        server, base_url = start_server()
+    mix = TrafficMix(load_sample_ids(), read_only=args.read_only)
+
+    records = []
+    counter = [0]
+    counter_lock = threading.Lock()
+    seeds = np.random.SeedSequence(args.seed).spawn(args.workers)
+    started = time.perf_counter()
+    deadline = started + args.duration
+    threads = [
+        threading.Thread(target=worker, args=(base_url, mix, seeds[i], deadline, args.requests,
+                                              counter, counter_lock, records, args.timeout))
+        for i in range(args.workers)
+    ]
+    print(f"压测 {base_url}: {args.workers} 个工作线程, 时长 {args.duration}s")
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    if server:
+        server.shutdown()
+
+    report = summarize(records, elapsed)
+    report['config'] = {'workers': args.workers, 'duration': args.duration, 'read_only': args.read_only,
+                        'seed': args.seed, 'url': base_url}
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
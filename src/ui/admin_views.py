@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+管理视图（性能剖析、内存诊断等端点，需要管理权限）
+"""
+import os
+from flask import Blueprint, request, jsonify, Response, send_from_directory
+from src.utils.admin_auth import AdminAuth
+from src.utils.profiler import Profiler
+from src.utils.memory_diagnostics import MemoryDiagnostics
+from src.utils.identity_cache import identity_cache
+from src.config import MEMORY_TRACE_FRAMES
+
+# 创建蓝图
+admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+@admin_bp.before_request
+def check_admin():
+    """
+    所有管理端点统一鉴权
+    """
+    if not AdminAuth.is_authorized():
+        return AdminAuth.forbidden()
+
+@admin_bp.route('/profiling')
+def api_profiling_status():
+    """
+    抽样窗口状态和已保存的剖析结果
+    """
+    return jsonify({
+        'window': Profiler.window_status(),
+        'routes': Profiler.list_profiles()
+    })
+
+@admin_bp.route('/profiling/window', methods=['POST'])
+def api_profiling_window():
+    """
+    开启抽样窗口
+
+    参数: rate（抽样比例，默认0.05）, seconds（窗口时长，默认300）
+    """
+    try:
+        rate = float(request.values.get('rate', 0.05))
+        seconds = float(request.values.get('seconds', 300))
+        return jsonify({'window': Profiler.start_window(rate, seconds)})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@admin_bp.route('/profiling/stop', methods=['POST'])
+def api_profiling_stop():
+    """
+    提前结束抽样窗口
+    """
+    return jsonify({'window': Profiler.stop_window()})
+
+@admin_bp.route('/profiling/<endpoint>/folded')
+def api_profiling_folded(endpoint):
+    """
+    某路由所有剖析结果合并后的折叠调用栈（火焰图输入）
+    """
+    return Response(Profiler.merged_folded(endpoint), content_type='text/plain; charset=utf-8')
+
+@admin_bp.route('/profiling/<endpoint>/<name>/stats')
+def api_profiling_stats(endpoint, name):
+    """
+    cProfile 统计摘要
+
+    参数: sort（cumulative / tottime / ncalls，默认 cumulative）, limit（默认40）
+    """
+    sort = request.args.get('sort', 'cumulative')
+    if sort not in ('cumulative', 'tottime', 'ncalls'):
+        return jsonify({'error': f'无效的排序字段: {sort}'}), 400
+    limit = min(request.args.get('limit', 40, type=int), 500)
+
+    text = Profiler.stats_text(endpoint, name, sort, limit)
+    if text is None:
+        return jsonify({'error': '剖析结果不存在'}), 404
+    return Response(text, content_type='text/plain; charset=utf-8')
+
+@admin_bp.route('/profiling/<endpoint>/<filename>')
+def api_profiling_file(endpoint, filename):
+    """
+    下载单个剖析文件（.folded / .prof）
+    """
+    if os.path.splitext(filename)[1] not in ('.folded', '.prof'):
+        return jsonify({'error': '无效的文件类型'}), 400
+    return send_from_directory(Profiler.route_dir(endpoint), filename, as_attachment=True)
+
+@admin_bp.route('/memory')
+def api_memory_status():
+    """
+    tracemalloc 状态、进程内存和存活对象统计
+
+    参数: collect=1 统计前先执行垃圾回收
+    """
+    return jsonify({
+        'status': MemoryDiagnostics.status(),
+        'objects': MemoryDiagnostics.live_objects(collect=request.args.get('collect') == '1')
+    })
+
+@admin_bp.route('/memory/start', methods=['POST'])
+def api_memory_start():
+    """
+    开始 tracemalloc 跟踪
+
+    参数: frames（每次分配记录的栈帧数）
+    """
+    frames = request.values.get('frames', MEMORY_TRACE_FRAMES, type=int)
+    return jsonify({'status': MemoryDiagnostics.start(frames)})
+
+@admin_bp.route('/memory/stop', methods=['POST'])
+def api_memory_stop():
+    """
+    停止跟踪并清空快照
+    """
+    return jsonify({'status': MemoryDiagnostics.stop()})
+
+@admin_bp.route('/memory/snapshots', methods=['POST'])
+def api_memory_snapshot():
+    """
+    保存快照
+
+    参数: label（快照标签）
+    """
+    try:
+        return jsonify({'snapshot': MemoryDiagnostics.take_snapshot(request.values.get('label', ''))})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@admin_bp.route('/memory/snapshots/<int:snapshot_id>')
+def api_memory_top(snapshot_id):
+    """
+    快照中占用最多的位置
+
+    参数: group_by（lineno / filename / traceback）, limit（默认30）
+    """
+    try:
+        group_by = request.args.get('group_by', 'lineno')
+        limit = min(request.args.get('limit', 30, type=int), 500)
+        return jsonify({'snapshot': snapshot_id, 'top': MemoryDiagnostics.top(snapshot_id, group_by, limit)})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@admin_bp.route('/memory/diff')
+def api_memory_diff():
+    """
+    对比两个快照
+
+    参数: from, to（快照ID）, group_by（lineno / filename / traceback）, limit（默认30）
+    """
+    from_id = request.args.get('from', type=int)
+    to_id = request.args.get('to', type=int)
+    if from_id is None or to_id is None:
+        return jsonify({'error': '缺少快照ID参数 from / to'}), 400
+    try:
+        group_by = request.args.get('group_by', 'lineno')
+        limit = min(request.args.get('limit', 30, type=int), 500)
+        return jsonify({'from': from_id, 'to': to_id,
+                        'diff': MemoryDiagnostics.diff(from_id, to_id, group_by, limit)})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@admin_bp.route('/cache')
+def api_cache_status():
+    """
+    行快照缓存统计（命中率、条目数和估算内存）
+    """
+    return jsonify({'identity': identity_cache.stats()})
+
+@admin_bp.route('/cache/clear', methods=['POST'])
+def api_cache_clear():
+    """
+    清空行快照缓存
+
+    参数: kind（order / item / plan，缺省时清空全部）
+    """
+    kind = request.values.get('kind')
+    if kind not in (None, 'order', 'item', 'plan'):
+        return jsonify({'error': f'无效的类别: {kind}'}), 400
+    identity_cache.clear(kind)
+    return jsonify({'identity': identity_cache.stats()})
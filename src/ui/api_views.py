@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+通用API视图
+"""
+from flask import Blueprint, Response, request, jsonify
+from src.services.autocomplete_service import AutocompleteService
+from src.services.change_service import ChangeService, SyncTokenExpired
+from src.models.database import session_factory
+from src.models.row_records import parse_fields
+from src.utils.json_utils import JsonUtils
+from src.utils.event_bus import event_bus
+from src.config import (AUTOCOMPLETE_DEFAULT_LIMIT, CHANGES_DEFAULT_LIMIT, CHANGES_MAX_LIMIT,
+                        EVENTS_HEARTBEAT_SECONDS, EVENTS_RETRY_MS)
+
+# 可订阅的事件主题
+EVENT_TOPICS = ('order', 'plan', 'inventory')
+
+# 创建蓝图
+api_bp = Blueprint('api', __name__, url_prefix='/api')
+
+@api_bp.route('/autocomplete/<kind>')
+def api_autocomplete(kind):
+    """
+    自动补全API（kind: orders / parts / plans）
+    
+    参数: q（前缀）, limit（返回条数，最多50）
+    """
+    if kind not in AutocompleteService.KINDS:
+        return jsonify({'error': f'无效的补全类型: {kind}'}), 404
+    
+    try:
+        db = session_factory()
+        autocomplete_service = AutocompleteService(db)
+        
+        q = request.args.get('q', '')
+        limit = min(request.args.get('limit', AUTOCOMPLETE_DEFAULT_LIMIT, type=int), 50)
+        
+        results = autocomplete_service.search(kind, q, limit)
+        return jsonify({'q': q, 'results': results})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
+
+@api_bp.route('/changes/<kind>')
+def api_changes(kind):
+    """
+    增量同步API（kind: orders / items / plans）
+    
+    参数: since（上次返回的 next 令牌，为空时从头读取）, limit（最多 CHANGES_MAX_LIMIT）,
+          fields（逗号分隔，只返回这些字段）, format（rows / columnar）
+    返回: changes（新增/修改的行）, deleted（删除/归档的行ID）, next（下次请求的令牌）,
+          has_more（为 true 时应立即用 next 继续读取）；令牌过期时返回 410，需重新全量同步
+    """
+    if kind not in ChangeService.KINDS:
+        return jsonify({'error': f'无效的同步类型: {kind}'}), 404
+    
+    try:
+        db = session_factory()
+        change_service = ChangeService(db)
+        
+        fmt = JsonUtils.list_format()
+        fields = parse_fields(request.args.get('fields'), ChangeService.KINDS[kind][2])
+        limit = min(max(request.args.get('limit', CHANGES_DEFAULT_LIMIT, type=int), 1), CHANGES_MAX_LIMIT)
+        
+        result = change_service.get_changes(kind, request.args.get('since'), limit, fields)
+        return jsonify(JsonUtils.list_payload('changes', result, fmt))
+        
+    except SyncTokenExpired as e:
+        return jsonify({'error': str(e)}), 410
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
+
+@api_bp.route('/events')
+def api_events():
+    """
+    变更事件推送（Server-Sent Events）
+    
+    参数: topics（逗号分隔：order / plan / inventory，默认全部）
+    事件: order / plan {id, status, previous}（新建时 previous 为 null，删除时 status 为 null）,
+          inventory {id, part_code, quantity, previous}；
+          reset 表示有事件未能送达，客户端应重新读取完整数据
+    事件ID为 "<启动标识>-<序号>"，断线重连时浏览器自动带上 Last-Event-ID，从其之后补发；
+    服务重启后（启动标识不一致）先发送 reset。不占用数据库会话。
+    """
+    topics = [topic for topic in request.args.get('topics', '').split(',') if topic]
+    unknown = [topic for topic in topics if topic not in EVENT_TOPICS]
+    if unknown:
+        return jsonify({'error': f"无效的主题: {', '.join(unknown)}（可选: {', '.join(EVENT_TOPICS)}）"}), 400
+    
+    last_event_id = request.headers.get('Last-Event-ID')
+    subscription = event_bus.subscribe(topics, last_event_id)
+    if subscription is None:
+        return jsonify({'error': '推送连接数已达上限'}), 503
+    
+    def stream():
+        yield f"retry: {EVENTS_RETRY_MS}\n\n"
+        while True:
+            events = subscription.wait(EVENTS_HEARTBEAT_SECONDS)
+            if events is None:
+                yield f"id: {event_bus.event_id(subscription.cursor)}\nevent: reset\ndata: {{}}\n\n"
+            elif events:
+                yield ''.join(f"id: {event_bus.event_id(event.id)}\nevent: {event.topic}\ndata: {event.data}\n\n"
+                              for event in events)
+            else:
+                yield ': keepalive\n\n'
+    
+    response = Response(stream(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # 客户端断开后服务器在下一次写入（最迟为心跳）时关闭响应，此时注销订阅
+    response.call_on_close(subscription.close)
+    return response
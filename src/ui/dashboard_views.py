@@ -4,6 +4,7 @@
 """
 from flask import Blueprint, render_template, jsonify
 from src.utils.db_decorators import with_database_and_services
+from src.utils.request_timing import RequestTiming
 import plotly.graph_objects as go
 import plotly.utils
 import json
@@ -45,6 +46,7 @@ def page_dashboard(db, services):
                              inventory_chart='',
                              production_chart='')
 
+@RequestTiming.timed('chart')
 def create_order_completion_chart(order_stats):
     """
     创建订单完成率饼图
@@ -72,6 +74,7 @@ def create_order_completion_chart(order_stats):
         print(f"创建订单完成率饼图失败: {e}")
         return ''
 
+@RequestTiming.timed('chart')
 def create_inventory_radar_chart(inventory_stats):
     """
     创建库存雷达图
@@ -6,9 +6,12 @@ from flask import Blueprint, render_template, request, jsonify, redirect, url_fo
 from src.services.inventory_service import InventoryService
 from src.models.database import session_factory
 import os
-from src.config import QRCODE_DIR
+from src.config import QRCODE_DIR, DEFAULT_PAGE_SIZE, API_MAX_PAGE_SIZE
 from src.utils.matplotlib_charts import MatplotlibCharts
 from src.utils.status_mapping import StatusMapping
+from src.utils.export_utils import ExportUtils
+from src.utils.json_utils import JsonUtils
+from src.models.row_records import INVENTORY_FIELDS, parse_fields
 
 # 创建蓝图
 inventory_bp = Blueprint('inventory', __name__, url_prefix='/inventory')
@@ -44,6 +47,29 @@ def page_inventory_list():
     finally:
         db.close()
 
+@inventory_bp.route('/export')
+def page_inventory_export():
+    """
+    导出库存物料列表（遵循列表页搜索条件，format 支持 csv / ndjson / xlsx）
+    """
+    fmt = request.args.get('format', 'csv')
+    search = request.args.get('search', '')
+    
+    def generate_rows():
+        # 响应流式输出时视图函数已返回，会话需在生成器内部打开和关闭
+        db = session_factory()
+        try:
+            yield from InventoryService(db).iter_export_rows(search=search)
+        finally:
+            db.close()
+    
+    try:
+        return ExportUtils.stream_response(fmt, 'inventory', InventoryService.EXPORT_HEADERS, generate_rows(),
+                                           request.headers.get('Accept-Encoding'))
+    except ValueError as e:
+        flash(f'导出失败: {str(e)}', 'error')
+        return redirect(url_for('inventory.page_inventory_list', search=search))
+
 @inventory_bp.route('/create', methods=['GET', 'POST'])
 def page_inventory_create():
     """
@@ -87,12 +113,12 @@ def page_inventory_edit(item_id):
         inventory_service = InventoryService(db)
         
         if request.method == 'GET':
-            item = inventory_service.get_item_by_id(item_id)
+            item = inventory_service.get_item_snapshot(item_id)
             if not item:
                 flash('库存物料不存在', 'error')
                 return redirect(url_for('inventory.page_inventory_list'))
             
-            return render_template('inventory/form.html', item=item.to_dict())
+            return render_template('inventory/form.html', item=item)
         
         # 获取表单数据
         item_data = {
@@ -150,16 +176,17 @@ def page_inventory_qrcode(item_id):
         db = session_factory()
         inventory_service = InventoryService(db)
         
-        item = inventory_service.get_item_by_id(item_id)
+        # 只需要物料编码，读缓存快照
+        item = inventory_service.get_item_snapshot(item_id)
         if not item:
             flash('库存物料不存在', 'error')
             return redirect(url_for('inventory.page_inventory_list'))
         
         # 检查二维码文件是否存在
-        qr_path = os.path.join(QRCODE_DIR, f"{item.part_code}.png")
+        qr_path = os.path.join(QRCODE_DIR, f"{item['part_code']}.png")
         if not os.path.exists(qr_path):
             # 重新生成二维码
-            item.generate_qrcode()
+            inventory_service.get_item_by_id(item_id).generate_qrcode()
         
         return send_file(qr_path, mimetype='image/png')
         
@@ -323,6 +350,40 @@ def create_inventory_charts(items):
         traceback.print_exc()
         return {'location_chart': '', 'quantity_chart': '', 'category_chart': ''}
 
+@inventory_bp.route('/api/items')
+def api_inventory_list():
+    """
+    库存物料列表API（分页）
+    
+    参数: page, per_page（最多 API_MAX_PAGE_SIZE）, search,
+          format（rows：对象数组，默认；columnar：列名 + 按列的值数组，时间为秒级时间戳）,
+          fields（逗号分隔，只返回这些字段）,
+          ids（逗号分隔，按ID批量读取，最多 API_MAX_BATCH_IDS 个；此时忽略分页和搜索参数）
+    """
+    try:
+        db = session_factory()
+        inventory_service = InventoryService(db)
+        
+        fmt = JsonUtils.list_format()
+        fields = parse_fields(request.args.get('fields'), INVENTORY_FIELDS)
+        
+        ids = JsonUtils.requested_ids()
+        if ids is not None:
+            result = inventory_service.get_items_by_ids(ids, fields)
+        else:
+            page = max(request.args.get('page', 1, type=int), 1)
+            per_page = min(max(request.args.get('per_page', DEFAULT_PAGE_SIZE, type=int), 1), API_MAX_PAGE_SIZE)
+            result = inventory_service.get_items(page=page, per_page=per_page, search=request.args.get('search', ''),
+                                                 fields=fields)
+        return jsonify(JsonUtils.list_payload('items', result, fmt))
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
+
 @inventory_bp.route('/api/statistics')
 def api_inventory_statistics():
     """
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+"""
+指标视图（Prometheus 文本格式）
+"""
+from flask import Blueprint, Response
+from src.utils.metrics import REGISTRY
+
+# 创建蓝图
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics')
+def page_metrics():
+    """
+    Prometheus 抓取端点
+    """
+    return Response(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
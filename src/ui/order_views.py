@@ -4,10 +4,16 @@
 """
 from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash
 from src.services.order_service import OrderService
+from src.services.forecast_service import ForecastService
+from src.services.risk_service import RiskService
 from src.models.database import session_factory
-from src.config import ORDER_STATUS
+from src.config import (ORDER_STATUS, FORECAST_DEFAULT_REPLICATIONS, RISK_SLACK_THRESHOLD_DAYS,
+                        DEFAULT_PAGE_SIZE, API_MAX_PAGE_SIZE)
 from src.utils.matplotlib_charts import MatplotlibCharts
 from src.utils.status_mapping import StatusMapping
+from src.utils.export_utils import ExportUtils
+from src.utils.json_utils import JsonUtils
+from src.models.row_records import ORDER_FIELDS, parse_fields
 
 # 创建蓝图
 order_bp = Blueprint('order', __name__, url_prefix='/order')
@@ -25,25 +31,51 @@ def page_order_list():
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 10))
         search = request.args.get('search', '')
+        include_archived = request.args.get('include_archived') == '1'
         
         # 获取订单列表
-        result = order_service.get_orders(page=page, per_page=per_page, search=search)
+        result = order_service.get_orders(page=page, per_page=per_page, search=search, include_archived=include_archived)
         
         # 获取统计信息
-        stats = order_service.get_order_statistics()
+        stats = order_service.get_order_statistics(include_archived=include_archived)
         
         return render_template('order/list.html', 
                              orders=result['orders'],
                              pagination=result,
                              search=search,
+                             include_archived=include_archived,
                              stats=stats,
                              status_options=ORDER_STATUS)
     except Exception as e:
         flash(f'获取订单列表失败: {str(e)}', 'error')
-        return render_template('order/list.html', orders=[], pagination={}, search='', stats={}, status_options=ORDER_STATUS)
+        return render_template('order/list.html', orders=[], pagination={}, search='', include_archived=False, stats={}, status_options=ORDER_STATUS)
     finally:
         db.close()
 
+@order_bp.route('/export')
+def page_order_export():
+    """
+    导出订单列表（遵循列表页搜索条件和 include_archived=1（含归档），format 支持 csv / ndjson / xlsx）
+    """
+    fmt = request.args.get('format', 'csv')
+    search = request.args.get('search', '')
+    include_archived = request.args.get('include_archived') == '1'
+    
+    def generate_rows():
+        # 响应流式输出时视图函数已返回，会话需在生成器内部打开和关闭
+        db = session_factory()
+        try:
+            yield from OrderService(db).iter_export_rows(search=search, include_archived=include_archived)
+        finally:
+            db.close()
+    
+    try:
+        return ExportUtils.stream_response(fmt, 'orders', OrderService.EXPORT_HEADERS, generate_rows(),
+                                           request.headers.get('Accept-Encoding'))
+    except ValueError as e:
+        flash(f'导出失败: {str(e)}', 'error')
+        return redirect(url_for('order.page_order_list', search=search, include_archived='1' if include_archived else None))
+
 @order_bp.route('/create', methods=['GET', 'POST'])
 def page_order_create():
     """
@@ -88,12 +120,12 @@ def page_order_edit(order_id):
         order_service = OrderService(db)
         
         if request.method == 'GET':
-            order = order_service.get_order_by_id(order_id)
+            order = order_service.get_order_snapshot(order_id)
             if not order:
                 flash('订单不存在', 'error')
                 return redirect(url_for('order.page_order_list'))
             
-            return render_template('order/form.html', order=order.to_dict(), status_options=ORDER_STATUS)
+            return render_template('order/form.html', order=order, status_options=ORDER_STATUS)
         
         # 获取表单数据
         order_data = {
@@ -270,6 +302,41 @@ def create_order_charts(orders):
         traceback.print_exc()
         return {'status_chart': '', 'customer_chart': ''}
 
+@order_bp.route('/api/orders')
+def api_order_list():
+    """
+    订单列表API（分页）
+    
+    参数: page, per_page（最多 API_MAX_PAGE_SIZE）, search, include_archived=1（含归档）,
+          format（rows：对象数组，默认；columnar：列名 + 按列的值数组，时间为秒级时间戳）,
+          fields（逗号分隔，只返回这些字段）,
+          ids（逗号分隔，按ID批量读取，最多 API_MAX_BATCH_IDS 个；此时忽略分页和搜索参数）
+    """
+    try:
+        db = session_factory()
+        order_service = OrderService(db)
+        
+        fmt = JsonUtils.list_format()
+        fields = parse_fields(request.args.get('fields'), ORDER_FIELDS)
+        include_archived = request.args.get('include_archived') == '1'
+        
+        ids = JsonUtils.requested_ids()
+        if ids is not None:
+            result = order_service.get_orders_by_ids(ids, fields, include_archived)
+        else:
+            page = max(request.args.get('page', 1, type=int), 1)
+            per_page = min(max(request.args.get('per_page', DEFAULT_PAGE_SIZE, type=int), 1), API_MAX_PAGE_SIZE)
+            result = order_service.get_orders(page=page, per_page=per_page, search=request.args.get('search', ''),
+                                              include_archived=include_archived, fields=fields)
+        return jsonify(JsonUtils.list_payload('orders', result, fmt))
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
+
 @order_bp.route('/api/statistics')
 def api_order_statistics():
     """
@@ -286,3 +353,72 @@ def api_order_statistics():
         return jsonify({'error': str(e)}), 500
     finally:
         db.close()
+
+@order_bp.route('/api/forecast')
+def api_order_forecast():
+    """
+    订单交期仿真API
+    
+    参数: replications, workers（1 ~ FORECAST_MAX_WORKERS）, seed, order_ids=1,2,3, sigma=Line-A:0.2,Line-C:0.3,
+          format（rows：对象数组，默认；columnar：orders 按列输出，时间为秒级时间戳）
+    """
+    try:
+        db = session_factory()
+        forecast_service = ForecastService(db)
+        
+        fmt = JsonUtils.list_format()
+        replications = request.args.get('replications', type=int)
+        workers = request.args.get('workers', type=int)
+        seed = request.args.get('seed', type=int)
+        
+        order_ids = None
+        if request.args.get('order_ids'):
+            order_ids = {int(order_id) for order_id in request.args['order_ids'].split(',') if order_id.strip()}
+        
+        line_sigma = {}
+        if request.args.get('sigma'):
+            for item in request.args['sigma'].split(','):
+                line, _, sigma = item.partition(':')
+                line_sigma[line.strip()] = float(sigma)
+        
+        result = forecast_service.forecast_completion(
+            replications=replications or FORECAST_DEFAULT_REPLICATIONS,
+            workers=workers,
+            seed=seed,
+            order_ids=order_ids,
+            line_sigma=line_sigma
+        )
+        return jsonify(JsonUtils.list_payload('orders', result, fmt))
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
+
+@order_bp.route('/api/due-date-risk')
+def api_order_due_date_risk():
+    """
+    订单交期风险API
+    
+    参数: threshold_days（余量阈值，天）, limit（返回的风险订单数）,
+          format（rows：对象数组，默认；columnar：at_risk 按列输出，时间为秒级时间戳）
+    """
+    try:
+        db = session_factory()
+        risk_service = RiskService(db)
+        
+        fmt = JsonUtils.list_format()
+        result = risk_service.get_due_date_risk(
+            threshold_days=request.args.get('threshold_days', RISK_SLACK_THRESHOLD_DAYS, type=float),
+            limit=request.args.get('limit', 100, type=int)
+        )
+        return jsonify(JsonUtils.list_payload('at_risk', result, fmt))
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
@@ -2,11 +2,18 @@
 """
 生产计划视图
 """
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash
+from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash, Response, stream_with_context
 from src.services.production_service import ProductionService
 from src.services.order_service import OrderService
+from src.services.sandbox_service import SandboxService
+from src.services.schedule_audit_service import ScheduleAuditService
+from src.services.utilization_service import UtilizationService
 from src.models.database import session_factory
-from src.config import PRODUCTION_STATUS
+from src.config import PRODUCTION_STATUS, TIMELINE_RESOLUTIONS, DEFAULT_PAGE_SIZE, API_MAX_PAGE_SIZE
+from src.utils.export_utils import ExportUtils
+from src.utils.json_utils import JsonUtils
+from src.models.row_records import PLAN_API_FIELDS, parse_fields
+from datetime import datetime, timedelta
 import plotly.graph_objects as go
 import plotly.utils
 import json
@@ -27,25 +34,51 @@ def page_production_list():
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 10))
         search = request.args.get('search', '')
+        include_archived = request.args.get('include_archived') == '1'
         
         # 获取生产计划列表
-        result = production_service.get_plans(page=page, per_page=per_page, search=search)
+        result = production_service.get_plans(page=page, per_page=per_page, search=search, include_archived=include_archived)
         
         # 获取统计信息
-        stats = production_service.get_production_statistics()
+        stats = production_service.get_production_statistics(include_archived=include_archived)
         
         return render_template('production/list.html', 
                              plans=result['plans'],
                              pagination=result,
                              search=search,
+                             include_archived=include_archived,
                              stats=stats,
                              status_options=PRODUCTION_STATUS)
     except Exception as e:
         flash(f'获取生产计划列表失败: {str(e)}', 'error')
-        return render_template('production/list.html', plans=[], pagination={}, search='', stats={}, status_options=PRODUCTION_STATUS)
+        return render_template('production/list.html', plans=[], pagination={}, search='', include_archived=False, stats={}, status_options=PRODUCTION_STATUS)
     finally:
         db.close()
 
+@production_bp.route('/export')
+def page_production_export():
+    """
+    导出生产计划列表（遵循列表页搜索条件和 include_archived=1（含归档），format 支持 csv / ndjson / xlsx）
+    """
+    fmt = request.args.get('format', 'csv')
+    search = request.args.get('search', '')
+    include_archived = request.args.get('include_archived') == '1'
+    
+    def generate_rows():
+        # 响应流式输出时视图函数已返回，会话需在生成器内部打开和关闭
+        db = session_factory()
+        try:
+            yield from ProductionService(db).iter_export_rows(search=search, include_archived=include_archived)
+        finally:
+            db.close()
+    
+    try:
+        return ExportUtils.stream_response(fmt, 'production_plans', ProductionService.EXPORT_HEADERS, generate_rows(),
+                                           request.headers.get('Accept-Encoding'))
+    except ValueError as e:
+        flash(f'导出失败: {str(e)}', 'error')
+        return redirect(url_for('production.page_production_list', search=search, include_archived='1' if include_archived else None))
+
 @production_bp.route('/create', methods=['GET', 'POST'])
 def page_production_create():
     """
@@ -57,11 +90,10 @@ def page_production_create():
         order_service = OrderService(db)
         
         if request.method == 'GET':
-            # 获取所有订单
-            orders = order_service.get_orders(page=1, per_page=1000)['orders']
+            # 订单通过自动补全API选择，不再预加载订单列表
             return render_template('production/form.html', 
                                  plan=None, 
-                                 orders=orders,
+                                 current_order=None,
                                  status_options=PRODUCTION_STATUS)
         
         # 获取表单数据
@@ -97,17 +129,17 @@ def page_production_edit(plan_id):
         order_service = OrderService(db)
         
         if request.method == 'GET':
-            plan = production_service.get_plan_by_id(plan_id)
+            plan = production_service.get_plan_snapshot(plan_id)
             if not plan:
                 flash('生产计划不存在', 'error')
                 return redirect(url_for('production.page_production_list'))
             
-            # 获取所有订单
-            orders = order_service.get_orders(page=1, per_page=1000)['orders']
+            # 当前关联订单（用于回显自动补全输入框）
+            order = order_service.get_order_snapshot(plan['order_id'])
             
             return render_template('production/form.html', 
-                                 plan=plan.to_dict(), 
-                                 orders=orders,
+                                 plan=plan, 
+                                 current_order=order,
                                  status_options=PRODUCTION_STATUS)
         
         # 获取表单数据
@@ -216,28 +248,36 @@ def page_production_gantt():
         db = session_factory()
         production_service = ProductionService(db)
         
-        # 获取所有生产计划
-        result = production_service.get_plans(page=1, per_page=1000)
-        plans = result['plans']
+        # 按状态、生产线聚合统计（覆盖全部计划）
+        distribution = production_service.get_plan_distribution()
         
         # 创建统计图表
-        charts = create_gantt_chart(plans)
+        charts = create_gantt_chart(distribution)
+        
+        # 生产线利用率热力图（最近7天到未来30天，按天）
+        now = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        utilization = UtilizationService(db).get_line_utilization(
+            now - timedelta(days=7), now + timedelta(days=30), 'day'
+        )
+        utilization_chart = create_utilization_chart(utilization)
         
         return render_template('production/gantt.html', 
                              status_chart=charts.get('status_chart', ''),
                              line_chart=charts.get('line_chart', ''),
-                             plans=plans)
+                             utilization_chart=utilization_chart,
+                             resolutions=TIMELINE_RESOLUTIONS)
         
     except Exception as e:
         flash(f'获取统计图表失败: {str(e)}', 'error')
         return render_template('production/gantt.html', 
                              status_chart='', 
                              line_chart='', 
-                             plans=[])
+                             utilization_chart='',
+                             resolutions=TIMELINE_RESOLUTIONS)
     finally:
         db.close()
 
-def create_gantt_chart(plans):
+def create_gantt_chart(distribution):
     """
     创建生产计划状态分布图（使用matplotlib柱状图）
     """
@@ -245,26 +285,11 @@ def create_gantt_chart(plans):
         from src.utils.matplotlib_charts import MatplotlibCharts
         from src.utils.status_mapping import StatusMapping
         
-        if not plans:
-            return {'status_chart': '', 'line_chart': ''}
-        
-        # 按状态和生产线统计
-        status_stats = {}
-        line_stats = {}
+        status_stats = distribution.get('status', {})
+        line_stats = distribution.get('line', {})
         
-        for plan in plans:
-            status = plan['status']
-            line = plan['line']
-            
-            # 统计状态分布
-            if status not in status_stats:
-                status_stats[status] = 0
-            status_stats[status] += 1
-            
-            # 统计生产线分布
-            if line not in line_stats:
-                line_stats[line] = 0
-            line_stats[line] += 1
+        if not status_stats:
+            return {'status_chart': '', 'line_chart': ''}
         
         # 翻译状态为中文，生产线保持英文
         translated_status_stats = StatusMapping.translate_status_dict(status_stats)
@@ -290,6 +315,58 @@ def create_gantt_chart(plans):
         print(f"创建生产计划图表失败: {e}")
         return {'status_chart': '', 'line_chart': ''}
 
+def create_utilization_chart(utilization):
+    """
+    创建生产线利用率热力图
+    """
+    try:
+        from src.utils.matplotlib_charts import MatplotlibCharts
+        
+        return MatplotlibCharts.create_heatmap(
+            title='生产线利用率(%)',
+            row_labels=utilization['lines'],
+            col_labels=utilization['buckets'],
+            values=utilization['utilization']
+        )
+    except Exception as e:
+        print(f"创建利用率热力图失败: {e}")
+        return ''
+
+@production_bp.route('/api/plans')
+def api_production_list():
+    """
+    生产计划列表API（分页）
+    
+    参数: page, per_page（最多 API_MAX_PAGE_SIZE）, search, include_archived=1（含归档）,
+          format（rows：对象数组，默认；columnar：列名 + 按列的值数组，时间为秒级时间戳）,
+          fields（逗号分隔，只返回这些字段）,
+          ids（逗号分隔，按ID批量读取，最多 API_MAX_BATCH_IDS 个；此时忽略分页和搜索参数）
+    """
+    try:
+        db = session_factory()
+        production_service = ProductionService(db)
+        
+        fmt = JsonUtils.list_format()
+        fields = parse_fields(request.args.get('fields'), PLAN_API_FIELDS)
+        include_archived = request.args.get('include_archived') == '1'
+        
+        ids = JsonUtils.requested_ids()
+        if ids is not None:
+            result = production_service.get_plans_by_ids(ids, fields, include_archived)
+        else:
+            page = max(request.args.get('page', 1, type=int), 1)
+            per_page = min(max(request.args.get('per_page', DEFAULT_PAGE_SIZE, type=int), 1), API_MAX_PAGE_SIZE)
+            result = production_service.get_plans(page=page, per_page=per_page, search=request.args.get('search', ''),
+                                                  include_archived=include_archived, fields=fields)
+        return jsonify(JsonUtils.list_payload('plans', result, fmt))
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
+
 @production_bp.route('/api/statistics')
 def api_production_statistics():
     """
@@ -306,3 +383,116 @@ def api_production_statistics():
         return jsonify({'error': str(e)}), 500
     finally:
         db.close()
+
+@production_bp.route('/api/sandbox', methods=['POST'])
+def api_production_sandbox():
+    """
+    排程沙盘API（假设分析，不写数据库）
+    
+    请求体为场景的JSON对象（为空时只计算基线）
+    """
+    try:
+        db = session_factory()
+        sandbox_service = SandboxService(db)
+        
+        scenario = request.get_json(silent=True) if request.get_data() else {}
+        if not isinstance(scenario, dict):
+            raise ValueError("场景必须是JSON对象")
+        result = sandbox_service.evaluate_scenario(scenario)
+        return jsonify(result)
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
+
+@production_bp.route('/api/audit')
+def api_production_audit():
+    """
+    排程完整性审计API（NDJSON流式输出）
+    
+    逐行流式输出，不支持 format=columnar（列式需要先取得全部结果）；format 只接受 ndjson
+    """
+    fmt = request.args.get('format', 'ndjson')
+    if fmt != 'ndjson':
+        return jsonify({'error': f"无效的输出格式: {fmt}（可选: ndjson）"}), 400
+    
+    def generate():
+        db = session_factory()
+        try:
+            for line in ScheduleAuditService(db).iter_ndjson():
+                yield line
+        finally:
+            db.close()
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@production_bp.route('/api/timeline')
+def api_production_timeline():
+    """
+    甘特时间轴API
+    
+    参数: from, to（默认最近7天到未来30天）, resolution（秒或 hour/day/week）, line（可多个）
+    """
+    try:
+        db = session_factory()
+        production_service = ProductionService(db)
+        
+        now = datetime.now()
+        start = request.args.get('from')
+        end = request.args.get('to')
+        start = production_service._parse_datetime(start) if start else now - timedelta(days=7)
+        end = production_service._parse_datetime(end) if end else now + timedelta(days=30)
+        
+        resolution = request.args.get('resolution', '')
+        if resolution in TIMELINE_RESOLUTIONS:
+            resolution = TIMELINE_RESOLUTIONS[resolution]
+        elif resolution.isdigit():
+            resolution = int(resolution)
+        else:
+            resolution = None
+        
+        result = production_service.get_timeline(
+            start, end,
+            resolution=resolution,
+            lines=request.args.getlist('line') or None
+        )
+        return jsonify(result)
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
+
+@production_bp.route('/api/utilization')
+def api_production_utilization():
+    """
+    生产线利用率热力图API
+    
+    参数: from, to（默认最近7天到未来30天）, granularity（hour/day/week）
+    """
+    try:
+        db = session_factory()
+        utilization_service = UtilizationService(db)
+        
+        now = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        start = request.args.get('from')
+        end = request.args.get('to')
+        start = ProductionService._parse_datetime(start) if start else now - timedelta(days=7)
+        end = ProductionService._parse_datetime(end) if end else now + timedelta(days=30)
+        
+        result = utilization_service.get_line_utilization(
+            start, end, request.args.get('granularity', 'day')
+        )
+        return jsonify(result)
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
@@ -0,0 +1,47 @@
+"""
+管理端点鉴权工具模块
+"""
+from functools import wraps
+import hmac
+from flask import jsonify, request
+from src.config import ADMIN_TOKEN
+
+
+class AdminAuth:
+    """
+    管理端点鉴权工具类
+    """
+
+    @staticmethod
+    def is_authorized() -> bool:
+        """
+        判断当前请求是否具备管理权限
+
+        只接受请求头 X-Admin-Token 中的令牌（不接受查询参数，避免令牌写入日志）；
+        未配置 EV_MES_ADMIN_TOKEN 时一律拒绝（来源地址在反向代理后不可信）。
+
+        Returns:
+            bool: 是否允许访问
+        """
+        if not ADMIN_TOKEN:
+            return False
+        token = request.headers.get('X-Admin-Token', '')
+        return hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8'))
+
+    @staticmethod
+    def forbidden():
+        if not ADMIN_TOKEN:
+            return jsonify({'error': '未配置 EV_MES_ADMIN_TOKEN，管理端点已禁用'}), 403
+        return jsonify({'error': '需要管理权限'}), 403
+
+
+def admin_required(func):
+    """
+    管理权限装饰器
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not AdminAuth.is_authorized():
+            return AdminAuth.forbidden()
+        return func(*args, **kwargs)
+    return wrapper
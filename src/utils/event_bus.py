@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+进程内事件总线工具模块
+
+服务层在写操作提交后发布小的变更事件（订单/计划状态、库存数量），/api/events 以 Server-Sent Events
+推送给仪表板等页面，页面据此增量更新，不必定时整页刷新重新计算全部统计。
+
+所有订阅者共享一份最近事件的环形日志（EVENT_BUS_HISTORY 条），订阅者只记录自己读到的事件ID，
+空闲时在同一个条件变量上等待：没有每个连接的队列，事件只序列化一次。断线重连时按 Last-Event-ID
+补发期间的事件；落后超过日志长度的订阅者收到 reset，由页面重新读取完整统计。
+
+事件ID为 "<启动标识>-<序号>"：序号在进程重启（或连接到另一个 worker）后从头计数，
+启动标识不一致的 Last-Event-ID 无法补发，同样发送 reset。
+
+部署：每个 SSE 连接在等待期间占用一个 worker 的并发单元。同步 worker / 开发服务器下即每个连接一个线程，
+只适合少量连接；墙上看板等大量空闲连接应使用 gevent worker（threading 被协程化，等待的连接只是一个协程）:
+    gunicorn -k gevent -w 1 --worker-connections 1000 'app:create_app()'
+事件只在本进程内传递，多进程部署时连接到其他 worker 的页面收不到本进程的事件（页面会定期全量刷新兜底），
+因此推荐单个 gevent worker 承载 SSE 连接。
+"""
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from collections import deque
+from itertools import islice
+import json
+import secrets
+import threading
+from src.utils.metrics import EVENTS_PUBLISHED, EVENTS_SUBSCRIBERS
+from src.config import EVENT_BUS_HISTORY, EVENTS_MAX_SUBSCRIBERS
+
+
+class Event(NamedTuple):
+    id: int
+    topic: str
+    # 已序列化的 JSON（所有订阅者共用）
+    data: str
+
+
+class Subscription:
+    """
+    单个订阅（只保存读取位置和关注的主题）
+    """
+
+    def __init__(self, bus: 'EventBus', topics: Optional[frozenset], cursor: int, stale: bool = False):
+        self.bus = bus
+        self.topics = topics
+        self.cursor = cursor
+        # 客户端的事件ID来自其他进程（重启前的进程或其他 worker），无法补发
+        self.stale = stale
+        self.closed = False
+
+    def wait(self, timeout: float) -> Optional[List[Event]]:
+        """
+        等待新事件（最多 timeout 秒）
+
+        Returns:
+            List[Event]: 关注主题的新事件（超时时为空列表）；None 表示有事件未能读取
+            （已滚出日志，或客户端的事件ID来自其他进程），需要全量刷新
+        """
+        events = None if self.stale else self.bus._read_after(self.cursor, timeout)
+        self.stale = False
+        if events is None:
+            self.cursor = self.bus.last_id
+            return None
+        if events:
+            self.cursor = events[-1].id
+        return [event for event in events if self.topics is None or event.topic in self.topics]
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.bus._unsubscribe()
+
+
+class EventBus:
+    """
+    发布/订阅事件总线
+    """
+
+    def __init__(self, history: int = EVENT_BUS_HISTORY, max_subscribers: int = EVENTS_MAX_SUBSCRIBERS):
+        self.max_subscribers = max_subscribers
+        # 本进程的启动标识（事件ID的前缀）
+        self.boot_id = secrets.token_hex(4)
+        self._cond = threading.Condition()
+        self._events: 'deque[Event]' = deque(maxlen=history)
+        self._last_id = 0
+        self._subscribers = 0
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def event_id(self, sequence: int) -> str:
+        """
+        SSE 的事件ID（启动标识-序号）
+        """
+        return f'{self.boot_id}-{sequence}'
+
+    def _parse_event_id(self, value: str) -> Optional[int]:
+        """
+        解析客户端传回的事件ID，不是本进程签发的（启动标识不一致、格式无效）返回 None
+        """
+        boot_id, _, sequence = value.rpartition('-')
+        if boot_id != self.boot_id or not sequence.isdigit():
+            return None
+        return int(sequence)
+
+    def publish(self, topic: str, data: Dict) -> int:
+        """
+        发布事件（在写操作提交之后调用），返回事件ID
+        """
+        payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str)
+        with self._cond:
+            self._last_id += 1
+            self._events.append(Event(self._last_id, topic, payload))
+            self._cond.notify_all()
+        EVENTS_PUBLISHED.labels(topic).inc()
+        return self._last_id
+
+    def subscribe(self, topics: Iterable[str] = None, last_event_id: str = None) -> Optional[Subscription]:
+        """
+        订阅事件
+
+        Args:
+            topics: 关注的主题（默认全部）
+            last_event_id: 断线重连时客户端最后收到的事件ID（event_id 的返回值），从其之后补发；
+                不是本进程签发的ID需要全量刷新，订阅后第一次 wait 返回 None
+
+        Returns:
+            Subscription: 订阅（用完后 close），订阅者已达上限时返回 None
+        """
+        with self._cond:
+            if self._subscribers >= self.max_subscribers:
+                return None
+            self._subscribers += 1
+            cursor = self._last_id
+            stale = False
+            if last_event_id is not None:
+                sequence = self._parse_event_id(last_event_id)
+                stale = sequence is None or sequence > self._last_id
+                if not stale:
+                    cursor = sequence
+        EVENTS_SUBSCRIBERS.inc()
+        return Subscription(self, frozenset(topics) if topics else None, cursor, stale)
+
+    def _unsubscribe(self):
+        with self._cond:
+            self._subscribers -= 1
+        EVENTS_SUBSCRIBERS.dec()
+
+    def _read_after(self, cursor: int, timeout: float) -> Optional[List[Event]]:
+        with self._cond:
+            if self._last_id <= cursor:
+                self._cond.wait(timeout)
+            pending = self._last_id - cursor
+            if pending <= 0:
+                return []
+            if pending > len(self._events):
+                return None
+            # 日志中的事件ID连续，最后 pending 条即为新事件
+            return list(islice(reversed(self._events), pending))[::-1]
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                'subscribers': self._subscribers,
+                'max_subscribers': self.max_subscribers,
+                'boot_id': self.boot_id,
+                'last_event_id': self._last_id,
+                'history': len(self._events)
+            }
+
+
+# 进程内共享实例
+event_bus = EventBus()
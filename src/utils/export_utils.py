@@ -0,0 +1,201 @@
+"""
+数据导出工具模块
+提供CSV / NDJSON / XLSX 的流式生成与gzip即时压缩
+"""
+from typing import Any, Iterable, Iterator, List, Sequence
+from datetime import date, datetime
+import csv
+import io
+import json
+import os
+import tempfile
+import zlib
+from flask import Response, stream_with_context
+
+
+class ExportUtils:
+    """
+    流式导出工具类
+
+    所有生成器都逐批产出 bytes，内存占用只与批大小有关，与导出总行数无关
+    """
+
+    # 格式 -> (MIME类型, 文件扩展名)
+    FORMATS = {
+        'csv': ('text/csv; charset=utf-8', 'csv'),
+        'ndjson': ('application/x-ndjson; charset=utf-8', 'ndjson'),
+        'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx')
+    }
+
+    # 每累计多少行向下游输出一次
+    FLUSH_ROWS = 500
+
+    # 文件流式读取块大小
+    CHUNK_SIZE = 64 * 1024
+
+    @staticmethod
+    def format_value(value: Any) -> Any:
+        """
+        将日期时间转换为字符串，其余值原样返回
+        """
+        if isinstance(value, datetime):
+            return value.strftime('%Y-%m-%d %H:%M:%S')
+        if isinstance(value, date):
+            return value.strftime('%Y-%m-%d')
+        return value
+
+    @staticmethod
+    def iter_csv(headers: Sequence[str], rows: Iterable[Sequence]) -> Iterator[bytes]:
+        """
+        生成CSV字节流（带UTF-8 BOM，便于Excel直接打开中文）
+
+        Args:
+            headers: 表头
+            rows: 行序列，每行与表头顺序一致
+
+        Returns:
+            bytes 迭代器
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        buffer.write('\ufeff')
+        writer.writerow(headers)
+
+        count = 0
+        for row in rows:
+            writer.writerow([ExportUtils.format_value(value) for value in row])
+            count += 1
+            if count % ExportUtils.FLUSH_ROWS == 0:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate(0)
+
+        remaining = buffer.getvalue()
+        if remaining:
+            yield remaining.encode('utf-8')
+
+    @staticmethod
+    def iter_ndjson(headers: Sequence[str], rows: Iterable[Sequence]) -> Iterator[bytes]:
+        """
+        生成NDJSON字节流（每行一个JSON对象）
+        """
+        lines: List[str] = []
+        for row in rows:
+            record = {key: ExportUtils.format_value(value) for key, value in zip(headers, row)}
+            lines.append(json.dumps(record, ensure_ascii=False))
+            if len(lines) >= ExportUtils.FLUSH_ROWS:
+                yield ('\n'.join(lines) + '\n').encode('utf-8')
+                lines = []
+
+        if lines:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+    @staticmethod
+    def iter_xlsx(headers: Sequence[str], rows: Iterable[Sequence], sheet_title: str = 'Sheet1') -> Iterator[bytes]:
+        """
+        生成XLSX字节流
+
+        XLSX为zip容器，必须写完才能输出，因此使用openpyxl的write_only模式逐行写入临时文件，
+        完成后分块读出并删除临时文件
+        """
+        # 在返回生成器前检查依赖，保证缺少openpyxl时能在响应开始前报错
+        try:
+            from openpyxl import Workbook
+        except ImportError:
+            raise ValueError("导出XLSX需要安装openpyxl")
+        return ExportUtils._xlsx_chunks(Workbook, headers, rows, sheet_title)
+
+    @staticmethod
+    def _xlsx_chunks(workbook_cls, headers: Sequence[str], rows: Iterable[Sequence],
+                     sheet_title: str) -> Iterator[bytes]:
+        workbook = workbook_cls(write_only=True)
+        sheet = workbook.create_sheet(title=sheet_title)
+        sheet.append(list(headers))
+        for row in rows:
+            sheet.append([ExportUtils.format_value(value) for value in row])
+
+        fd, path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(fd)
+        try:
+            workbook.save(path)
+            with open(path, 'rb') as f:
+                while True:
+                    chunk = f.read(ExportUtils.CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            os.remove(path)
+
+    @staticmethod
+    def iter_export(fmt: str, headers: Sequence[str], rows: Iterable[Sequence],
+                    sheet_title: str = 'Sheet1') -> Iterator[bytes]:
+        """
+        按格式分派到对应的生成器
+        """
+        if fmt == 'csv':
+            return ExportUtils.iter_csv(headers, rows)
+        if fmt == 'ndjson':
+            return ExportUtils.iter_ndjson(headers, rows)
+        if fmt == 'xlsx':
+            return ExportUtils.iter_xlsx(headers, rows, sheet_title)
+        raise ValueError(f"不支持的导出格式: {fmt}")
+
+    @staticmethod
+    def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+        """
+        对字节流做即时gzip压缩（wbits=31 输出gzip头）
+        """
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+    @staticmethod
+    def stream_response(fmt: str, name: str, headers: Sequence[str], rows: Iterable[Sequence],
+                        accept_encoding: str = None) -> Response:
+        """
+        构造流式下载响应
+
+        Args:
+            fmt: 导出格式（csv / ndjson / xlsx）
+            name: 文件名前缀
+            headers: 表头
+            rows: 行迭代器（应在迭代时自行打开并关闭数据库会话）
+            accept_encoding: 请求头 Accept-Encoding，接受gzip时对文本格式即时压缩
+
+        Returns:
+            Flask Response
+        """
+        if fmt not in ExportUtils.FORMATS:
+            raise ValueError(f"不支持的导出格式: {fmt}")
+
+        mimetype, extension = ExportUtils.FORMATS[fmt]
+        chunks = ExportUtils.iter_export(fmt, headers, rows, sheet_title=name)
+        response_headers = {
+            'Content-Disposition': f'attachment; filename={name}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{extension}',
+            'Vary': 'Accept-Encoding'
+        }
+
+        # XLSX本身已是zip压缩，不再重复压缩
+        if fmt != 'xlsx' and ExportUtils.accepts_gzip(accept_encoding):
+            chunks = ExportUtils.gzip_stream(chunks)
+            response_headers['Content-Encoding'] = 'gzip'
+
+        return Response(stream_with_context(chunks), headers=response_headers, content_type=mimetype)
+
+    @staticmethod
+    def accepts_gzip(accept_encoding: str) -> bool:
+        """
+        判断请求头 Accept-Encoding 是否接受gzip
+        """
+        for part in (accept_encoding or '').split(','):
+            token = part.strip().split(';')
+            if token[0].strip().lower() != 'gzip':
+                continue
+            # gzip;q=0 表示明确拒绝
+            params = [param.strip() for param in token[1:]]
+            return 'q=0' not in params and 'q=0.0' not in params
+        return False
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+按ID/编码读取单行的进程内缓存工具模块
+
+缓存的是行的只读快照（to_dict 结果的只读映射），不是ORM对象，因此可以跨会话、跨线程共享。
+写操作提交后由服务层调用 invalidate 精确失效；读取与失效并发时用每类数据的失效代数判断，
+读取期间发生过失效的结果不写入缓存，避免把旧数据放回去。
+
+多进程部署时其他进程的写入无法通知到本进程，因此每项另有存活时间（IDENTITY_CACHE_TTL_SECONDS）
+兜底；条目数和估算内存（IDENTITY_CACHE_MAX_ENTRIES / IDENTITY_CACHE_MAX_BYTES）任一超限时
+按最近最少使用淘汰。
+"""
+from typing import Callable, Dict, Hashable, Mapping, Optional
+from collections import OrderedDict
+from types import MappingProxyType
+import sys
+import threading
+import time
+from src.utils.metrics import CACHE_HITS, CACHE_MISSES
+from src.config import IDENTITY_CACHE_MAX_ENTRIES, IDENTITY_CACHE_MAX_BYTES, IDENTITY_CACHE_TTL_SECONDS
+
+
+def _estimate_size(snapshot: Mapping) -> int:
+    """
+    快照占用内存的估算值（字典本身加各键值对象）
+    """
+    size = sys.getsizeof(snapshot) + sys.getsizeof(dict(snapshot))
+    for key, value in snapshot.items():
+        size += sys.getsizeof(key) + sys.getsizeof(value)
+    return size
+
+
+class IdentityCache:
+    """
+    行快照LRU缓存
+
+    键为 (类别, 键)，同一行可以有多个键（如物料的ID和物料编码），失效时一并删除。
+    """
+
+    def __init__(self, max_entries: int = IDENTITY_CACHE_MAX_ENTRIES, max_bytes: int = IDENTITY_CACHE_MAX_BYTES,
+                 ttl: float = IDENTITY_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # (类别, 键) -> (快照, 写入时间, 估算字节数)
+        self._entries: 'OrderedDict[tuple, tuple]' = OrderedDict()
+        # (类别, 行ID) -> 该行的所有键
+        self._aliases: Dict[tuple, set] = {}
+        self._generations: Dict[str, int] = {}
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def snapshot(values: Dict) -> Mapping:
+        """
+        由 to_dict 结果生成只读快照
+        """
+        return MappingProxyType(dict(values))
+
+    def get_or_load(self, kind: str, key: Hashable, loader: Callable[[], Optional[Dict]]) -> Optional[Mapping]:
+        """
+        读取快照，未命中时调用 loader 从数据库读取（返回 to_dict 结果或 None）并写入缓存
+
+        Args:
+            kind: 数据类别（order / item / plan）
+            key: 行ID，或以 ('code', 编码) 形式表示的其他唯一键
+            loader: 数据库读取函数
+
+        Returns:
+            Mapping: 只读快照，行不存在时为 None（不缓存不存在的结果，新建的行无需失效）
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((kind, key))
+            if entry is not None and now - entry[1] < self.ttl:
+                self._entries.move_to_end((kind, key))
+                self._hits += 1
+                hit = entry[0]
+            else:
+                if entry is not None:
+                    self._remove_row(kind, entry[0]['id'])
+                self._misses += 1
+                hit = None
+            generation = self._generations.get(kind, 0)
+
+        if hit is not None:
+            CACHE_HITS.labels('identity').inc()
+            return hit
+        CACHE_MISSES.labels('identity').inc()
+
+        values = loader()
+        if values is None:
+            return None
+        snapshot = self.snapshot(values)
+        self._store(kind, key, snapshot, generation)
+        return snapshot
+
+    def _store(self, kind: str, key: Hashable, snapshot: Mapping, generation: int):
+        row = (kind, snapshot['id'])
+        keys = {(kind, snapshot['id']), (kind, key)}
+        size = _estimate_size(snapshot)
+        now = time.monotonic()
+        with self._lock:
+            if self._generations.get(kind, 0) != generation:
+                # 读取期间该类数据有写入提交，结果可能已过期
+                return
+            self._remove_row(*row)
+            for cache_key in keys:
+                self._entries[cache_key] = (snapshot, now, size)
+            self._aliases[row] = keys
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                (oldest_kind, _), (oldest, _, _) = next(iter(self._entries.items()))
+                self._remove_row(oldest_kind, oldest['id'])
+                self._evictions += 1
+
+    def _remove_row(self, kind: str, row_id: int):
+        keys = self._aliases.pop((kind, row_id), None)
+        if not keys:
+            return
+        size = 0
+        for cache_key in keys:
+            entry = self._entries.pop(cache_key, None)
+            if entry is not None:
+                size = entry[2]
+        self._bytes -= size
+
+    def invalidate(self, kind: str, row_id: int):
+        """
+        写操作提交后使某行的所有键失效
+        """
+        with self._lock:
+            self._generations[kind] = self._generations.get(kind, 0) + 1
+            self._remove_row(kind, row_id)
+
+    def clear(self, kind: str = None):
+        """
+        清空某类（或全部）缓存
+        """
+        with self._lock:
+            for row in [row for row in self._aliases if kind is None or row[0] == kind]:
+                self._generations[row[0]] = self._generations.get(row[0], 0) + 1
+                self._remove_row(*row)
+            if kind is not None:
+                self._generations[kind] = self._generations.get(kind, 0) + 1
+
+    def stats(self) -> Dict:
+        """
+        缓存统计（命中率、条目数和估算内存）
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'rows': len(self._aliases),
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else None,
+                'evictions': self._evictions
+            }
+
+
+# 进程内共享实例
+identity_cache = IdentityCache()
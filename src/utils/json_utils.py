@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+JSON工具模块
+
+- 安装了 orjson 时替换 Flask 的 JSON 序列化（jsonify 的输出与默认实现一致：键排序、
+  datetime 仍为 HTTP 日期格式，只是中文直接输出 UTF-8 而不转义为 \\uXXXX）
+- 列表接口的 ?format=columnar 列式输出：列名只出现一次，按列给出值数组，时间为秒级时间戳
+"""
+from typing import Dict, List, Optional, Sequence
+from datetime import date, datetime
+from flask import Response, request
+from flask.json.provider import DefaultJSONProvider
+from src.models.row_records import RowRecord
+from src.config import API_MAX_BATCH_IDS
+
+try:
+    import orjson
+except ImportError:  # 未安装时保持 Flask 默认实现
+    orjson = None
+
+# 列表接口支持的输出格式
+LIST_FORMATS = ('rows', 'columnar')
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    基于 orjson 的 Flask JSON 序列化
+    """
+
+    def _default_value(self, value):
+        if isinstance(value, RowRecord):
+            return value.to_dict()
+        return DefaultJSONProvider.default(value)
+
+    def dumps(self, obj, **kwargs) -> str:
+        return self.dumps_bytes(obj).decode('utf-8')
+
+    def dumps_bytes(self, obj) -> bytes:
+        # datetime 交给 Flask 默认处理（HTTP 日期格式），与 jsonify 原有输出保持一致
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self._default_value, option=option)
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
+
+
+class JsonUtils:
+    """
+    JSON工具类
+    """
+
+    @staticmethod
+    def init_app(app):
+        """
+        安装了 orjson 时使用更快的序列化实现
+        """
+        if orjson is not None:
+            app.json = OrjsonProvider(app)
+
+    @staticmethod
+    def epoch(value):
+        """
+        时间转换为秒级时间戳（按本地时间解释无时区的值），其他值原样返回
+        """
+        if isinstance(value, datetime):
+            return int(value.timestamp())
+        if isinstance(value, date):
+            return int(datetime(value.year, value.month, value.day).timestamp())
+        return value
+
+    @staticmethod
+    def columnar(records: Sequence[RowRecord], columns: Sequence[str] = None) -> Dict:
+        """
+        行记录转换为列式结构 {'columns': [...], 'values': [[第1列的值...], [第2列的值...], ...]}
+
+        使用记录中的原始值，时间转为秒级时间戳，不做字符串格式化；嵌套记录（如计划的 order_info）
+        展开为 'order_info.customer' 形式的列。主表与归档记录混合时以字段最多的类型为准，
+        另加 archived 列。派生字段（如 qrcode_path）不输出。
+
+        Args:
+            records: 行记录（同一类型，或主表记录与对应的归档记录）
+            columns: 只输出这些列（默认全部）
+        """
+        if not records:
+            return {'columns': list(columns or []), 'values': [[] for _ in columns or []]}
+
+        record_types = {type(record) for record in records}
+        widest = max(record_types, key=lambda record_type: len(record_type._fields))
+        if len(record_types) == 1:
+            raw = list(zip(*records))
+        else:
+            raw = [[tuple.__getitem__(record, index) if index < len(record) else None for record in records]
+                   for index in range(len(widest._fields))]
+
+        names = []
+        data = []
+        for name, column in zip(widest._fields, raw):
+            nested = next((value for value in column if value is not None), None)
+            if isinstance(nested, RowRecord):
+                for sub_index, sub_name in enumerate(type(nested)._fields):
+                    names.append(f'{name}.{sub_name}')
+                    data.append([tuple.__getitem__(value, sub_index) if value is not None else None
+                                 for value in column])
+            else:
+                names.append(name)
+                data.append(column)
+        if any(hasattr(record_type, 'archived') for record_type in record_types):
+            names.append('archived')
+            data.append([getattr(record, 'archived', False) for record in records])
+
+        selected = range(len(names))
+        if columns:
+            unknown = [name for name in columns if name not in names]
+            if unknown:
+                raise ValueError(f"无效的列: {', '.join(unknown)}")
+            selected = [names.index(name) for name in columns]
+
+        values = []
+        for position in selected:
+            column = data[position]
+            if any(isinstance(value, (datetime, date)) for value in column):
+                column = [JsonUtils.epoch(value) for value in column]
+            values.append(list(column))
+        return {'columns': [names[position] for position in selected], 'values': values}
+
+    @staticmethod
+    def list_format() -> str:
+        """
+        请求的列表输出格式（?format=rows / columnar，默认 rows）
+        """
+        fmt = request.args.get('format', 'rows')
+        if fmt not in LIST_FORMATS:
+            raise ValueError(f"无效的输出格式: {fmt}（可选: {', '.join(LIST_FORMATS)}）")
+        return fmt
+
+    @staticmethod
+    def requested_ids(limit: int = API_MAX_BATCH_IDS) -> Optional[List[int]]:
+        """
+        请求的ID列表（?ids=1,2,3），未提供时返回 None
+
+        Raises:
+            ValueError: ID不是整数或数量超过上限
+        """
+        value = request.args.get('ids')
+        if value is None:
+            return None
+        try:
+            ids = [int(part) for part in value.split(',') if part.strip()]
+        except ValueError:
+            raise ValueError(f"无效的ID列表: {value[:100]}")
+        if len(ids) > limit:
+            raise ValueError(f"一次最多读取 {limit} 个ID")
+        return ids
+
+    @staticmethod
+    def list_payload(key: str, result: Dict, fmt: str = 'rows') -> Dict:
+        """
+        列表结果（get_orders / get_orders_by_ids 等的返回值）转换为接口输出，其他键原样保留
+
+        rows: {key: [字典...], total, page, ...}
+        columnar: {key: {'columns': [...], 'values': [...]}, total, page, ..., format}
+        """
+        records = result[key]
+        payload = {name: value for name, value in result.items() if name != key}
+        if fmt == 'columnar':
+            payload[key] = JsonUtils.columnar(records)
+            payload['format'] = 'columnar'
+        else:
+            payload[key] = [record.to_dict() for record in records]
+        return payload
@@ -7,6 +7,13 @@ import matplotlib.pyplot as plt
 import base64
 import io
 from typing import Dict, List, Any
+from collections import OrderedDict
+from functools import wraps
+import threading
+import time
+from src.utils.request_timing import RequestTiming
+from src.utils.metrics import CHART_RENDERS, CHART_RENDER_SECONDS, CACHE_HITS, CACHE_MISSES
+from src.config import CHART_CACHE_SIZE
 
 # 设置中文字体
 import platform
@@ -18,11 +25,47 @@ matplotlib.rcParams['axes.unicode_minus'] = False
 matplotlib.rcParams['figure.facecolor'] = 'white'
 matplotlib.rcParams['axes.facecolor'] = 'white'
 
+# 已渲染图表的LRU缓存：键为 (方法名, 参数)，值为base64图片
+_chart_cache = OrderedDict()
+_chart_cache_lock = threading.Lock()
+
+
+def _cached_chart(func):
+    """
+    图表缓存装饰器：参数相同（数据未变化）时直接返回已渲染的图片，并记录渲染/命中指标
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (func.__name__, repr(args), repr(sorted(kwargs.items())))
+        with _chart_cache_lock:
+            cached = _chart_cache.get(key)
+            if cached is not None:
+                _chart_cache.move_to_end(key)
+        if cached is not None:
+            CACHE_HITS.labels('chart').inc()
+            return cached
+        
+        CACHE_MISSES.labels('chart').inc()
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        CHART_RENDERS.labels(func.__name__).inc()
+        CHART_RENDER_SECONDS.labels(func.__name__).observe(time.perf_counter() - started)
+        
+        if result:
+            with _chart_cache_lock:
+                _chart_cache[key] = result
+                while len(_chart_cache) > CHART_CACHE_SIZE:
+                    _chart_cache.popitem(last=False)
+        return result
+    return wrapper
+
 
 class MatplotlibCharts:
     """使用matplotlib生成图表的工具类"""
     
     @staticmethod
+    @RequestTiming.timed('chart')
+    @_cached_chart
     def create_bar_chart(title: str, data: Dict[str, int], colors: List[str] = None) -> str:
         """
         创建柱状图并返回base64编码的图片
@@ -42,30 +85,35 @@ class MatplotlibCharts:
             colors = ['#5470c6', '#91cc75', '#fac858', '#ee6666', '#73c0de']
         
         # 创建图表
-        plt.figure(figsize=(10, 6))
-        bars = plt.bar(data.keys(), data.values(), color=colors[0])
-        
-        # 设置标题和标签
-        plt.title(title, fontsize=16, fontweight='bold')
-        plt.xlabel('分类', fontsize=12)
-        plt.ylabel('数量', fontsize=12)
-        
-        # 旋转x轴标签
-        plt.xticks(rotation=45)
-        
-        # 在柱子上显示数值
-        for bar in bars:
-            height = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width()/2., height + 0.1,
-                    f'{int(height)}', ha='center', va='bottom')
-        
-        # 调整布局
-        plt.tight_layout()
-        
-        # 转换为base64
-        return MatplotlibCharts._fig_to_base64()
+        fig, ax = plt.subplots(figsize=(10, 6))
+        try:
+            bars = ax.bar(data.keys(), data.values(), color=colors[0])
+            
+            # 设置标题和标签
+            ax.set_title(title, fontsize=16, fontweight='bold')
+            ax.set_xlabel('分类', fontsize=12)
+            ax.set_ylabel('数量', fontsize=12)
+            
+            # 旋转x轴标签
+            ax.tick_params(axis='x', rotation=45)
+            
+            # 在柱子上显示数值
+            for bar in bars:
+                height = bar.get_height()
+                ax.text(bar.get_x() + bar.get_width()/2., height + 0.1,
+                        f'{int(height)}', ha='center', va='bottom')
+            
+            # 调整布局
+            fig.tight_layout()
+            
+            # 转换为base64
+            return MatplotlibCharts._fig_to_base64(fig)
+        finally:
+            plt.close(fig)
     
     @staticmethod
+    @RequestTiming.timed('chart')
+    @_cached_chart
     def create_double_bar_chart(title: str, data1: Dict[str, int], data2: Dict[str, int], 
                                name1: str, name2: str, colors: List[str] = None) -> str:
         """
@@ -98,41 +146,45 @@ class MatplotlibCharts:
         
         # 创建图表
         fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 8))
-        
-        # 第一个子图
-        bars1 = ax1.bar(keys, values1, color=colors[0])
-        ax1.set_title(f'{name1}分布', fontsize=14, fontweight='bold')
-        ax1.set_ylabel('数量', fontsize=12)
-        ax1.tick_params(axis='x', rotation=45)
-        
-        # 在柱子上显示数值
-        for bar in bars1:
-            height = bar.get_height()
-            ax1.text(bar.get_x() + bar.get_width()/2., height + 0.1,
-                    f'{int(height)}', ha='center', va='bottom')
-        
-        # 第二个子图
-        bars2 = ax2.bar(keys, values2, color=colors[1])
-        ax2.set_title(f'{name2}分布', fontsize=14, fontweight='bold')
-        ax2.set_ylabel('数量', fontsize=12)
-        ax2.tick_params(axis='x', rotation=45)
-        
-        # 在柱子上显示数值
-        for bar in bars2:
-            height = bar.get_height()
-            ax2.text(bar.get_x() + bar.get_width()/2., height + 0.1,
-                    f'{int(height)}', ha='center', va='bottom')
-        
-        # 设置总标题
-        fig.suptitle(title, fontsize=16, fontweight='bold')
-        
-        # 调整布局
-        plt.tight_layout()
-        
-        # 转换为base64
-        return MatplotlibCharts._fig_to_base64()
+        try:
+            # 第一个子图
+            bars1 = ax1.bar(keys, values1, color=colors[0])
+            ax1.set_title(f'{name1}分布', fontsize=14, fontweight='bold')
+            ax1.set_ylabel('数量', fontsize=12)
+            ax1.tick_params(axis='x', rotation=45)
+            
+            # 在柱子上显示数值
+            for bar in bars1:
+                height = bar.get_height()
+                ax1.text(bar.get_x() + bar.get_width()/2., height + 0.1,
+                        f'{int(height)}', ha='center', va='bottom')
+            
+            # 第二个子图
+            bars2 = ax2.bar(keys, values2, color=colors[1])
+            ax2.set_title(f'{name2}分布', fontsize=14, fontweight='bold')
+            ax2.set_ylabel('数量', fontsize=12)
+            ax2.tick_params(axis='x', rotation=45)
+            
+            # 在柱子上显示数值
+            for bar in bars2:
+                height = bar.get_height()
+                ax2.text(bar.get_x() + bar.get_width()/2., height + 0.1,
+                        f'{int(height)}', ha='center', va='bottom')
+            
+            # 设置总标题
+            fig.suptitle(title, fontsize=16, fontweight='bold')
+            
+            # 调整布局
+            fig.tight_layout()
+            
+            # 转换为base64
+            return MatplotlibCharts._fig_to_base64(fig)
+        finally:
+            plt.close(fig)
     
     @staticmethod
+    @RequestTiming.timed('chart')
+    @_cached_chart
     def create_pie_chart(title: str, data: Dict[str, int], colors: List[str] = None) -> str:
         """
         创建饼图并返回base64编码的图片
@@ -158,27 +210,31 @@ class MatplotlibCharts:
             return ''
         
         # 创建图表
-        plt.figure(figsize=(8, 8))
-        
-        # 创建饼图
-        wedges, texts, autotexts = plt.pie(
-            filtered_data.values(), 
-            labels=filtered_data.keys(),
-            autopct='%1.1f%%',
-            colors=colors[:len(filtered_data)],
-            startangle=90
-        )
-        
-        # 设置标题
-        plt.title(title, fontsize=16, fontweight='bold')
-        
-        # 调整布局
-        plt.tight_layout()
-        
-        # 转换为base64
-        return MatplotlibCharts._fig_to_base64()
+        fig, ax = plt.subplots(figsize=(8, 8))
+        try:
+            # 创建饼图
+            wedges, texts, autotexts = ax.pie(
+                filtered_data.values(), 
+                labels=filtered_data.keys(),
+                autopct='%1.1f%%',
+                colors=colors[:len(filtered_data)],
+                startangle=90
+            )
+            
+            # 设置标题
+            ax.set_title(title, fontsize=16, fontweight='bold')
+            
+            # 调整布局
+            fig.tight_layout()
+            
+            # 转换为base64
+            return MatplotlibCharts._fig_to_base64(fig)
+        finally:
+            plt.close(fig)
     
     @staticmethod
+    @RequestTiming.timed('chart')
+    @_cached_chart
     def create_line_chart(title: str, data: Dict[str, int], colors: List[str] = None) -> str:
         """
         创建折线图并返回base64编码的图片
@@ -198,54 +254,101 @@ class MatplotlibCharts:
             colors = ['#5470c6', '#91cc75', '#fac858', '#ee6666', '#73c0de']
         
         # 创建图表
-        plt.figure(figsize=(12, 6))
-        
-        # 排序数据
-        sorted_data = dict(sorted(data.items()))
-        
-        # 创建折线图
-        plt.plot(list(sorted_data.keys()), list(sorted_data.values()), 
-                marker='o', linewidth=2, markersize=6, color=colors[0])
-        
-        # 设置标题和标签
-        plt.title(title, fontsize=16, fontweight='bold')
-        plt.xlabel('时间', fontsize=12)
-        plt.ylabel('数量', fontsize=12)
-        
-        # 旋转x轴标签
-        plt.xticks(rotation=45)
-        
-        # 在点上显示数值
-        for x, y in sorted_data.items():
-            plt.text(x, y + 0.1, f'{y}', ha='center', va='bottom')
-        
-        # 添加网格
-        plt.grid(True, alpha=0.3)
+        fig, ax = plt.subplots(figsize=(12, 6))
+        try:
+            # 排序数据
+            sorted_data = dict(sorted(data.items()))
+            
+            # 创建折线图
+            ax.plot(list(sorted_data.keys()), list(sorted_data.values()), 
+                    marker='o', linewidth=2, markersize=6, color=colors[0])
+            
+            # 设置标题和标签
+            ax.set_title(title, fontsize=16, fontweight='bold')
+            ax.set_xlabel('时间', fontsize=12)
+            ax.set_ylabel('数量', fontsize=12)
+            
+            # 旋转x轴标签
+            ax.tick_params(axis='x', rotation=45)
+            
+            # 在点上显示数值
+            for x, y in sorted_data.items():
+                ax.text(x, y + 0.1, f'{y}', ha='center', va='bottom')
+            
+            # 添加网格
+            ax.grid(True, alpha=0.3)
+            
+            # 调整布局
+            fig.tight_layout()
+            
+            # 转换为base64
+            return MatplotlibCharts._fig_to_base64(fig)
+        finally:
+            plt.close(fig)
+    
+    @staticmethod
+    @RequestTiming.timed('chart')
+    @_cached_chart
+    def create_heatmap(title: str, row_labels: List[str], col_labels: List[str],
+                       values: List[List[float]], vmax: float = 100) -> str:
+        """
+        创建热力图并返回base64编码的图片
         
-        # 调整布局
-        plt.tight_layout()
+        Args:
+            title: 图表标题
+            row_labels: 行标签
+            col_labels: 列标签
+            values: 二维数据 [行][列]
+            vmax: 颜色上限
+            
+        Returns:
+            base64编码的图片字符串
+        """
+        if not row_labels or not col_labels:
+            return ''
         
-        # 转换为base64
-        return MatplotlibCharts._fig_to_base64()
+        # 创建图表（宽度随列数增长，设上限）
+        width = min(max(len(col_labels) * 0.3, 8), 24)
+        fig, ax = plt.subplots(figsize=(width, max(len(row_labels) * 0.6, 3)))
+        try:
+            # 绘制热力图
+            image = ax.imshow(values, aspect='auto', cmap='YlOrRd', vmin=0, vmax=vmax,
+                              interpolation='nearest')
+            fig.colorbar(image, ax=ax, label='%')
+            
+            # 设置标题和坐标轴（列太多时抽稀标签）
+            ax.set_title(title, fontsize=16, fontweight='bold')
+            step = max(len(col_labels) // 30, 1)
+            ax.set_xticks(range(0, len(col_labels), step))
+            ax.set_xticklabels(col_labels[::step], rotation=45, ha='right')
+            ax.set_yticks(range(len(row_labels)))
+            ax.set_yticklabels(row_labels)
+            
+            # 调整布局
+            fig.tight_layout()
+            
+            # 转换为base64
+            return MatplotlibCharts._fig_to_base64(fig)
+        finally:
+            plt.close(fig)
     
     @staticmethod
-    def _fig_to_base64() -> str:
+    def _fig_to_base64(fig) -> str:
         """
-        将matplotlib图表转换为base64字符串
+        将matplotlib图表转换为base64字符串（图表由调用方关闭）
         
         Returns:
             base64编码的图片字符串
         """
         # 保存到内存缓冲区
         buffer = io.BytesIO()
-        plt.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
+        fig.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
         buffer.seek(0)
         
         # 转换为base64
         image_base64 = base64.b64encode(buffer.getvalue()).decode()
         
         # 清理
-        plt.close()
         buffer.close()
         
         return f"data:image/png;base64,{image_base64}"
@@ -0,0 +1,220 @@
+"""
+内存诊断工具模块
+
+通过 tracemalloc 快照对比定位内存增长位置（按文件或行分组），并统计存活的 ORM 实例、
+数据库会话和 matplotlib 图表数量，用于排查工作进程常驻内存持续上涨的问题。
+"""
+from typing import Dict, List, Optional
+from collections import Counter, OrderedDict
+from datetime import datetime
+import gc
+import os
+import sys
+import threading
+import tracemalloc
+from src.config import MEMORY_TRACE_FRAMES, MEMORY_MAX_SNAPSHOTS
+
+# 快照ID -> (标签, 创建时间, 快照)
+_snapshots = OrderedDict()
+_snapshots_lock = threading.Lock()
+_next_snapshot_id = [1]
+
+GROUP_BY = ('lineno', 'filename', 'traceback')
+
+# 快照中排除诊断工具自身和导入机制产生的分配
+_EXCLUDE_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+]
+
+
+def _kb(size: int) -> float:
+    return round(size / 1024, 1)
+
+
+def _rss_kb() -> Optional[float]:
+    """
+    当前进程常驻内存（KB），不支持的平台返回 None
+    """
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            pages = int(f.read().split()[1])
+        return _kb(pages * os.sysconf('SC_PAGE_SIZE'))
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # 非 Linux 平台只能取峰值（macOS 单位为字节，其他为KB）
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return _kb(peak) if sys.platform == 'darwin' else float(peak)
+    except ImportError:
+        return None
+
+
+class MemoryDiagnostics:
+    """
+    内存诊断工具类
+    """
+
+    @staticmethod
+    def start(nframes: int = MEMORY_TRACE_FRAMES) -> Dict:
+        """
+        开始 tracemalloc 跟踪（已在跟踪时保持不变）
+
+        Args:
+            nframes: 每次分配记录的栈帧数（按 traceback 分组时需要大于1，开销随之增加）
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(max(1, min(nframes, 50)))
+        return MemoryDiagnostics.status()
+
+    @staticmethod
+    def stop() -> Dict:
+        """
+        停止跟踪并清空已保存的快照
+        """
+        tracemalloc.stop()
+        with _snapshots_lock:
+            _snapshots.clear()
+        return MemoryDiagnostics.status()
+
+    @staticmethod
+    def status() -> Dict:
+        tracing = tracemalloc.is_tracing()
+        status = {'tracing': tracing, 'rss_kb': _rss_kb()}
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            status.update({
+                'frames': tracemalloc.get_traceback_limit(),
+                'traced_kb': _kb(current),
+                'traced_peak_kb': _kb(peak),
+                'overhead_kb': _kb(tracemalloc.get_tracemalloc_memory())
+            })
+        with _snapshots_lock:
+            status['snapshots'] = [{'id': snapshot_id, 'label': label, 'created_at': created_at}
+                                   for snapshot_id, (label, created_at, _) in _snapshots.items()]
+        return status
+
+    @staticmethod
+    def take_snapshot(label: str = '') -> Dict:
+        """
+        保存当前快照（超过 MEMORY_MAX_SNAPSHOTS 时丢弃最早的）
+
+        Returns:
+            Dict: 快照ID和概要
+        """
+        if not tracemalloc.is_tracing():
+            raise ValueError("tracemalloc 未启动")
+        snapshot = tracemalloc.take_snapshot().filter_traces(_EXCLUDE_FILTERS)
+        created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with _snapshots_lock:
+            snapshot_id = _next_snapshot_id[0]
+            _next_snapshot_id[0] += 1
+            _snapshots[snapshot_id] = (label, created_at, snapshot)
+            while len(_snapshots) > MEMORY_MAX_SNAPSHOTS:
+                _snapshots.popitem(last=False)
+        total = sum(stat.size for stat in snapshot.statistics('filename'))
+        return {'id': snapshot_id, 'label': label, 'created_at': created_at, 'traced_kb': _kb(total)}
+
+    @staticmethod
+    def _get_snapshot(snapshot_id: int):
+        with _snapshots_lock:
+            entry = _snapshots.get(snapshot_id)
+        if entry is None:
+            raise ValueError(f"快照不存在: {snapshot_id}")
+        return entry[2]
+
+    @staticmethod
+    def _location(stat, group_by: str) -> str:
+        if group_by == 'traceback':
+            return ' <- '.join(f'{frame.filename}:{frame.lineno}' for frame in stat.traceback)
+        frame = stat.traceback[0]
+        return frame.filename if group_by == 'filename' else f'{frame.filename}:{frame.lineno}'
+
+    @staticmethod
+    def top(snapshot_id: int, group_by: str = 'lineno', limit: int = 30) -> List[Dict]:
+        """
+        快照中占用内存最多的位置
+        """
+        if group_by not in GROUP_BY:
+            raise ValueError(f"无效的分组方式: {group_by}")
+        snapshot = MemoryDiagnostics._get_snapshot(snapshot_id)
+        return [{
+            'location': MemoryDiagnostics._location(stat, group_by),
+            'size_kb': _kb(stat.size),
+            'count': stat.count
+        } for stat in snapshot.statistics(group_by)[:limit]]
+
+    @staticmethod
+    def diff(from_id: int, to_id: int, group_by: str = 'lineno', limit: int = 30) -> List[Dict]:
+        """
+        对比两个快照，按增长量从大到小返回各位置的内存变化
+
+        Args:
+            from_id: 较早的快照ID
+            to_id: 较晚的快照ID
+            group_by: 分组方式 lineno / filename / traceback
+            limit: 返回条数
+        """
+        if group_by not in GROUP_BY:
+            raise ValueError(f"无效的分组方式: {group_by}")
+        old = MemoryDiagnostics._get_snapshot(from_id)
+        new = MemoryDiagnostics._get_snapshot(to_id)
+        return [{
+            'location': MemoryDiagnostics._location(stat, group_by),
+            'size_diff_kb': _kb(stat.size_diff),
+            'count_diff': stat.count_diff,
+            'size_kb': _kb(stat.size),
+            'count': stat.count
+        } for stat in new.compare_to(old, group_by)[:limit]]
+
+    @staticmethod
+    def live_objects(collect: bool = False) -> Dict:
+        """
+        统计存活的 ORM 实例（按模型）、数据库会话和 matplotlib 图表
+
+        Args:
+            collect: 统计前是否先执行一次完整垃圾回收
+        """
+        from sqlalchemy.orm import Session
+        from src.models.database import Base
+
+        if collect:
+            gc.collect()
+
+        models = Counter()
+        sessions = 0
+        sessions_with_objects = 0
+        identity_map_size = 0
+        figures = 0
+        figure_class = None
+        if 'matplotlib.figure' in sys.modules:
+            figure_class = sys.modules['matplotlib.figure'].Figure
+
+        for obj in gc.get_objects():
+            if isinstance(obj, Base):
+                models[type(obj).__name__] += 1
+            elif isinstance(obj, Session):
+                sessions += 1
+                size = len(obj.identity_map)
+                identity_map_size += size
+                if size:
+                    sessions_with_objects += 1
+            elif figure_class is not None and isinstance(obj, figure_class):
+                figures += 1
+
+        result = {
+            'orm_instances': dict(models.most_common()),
+            'orm_instances_total': sum(models.values()),
+            'sessions': sessions,
+            'sessions_with_objects': sessions_with_objects,
+            'identity_map_size': identity_map_size,
+            'figures': figures,
+            'gc_counts': gc.get_count()
+        }
+        # pyplot 管理的图表未 close 时会一直被全局注册表引用
+        if 'matplotlib.pyplot' in sys.modules:
+            result['pyplot_open_figures'] = len(sys.modules['matplotlib.pyplot'].get_fignums())
+        return result
@@ -0,0 +1,329 @@
+"""
+进程内指标工具模块
+提供 Counter / Gauge / Histogram 与 Prometheus 文本格式输出
+
+每个子指标的值由一把锁保护。不按线程分片：gevent 等部署下每个请求都是新的协程/线程，
+分片的数量和抓取时的汇总开销会随请求数无限增长，而一次加锁加法的开销可以忽略。
+"""
+from typing import Dict, List, Sequence, Tuple
+from contextlib import contextmanager
+import bisect
+import threading
+import time
+
+# 默认延迟桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _LockedValues:
+    """
+    一组累加值（每个子指标一把锁；临界区只有一次加法，无竞争时开销约为一次加锁）
+    """
+
+    def __init__(self, size: int):
+        self._lock = threading.Lock()
+        self._values = [0.0] * size
+
+    def add(self, index: int, amount: float):
+        with self._lock:
+            self._values[index] += amount
+
+    def add_pair(self, index: int, amount: float, last: float):
+        """
+        同时累加 index 位置和最后一个位置（直方图的桶计数与总和在同一临界区内更新）
+        """
+        with self._lock:
+            self._values[index] += amount
+            self._values[-1] += last
+
+    def snapshot(self) -> List[float]:
+        with self._lock:
+            return list(self._values)
+
+
+class _Metric:
+    """
+    指标基类：无标签时直接使用，有标签时通过 labels() 获取子指标
+    """
+
+    TYPE = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def labels(self, *values):
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new_child()
+        return child
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"指标 {self.name} 需要标签: {self.labelnames}")
+        return self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _label_text(self, key: Tuple[str, ...], extra: str = '') -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.TYPE}']
+        with self._lock:
+            children = sorted(self._children.items())
+        for key, child in children:
+            lines.extend(self._render_child(key, child))
+        return lines
+
+    def _render_child(self, key, child) -> List[str]:
+        return [f'{self.name}{self._label_text(key)} {_format(child.value())}']
+
+
+class _CounterChild:
+    def __init__(self):
+        self._values = _LockedValues(1)
+
+    def inc(self, amount: float = 1):
+        self._values.add(0, amount)
+
+    def value(self) -> float:
+        return self._values.snapshot()[0]
+
+
+class Counter(_Metric):
+    """
+    单调递增计数器
+    """
+
+    TYPE = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1):
+        self._default().inc(amount)
+
+
+class _GaugeChild(_CounterChild):
+    def dec(self, amount: float = 1):
+        self._values.add(0, -amount)
+
+
+class Gauge(_Metric):
+    """
+    可增可减的当前值（各线程增减量之和）
+    """
+
+    TYPE = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1):
+        self._default().dec(amount)
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._buckets = buckets
+        # 布局: [各桶计数..., +Inf桶计数, 总和]
+        self._values = _LockedValues(len(buckets) + 2)
+
+    def observe(self, value: float):
+        self._values.add_pair(bisect.bisect_left(self._buckets, value), 1, value)
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def value(self) -> List[float]:
+        return self._values.snapshot()
+
+
+class Histogram(_Metric):
+    """
+    直方图（输出累计桶、_sum 和 _count）
+    """
+
+    TYPE = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def _render_child(self, key, child) -> List[str]:
+        values = child.value()
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), values[:-1]):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else _format(bound)
+            labels = self._label_text(key, 'le="%s"' % le)
+            lines.append(f'{self.name}_bucket{labels} {_format(cumulative)}')
+        lines.append(f'{self.name}_sum{self._label_text(key)} {_format(values[-1])}')
+        lines.append(f'{self.name}_count{self._label_text(key)} {_format(cumulative)}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    指标注册表
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指标重复注册: {metric.name}")
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """
+        输出 Prometheus 文本格式（text/plain; version=0.0.4）
+        """
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+REGISTRY = MetricsRegistry()
+
+# HTTP
+HTTP_REQUESTS = Counter('ev_mes_http_requests_total', '按路由和状态码统计的请求数',
+                        ['method', 'endpoint', 'status'])
+HTTP_REQUEST_SECONDS = Histogram('ev_mes_http_request_duration_seconds', '按路由统计的请求耗时',
+                                 ['method', 'endpoint'])
+
+# 数据库
+DB_POOL_CHECKOUTS = Counter('ev_mes_db_pool_checkouts_total', '连接池取出连接次数')
+DB_POOL_CHECKED_OUT = Gauge('ev_mes_db_pool_checked_out', '当前已取出的连接数')
+DB_POOL_WAIT_SECONDS = Histogram('ev_mes_db_pool_wait_seconds', '从连接池获取连接的等待时间',
+                                 buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0))
+DB_QUERIES = Counter('ev_mes_db_queries_total', '执行的SQL语句数')
+DB_QUERY_SECONDS = Counter('ev_mes_db_query_seconds_total', 'SQL执行累计耗时')
+
+# 图表与缓存
+CHART_RENDERS = Counter('ev_mes_chart_renders_total', '实际渲染的图表数', ['kind'])
+CHART_RENDER_SECONDS = Histogram('ev_mes_chart_render_duration_seconds', '图表渲染耗时', ['kind'])
+CACHE_HITS = Counter('ev_mes_cache_hits_total', '缓存命中次数', ['cache'])
+CACHE_MISSES = Counter('ev_mes_cache_misses_total', '缓存未命中次数', ['cache'])
+
+# 事件推送
+EVENTS_PUBLISHED = Counter('ev_mes_events_published_total', '发布的变更事件数', ['topic'])
+EVENTS_SUBSCRIBERS = Gauge('ev_mes_events_subscribers', '当前的SSE订阅连接数')
+
+# 二维码与排程
+QRCODE_GENERATIONS = Counter('ev_mes_qrcode_generations_total', '二维码生成次数', ['result'])
+QRCODE_SECONDS = Histogram('ev_mes_qrcode_duration_seconds', '二维码生成耗时')
+SCHEDULER_RUN_SECONDS = Histogram('ev_mes_scheduler_run_duration_seconds', '排程/仿真运行耗时', ['kind'],
+                                  buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+
+
+class Metrics:
+    """
+    指标接入工具类
+    """
+
+    @staticmethod
+    def install_engine(engine):
+        """
+        在引擎上注册连接池和SQL计数监听器
+        """
+        from sqlalchemy import event
+
+        @event.listens_for(engine, 'checkout')
+        def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+            DB_POOL_CHECKOUTS.inc()
+            DB_POOL_CHECKED_OUT.inc()
+
+        @event.listens_for(engine, 'checkin')
+        def _on_checkin(dbapi_connection, connection_record):
+            DB_POOL_CHECKED_OUT.dec()
+
+        # 开始时间记在本次执行的上下文上（与 QueryStats 相同，不放在各线程共用的 conn.info 中）
+        @event.listens_for(engine, 'before_cursor_execute')
+        def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if context is not None:
+                context._metrics_started = time.perf_counter()
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            DB_QUERIES.inc()
+            started = getattr(context, '_metrics_started', None)
+            if started is not None:
+                DB_QUERY_SECONDS.inc(time.perf_counter() - started)
+
+        # 连接池没有"开始等待"事件，包装 pool.connect 统计获取连接的耗时
+        pool = engine.pool
+        connect = pool.connect
+
+        def timed_connect():
+            started = time.perf_counter()
+            try:
+                return connect()
+            finally:
+                DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - started)
+
+        pool.connect = timed_connect
+
+    @staticmethod
+    def init_app(app):
+        """
+        注册请求耗时统计钩子
+        """
+        from flask import g, request
+
+        @app.before_request
+        def _start_request_metrics():
+            g._metrics_started = time.perf_counter()
+
+        @app.after_request
+        def _record_request_metrics(response):
+            started = g.pop('_metrics_started', None)
+            if started is not None:
+                endpoint = request.endpoint or 'unmatched'
+                HTTP_REQUEST_SECONDS.labels(request.method, endpoint).observe(time.perf_counter() - started)
+                HTTP_REQUESTS.labels(request.method, endpoint, response.status_code).inc()
+            return response
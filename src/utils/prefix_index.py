@@ -0,0 +1,102 @@
+"""
+前缀索引工具模块
+提供基于有序列表 + 二分查找的内存前缀索引
+"""
+from typing import Any, Dict, Iterable, List, Tuple
+from bisect import bisect_left, insort
+import threading
+
+
+class PrefixIndex:
+    """
+    内存前缀索引
+
+    以 (小写键, 记录ID) 的有序列表保存所有键，查询时二分定位到第一个不小于前缀的位置，
+    顺序扫描直到键不再以前缀开头，复杂度 O(log n + k)
+    """
+
+    def __init__(self):
+        self._keys: List[Tuple[str, Any]] = []
+        self._item_keys: Dict[Any, List[str]] = {}
+        self._payloads: Dict[Any, Dict] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+    @staticmethod
+    def normalize(text) -> str:
+        """
+        统一键格式（去空白、小写）
+        """
+        return str(text).strip().lower() if text is not None else ''
+
+    def load(self, records: Iterable[Tuple[Any, Iterable[str], Dict]]):
+        """
+        批量加载（替换现有内容）
+
+        Args:
+            records: (记录ID, 键列表, 返回数据) 序列
+        """
+        keys = []
+        item_keys = {}
+        payloads = {}
+        for item_id, texts, payload in records:
+            normalized = [key for key in {self.normalize(text) for text in texts} if key]
+            keys.extend((key, item_id) for key in normalized)
+            item_keys[item_id] = normalized
+            payloads[item_id] = payload
+        keys.sort()
+
+        with self._lock:
+            self._keys = keys
+            self._item_keys = item_keys
+            self._payloads = payloads
+
+    def upsert(self, item_id, texts: Iterable[str], payload: Dict):
+        """
+        新增或更新一条记录
+        """
+        with self._lock:
+            self._remove_keys(item_id)
+            normalized = [key for key in {self.normalize(text) for text in texts} if key]
+            for key in normalized:
+                insort(self._keys, (key, item_id))
+            self._item_keys[item_id] = normalized
+            self._payloads[item_id] = payload
+
+    def remove(self, item_id):
+        """
+        删除一条记录
+        """
+        with self._lock:
+            self._remove_keys(item_id)
+            self._payloads.pop(item_id, None)
+
+    def _remove_keys(self, item_id):
+        for key in self._item_keys.pop(item_id, []):
+            pos = bisect_left(self._keys, (key, item_id))
+            if pos < len(self._keys) and self._keys[pos] == (key, item_id):
+                del self._keys[pos]
+
+    def search(self, prefix: str, limit: int = 10) -> List[Dict]:
+        """
+        按前缀查询，返回最多 limit 条记录（按键排序，同一记录只返回一次）
+        """
+        prefix = self.normalize(prefix)
+        if not prefix or limit <= 0:
+            return []
+
+        results = []
+        seen = set()
+        with self._lock:
+            pos = bisect_left(self._keys, (prefix,))
+            while pos < len(self._keys) and len(results) < limit:
+                key, item_id = self._keys[pos]
+                if not key.startswith(prefix):
+                    break
+                if item_id not in seen:
+                    seen.add(item_id)
+                    results.append(self._payloads[item_id])
+                pos += 1
+        return results
@@ -0,0 +1,263 @@
+"""
+按需性能剖析工具模块
+
+对单个请求（带 ?__profile=1 且具备管理权限）或时间窗口内按比例抽样的请求进行剖析，
+每个请求输出两份文件到 PROFILES_DIR/<endpoint>/ 下:
+    <名称>.folded  调用栈采样的折叠格式（可直接交给 flamegraph.pl / speedscope 生成火焰图）
+    <名称>.prof    cProfile 统计（可用 pstats / snakeviz 查看）
+"""
+from typing import Dict, List, Optional
+from collections import Counter
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from flask import Flask, g, request
+from src.config import PROFILES_DIR, PROFILE_SAMPLE_INTERVAL_MS, PROFILE_MAX_WINDOW_SECONDS
+from src.utils.admin_auth import AdminAuth
+
+# 抽样窗口状态：rate 为抽样比例，until 为结束时间戳
+_window = {'rate': 0.0, 'until': 0.0, 'captured': 0}
+_window_lock = threading.Lock()
+
+# cProfile 同一时刻只允许一个实例启用，并发的被剖析请求只做调用栈采样
+_cprofile_lock = threading.Lock()
+
+_SAFE_NAME = re.compile(r'[^A-Za-z0-9_.-]')
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+def _collapse(frame) -> str:
+    """
+    把调用栈转换为折叠格式（根在前，以 ; 分隔）
+    """
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame).replace(';', ':'))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class _StackSampler(threading.Thread):
+    """
+    后台线程：按固定间隔采样目标线程的调用栈
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name='ev-mes-profiler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[_collapse(frame)] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+class RequestProfile:
+    """
+    单个请求的剖析会话
+    """
+
+    def __init__(self, reason: str):
+        self.reason = reason
+        self.started = time.perf_counter()
+        self.sampler = _StackSampler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL_MS / 1000)
+        self.profile = cProfile.Profile() if _cprofile_lock.acquire(blocking=False) else None
+
+    def start(self):
+        self.sampler.start()
+        if self.profile is not None:
+            self.profile.enable()
+
+    def stop(self) -> float:
+        if self.profile is not None:
+            self.profile.disable()
+            _cprofile_lock.release()
+        self.sampler.stop()
+        return (time.perf_counter() - self.started) * 1000
+
+    def save(self, endpoint: str, method: str, elapsed_ms: float) -> str:
+        """
+        写出折叠调用栈和 cProfile 文件
+
+        Returns:
+            str: 文件名（不含扩展名）
+        """
+        directory = Profiler.route_dir(endpoint)
+        os.makedirs(directory, exist_ok=True)
+        name = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{method}-{int(elapsed_ms)}ms"
+
+        with open(os.path.join(directory, name + '.folded'), 'w', encoding='utf-8') as f:
+            for stack, count in self.sampler.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+        if self.profile is not None:
+            self.profile.dump_stats(os.path.join(directory, name + '.prof'))
+        return name
+
+
+class Profiler:
+    """
+    按需性能剖析工具类
+    """
+
+    @staticmethod
+    def route_dir(endpoint: str) -> str:
+        return os.path.join(PROFILES_DIR, _SAFE_NAME.sub('_', endpoint or 'unmatched'))
+
+    @staticmethod
+    def start_window(rate: float, seconds: float) -> Dict:
+        """
+        开启抽样窗口：seconds 秒内按 rate 比例剖析所有请求
+
+        Args:
+            rate: 抽样比例（0-1）
+            seconds: 窗口时长（秒），不超过 PROFILE_MAX_WINDOW_SECONDS
+
+        Returns:
+            Dict: 窗口状态
+        """
+        if not 0 < rate <= 1:
+            raise ValueError("抽样比例必须在 (0, 1] 之间")
+        if seconds <= 0:
+            raise ValueError("窗口时长必须大于0")
+        with _window_lock:
+            _window['rate'] = rate
+            _window['until'] = time.time() + min(seconds, PROFILE_MAX_WINDOW_SECONDS)
+            _window['captured'] = 0
+        return Profiler.window_status()
+
+    @staticmethod
+    def stop_window() -> Dict:
+        with _window_lock:
+            _window['until'] = 0.0
+        return Profiler.window_status()
+
+    @staticmethod
+    def window_status() -> Dict:
+        with _window_lock:
+            remaining = max(0.0, _window['until'] - time.time())
+            return {
+                'active': remaining > 0,
+                'rate': _window['rate'],
+                'remaining_seconds': round(remaining, 1),
+                'captured': _window['captured']
+            }
+
+    @staticmethod
+    def _should_profile() -> Optional[str]:
+        """
+        判断当前请求是否需要剖析，返回触发原因
+        """
+        if request.blueprint == 'admin':
+            return None
+        if request.args.get('__profile') == '1' and AdminAuth.is_authorized():
+            return 'explicit'
+        # 无锁读取：窗口未开启时热路径只有一次比较
+        if _window['until'] > time.time() and random.random() < _window['rate']:
+            with _window_lock:
+                _window['captured'] += 1
+            return 'window'
+        return None
+
+    @staticmethod
+    def list_profiles() -> Dict[str, List[Dict]]:
+        """
+        按路由列出已保存的剖析结果（新的在前）
+        """
+        routes = {}
+        if not os.path.isdir(PROFILES_DIR):
+            return routes
+        for endpoint in sorted(os.listdir(PROFILES_DIR)):
+            directory = os.path.join(PROFILES_DIR, endpoint)
+            if not os.path.isdir(directory):
+                continue
+            captures = {}
+            for filename in os.listdir(directory):
+                name, ext = os.path.splitext(filename)
+                if ext in ('.folded', '.prof'):
+                    captures.setdefault(name, []).append(ext[1:])
+            routes[endpoint] = [{'name': name, 'files': sorted(kinds)}
+                                for name, kinds in sorted(captures.items(), reverse=True)]
+        return routes
+
+    @staticmethod
+    def merged_folded(endpoint: str) -> str:
+        """
+        合并某路由所有请求的折叠调用栈（同一栈的采样数相加）
+        """
+        directory = Profiler.route_dir(endpoint)
+        stacks = Counter()
+        if os.path.isdir(directory):
+            for filename in os.listdir(directory):
+                if not filename.endswith('.folded'):
+                    continue
+                with open(os.path.join(directory, filename), 'r', encoding='utf-8') as f:
+                    for line in f:
+                        stack, _, count = line.rstrip('\n').rpartition(' ')
+                        if stack and count.isdigit():
+                            stacks[stack] += int(count)
+        return ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
+
+    @staticmethod
+    def stats_text(endpoint: str, name: str, sort: str = 'cumulative', limit: int = 40) -> Optional[str]:
+        """
+        以文本形式输出 cProfile 统计的前 limit 项
+        """
+        path = os.path.join(Profiler.route_dir(endpoint), _SAFE_NAME.sub('_', name) + '.prof')
+        if not os.path.exists(path):
+            return None
+        output = io.StringIO()
+        stats = pstats.Stats(path, stream=output)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+    @staticmethod
+    def init_app(app: Flask):
+        """
+        注册请求钩子：满足条件的请求在视图执行期间被剖析
+        """
+        def _finish(response=None):
+            profile = g.pop('_request_profile', None)
+            if profile is None:
+                return None
+            elapsed = profile.stop()
+            name = profile.save(request.endpoint, request.method, elapsed)
+            app.logger.info('已保存请求剖析 %s %s -> %s (%s)', request.method, request.path, name, profile.reason)
+            return name
+
+        @app.before_request
+        def _start_profile():
+            reason = Profiler._should_profile()
+            if reason:
+                g._request_profile = RequestProfile(reason)
+                g._request_profile.start()
+
+        @app.after_request
+        def _stop_profile(response):
+            name = _finish(response)
+            if name:
+                response.headers['X-Profile'] = f'{os.path.basename(Profiler.route_dir(request.endpoint))}/{name}'
+            return response
+
+        @app.teardown_request
+        def _stop_profile_on_error(exc):
+            # 视图抛出异常时 after_request 不会执行
+            _finish()
@@ -0,0 +1,140 @@
+"""
+SQL查询统计工具模块
+通过引擎事件统计每个请求的SQL条数和耗时，按语句指纹检测 N+1 查询
+"""
+from typing import List, Tuple
+from collections import Counter
+from contextlib import contextmanager
+import logging
+import re
+import threading
+import time
+from flask import Flask, g, request
+from sqlalchemy import event
+from src.config import QUERY_REPEAT_WARN_THRESHOLD
+
+query_logger = logging.getLogger('ev_mes.queries')
+
+# 当前线程上正在收集的计数器栈（请求级计数器与测试中的断言计数器可同时生效）
+_local = threading.local()
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bin\s*\((?:\s*(?:\?|:\w+|%s)\s*,?)+\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+class QueryCounter:
+    """
+    SQL计数器（with 语句内生效，只统计当前线程执行的语句）
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.fingerprints = Counter()
+
+    def __enter__(self):
+        stack = getattr(_local, 'counters', None)
+        if stack is None:
+            stack = _local.counters = []
+        stack.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _local.counters.remove(self)
+        return False
+
+    def record(self, statement: str, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.fingerprints[QueryStats.fingerprint(statement)] += 1
+
+    def repeated(self, threshold: int = QUERY_REPEAT_WARN_THRESHOLD) -> List[Tuple[str, int]]:
+        """
+        返回执行次数超过阈值的语句指纹（疑似 N+1）
+        """
+        return [(fingerprint, count) for fingerprint, count in self.fingerprints.most_common()
+                if count > threshold]
+
+
+class QueryStats:
+    """
+    SQL查询统计工具类
+    """
+
+    @staticmethod
+    def fingerprint(statement: str) -> str:
+        """
+        归一化语句文本：字面量替换为 ?，IN 列表折叠，空白合并
+        """
+        text = _STRING_LITERAL.sub('?', statement)
+        text = _NUMBER_LITERAL.sub('?', text)
+        text = _IN_LIST.sub('IN (?)', text)
+        return _WHITESPACE.sub(' ', text).strip()
+
+    @staticmethod
+    def install(engine):
+        """
+        在引擎上注册语句计时监听器（没有活动计数器时只做一次属性查找）
+
+        开始时间记在本次执行的上下文上：StaticPool 下各线程共用一个连接，放在 conn.info 中会互相错配，
+        且执行失败时不会触发 after_cursor_execute，残留的开始时间会错配给之后的语句
+        """
+        @event.listens_for(engine, 'before_cursor_execute')
+        def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if context is not None and getattr(_local, 'counters', None):
+                context._query_started = time.perf_counter()
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            counters = getattr(_local, 'counters', None)
+            started = getattr(context, '_query_started', None)
+            if not counters or started is None:
+                return
+            elapsed = (time.perf_counter() - started) * 1000
+            for counter in counters:
+                counter.record(statement, elapsed)
+
+    @staticmethod
+    def init_app(app: Flask):
+        """
+        为每个请求启用计数器，输出 Server-Timing 的 sql 项并对疑似 N+1 记录警告
+        """
+        @app.before_request
+        def _start_query_counter():
+            g._query_counter = QueryCounter().__enter__()
+
+        @app.after_request
+        def _report_query_counter(response):
+            counter = g.get('_query_counter')
+            if counter is None:
+                return response
+
+            response.headers.add('Server-Timing', f'sql;dur={counter.total_ms:.1f};desc="{counter.count} queries"')
+            for fingerprint, count in counter.repeated():
+                query_logger.warning('疑似N+1查询: %s %s 同一语句执行 %d 次: %s',
+                                     request.method, request.path, count, fingerprint[:300])
+            return response
+
+        @app.teardown_request
+        def _stop_query_counter(exc):
+            counter = g.pop('_query_counter', None)
+            if counter is not None:
+                counter.__exit__(None, None, None)
+
+    @staticmethod
+    @contextmanager
+    def assert_max_queries(max_count: int):
+        """
+        断言代码块内执行的SQL不超过 max_count 条（测试辅助）
+
+        用法:
+            with QueryStats.assert_max_queries(3):
+                client.get('/production/?search=PLN')
+        """
+        with QueryCounter() as counter:
+            yield counter
+        if counter.count > max_count:
+            details = '\n'.join(f'  {count}x {fingerprint}' for fingerprint, count in counter.fingerprints.most_common())
+            raise AssertionError(f"执行了 {counter.count} 条SQL，超过上限 {max_count}:\n{details}")
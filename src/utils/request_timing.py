@@ -0,0 +1,121 @@
+"""
+请求分阶段计时工具模块
+在请求内按阶段（db / serialize / chart / render）累计耗时，输出 Server-Timing 响应头和慢请求日志
+"""
+from typing import Dict
+from contextlib import contextmanager
+import json
+import logging
+import time
+from urllib.parse import urlencode
+from flask import Flask, g, has_request_context, request, template_rendered, before_render_template
+from src.config import SLOW_REQUEST_THRESHOLD_MS, SLOW_REQUEST_LOG_FILE
+
+slow_request_logger = logging.getLogger('ev_mes.slow_requests')
+
+
+class RequestTiming:
+    """
+    请求计时工具类
+
+    用法:
+        with RequestTiming.timed('db'):
+            rows = query.all()
+
+    也可作为装饰器使用（@RequestTiming.timed('chart')）。不在请求上下文中（命令行工具、
+    基准测试）时不做任何记录。同名阶段多次进入时累加耗时和次数，同名阶段不应嵌套。
+    """
+
+    @staticmethod
+    @contextmanager
+    def timed(phase: str):
+        """
+        对代码块计时并累加到当前请求的指定阶段
+        """
+        timings = RequestTiming._current()
+        if timings is None:
+            yield
+            return
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            entry = timings.setdefault(phase, [0.0, 0])
+            entry[0] += elapsed
+            entry[1] += 1
+
+    @staticmethod
+    def _current() -> Dict:
+        if not has_request_context():
+            return None
+        return g.get('_request_timings')
+
+    @staticmethod
+    def _logged_path() -> str:
+        """
+        日志中记录的路径：去掉 __ 开头的控制参数（如 __profile），不把它们的值写入日志
+        """
+        query = urlencode([(name, value) for name, value in request.args.items(multi=True)
+                           if not name.startswith('__')])
+        return f'{request.path}?{query}' if query else request.path
+
+    @staticmethod
+    def init_app(app: Flask):
+        """
+        注册请求钩子和模板渲染信号
+        """
+        if SLOW_REQUEST_LOG_FILE and not slow_request_logger.handlers:
+            handler = logging.FileHandler(SLOW_REQUEST_LOG_FILE, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            slow_request_logger.addHandler(handler)
+            slow_request_logger.setLevel(logging.INFO)
+            slow_request_logger.propagate = False
+
+        @app.before_request
+        def _start_request_timing():
+            g._request_started = time.perf_counter()
+            g._request_timings = {}
+
+        @app.after_request
+        def _finish_request_timing(response):
+            timings = RequestTiming._current()
+            if timings is None:
+                return response
+
+            total = (time.perf_counter() - g._request_started) * 1000
+            metrics = [f'{phase};dur={duration:.1f}' for phase, (duration, _) in timings.items()]
+            metrics.append(f'total;dur={total:.1f}')
+            # 使用 add 与其他组件（如SQL统计）输出的 Server-Timing 并存
+            response.headers.add('Server-Timing', ', '.join(metrics))
+
+            if total >= SLOW_REQUEST_THRESHOLD_MS:
+                slow_request_logger.info(json.dumps({
+                    'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+                    'method': request.method,
+                    'path': RequestTiming._logged_path(),
+                    'endpoint': request.endpoint,
+                    'status': response.status_code,
+                    'total_ms': round(total, 1),
+                    'phases': {phase: {'ms': round(duration, 1), 'count': count}
+                               for phase, (duration, count) in timings.items()}
+                }, ensure_ascii=False))
+            return response
+
+        def _before_render(sender, template, context, **extra):
+            if RequestTiming._current() is not None:
+                g._render_started = time.perf_counter()
+
+        def _after_render(sender, template, context, **extra):
+            timings = RequestTiming._current()
+            started = g.pop('_render_started', None)
+            if timings is None or started is None:
+                return
+            entry = timings.setdefault('render', [0.0, 0])
+            entry[0] += (time.perf_counter() - started) * 1000
+            entry[1] += 1
+
+        # 信号默认弱引用，局部函数需要强引用注册
+        before_render_template.connect(_before_render, app, weak=False)
+        template_rendered.connect(_after_render, app, weak=False)
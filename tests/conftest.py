@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""
+测试配置：使用临时数据库，避免导入模型时连接 data/ev_mes.db
+"""
+import os
+import sys
+import tempfile
+
+os.environ.setdefault('EV_MES_DATABASE_URI',
+                      'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='ev_mes_test_'), 'test.db'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+自动补全索引重建测试
+"""
+from types import SimpleNamespace
+import pytest
+from src.services import autocomplete_service
+from src.services.autocomplete_service import AutocompleteService
+from src.utils.prefix_index import PrefixIndex
+
+
+class _Rows:
+    """
+    模拟查询结果：逐行返回时调用 during 模拟其他线程在重建期间提交的写入
+    """
+
+    def __init__(self, rows, during):
+        self.rows = rows
+        self.during = during
+
+    def yield_per(self, count):
+        for i, row in enumerate(self.rows):
+            if i == 1:
+                self.during()
+            yield row
+
+
+def _order(order_id, customer):
+    return SimpleNamespace(id=order_id, customer=customer, vehicle_model='Model', quantity=1, status='PENDING')
+
+
+@pytest.fixture
+def orders_index(monkeypatch):
+    monkeypatch.setattr(autocomplete_service, '_indexes', {'orders': PrefixIndex()})
+    monkeypatch.setattr(autocomplete_service, '_loaded_at', {})
+    monkeypatch.setattr(autocomplete_service, '_pending', {})
+
+    def use_rows(rows, during):
+        monkeypatch.setitem(autocomplete_service._LOADERS, 'orders', (
+            lambda db: _Rows(rows, during), autocomplete_service._order_record))
+    return use_rows
+
+
+def _ids(q):
+    return [row['id'] for row in AutocompleteService(None).search('orders', q)]
+
+
+def test_updates_during_rebuild_are_kept(orders_index):
+    # 查询快照不含重建期间新增的 3，也仍包含重建期间删除的 2
+    def during():
+        AutocompleteService.on_order_saved(_order(3, 'alpha three'))
+        AutocompleteService.on_order_deleted(2)
+
+    orders_index([_order(1, 'alpha one'), _order(2, 'alpha two')], during)
+    assert _ids('alpha') == [1, 3]
+
+
+def test_failed_rebuild_keeps_updates_on_old_index(orders_index, monkeypatch):
+    orders_index([_order(1, 'alpha one')], lambda: None)
+    assert _ids('alpha') == [1]
+
+    def during():
+        AutocompleteService.on_order_saved(_order(2, 'alpha two'))
+        raise RuntimeError('数据库不可用')
+
+    orders_index([_order(1, 'alpha one'), _order(5, 'alpha five')], during)
+    monkeypatch.setattr(autocomplete_service, '_loaded_at', {'orders': float('-inf')})
+    with pytest.raises(RuntimeError):
+        AutocompleteService(None).search('orders', 'alpha')
+
+    assert autocomplete_service._pending == {}
+    # 旧索引继续使用，并包含失败重建期间的写入
+    assert [row['id'] for row in autocomplete_service._indexes['orders'].search('alpha')] == [1, 2]
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+排程沙盘单条生产线排程测试
+"""
+import numpy as np
+import pytest
+from src.services.sandbox_service import schedule_line, merge_intervals
+
+
+def _assert_valid(release, duration, fixed, windows, start):
+    # 进行中/已完成的计划保持原开始时间
+    assert np.array_equal(start[fixed], release[fixed])
+    movable = ~fixed
+    # 可调计划不早于原开始时间，且保持原顺序、互不重叠
+    assert np.all(start[movable] >= release[movable])
+    moved_start, moved_end = start[movable], start[movable] + duration[movable]
+    assert np.all(moved_start[1:] >= moved_end[:-1])
+    # 不与固定计划或停线窗口重叠
+    blocks = [(s, s + d) for s, d in zip(release[fixed], duration[fixed]) if d > 0] + list(windows)
+    for block_start, block_end in blocks:
+        assert not np.any((moved_start < block_end) & (moved_end > block_start) & (moved_end > moved_start))
+
+
+def test_fixed_plan_not_moved_by_earlier_plan():
+    release = np.array([0, 3600], dtype=np.int64)
+    duration = np.array([7200, 3600], dtype=np.int64)
+    fixed = np.array([False, True])
+    start = schedule_line(release, duration, fixed, [])
+    assert start.tolist() == [7200, 3600]
+
+
+def test_fixed_plan_not_moved_by_downtime():
+    release = np.array([0, 20000], dtype=np.int64)
+    duration = np.array([7200, 3600], dtype=np.int64)
+    fixed = np.array([False, True])
+    start = schedule_line(release, duration, fixed, [(5000, 30000)])
+    assert start[1] == 20000
+    _assert_valid(release, duration, fixed, [(5000, 30000)], start)
+
+
+def test_no_fixed_plans_matches_sequential_packing():
+    release = np.array([0, 100, 5000], dtype=np.int64)
+    duration = np.array([1000, 1000, 1000], dtype=np.int64)
+    start = schedule_line(release, duration, np.zeros(3, dtype=bool), [])
+    assert start.tolist() == [0, 1000, 5000]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_fixed_starts_never_change(seed):
+    rng = np.random.default_rng(seed)
+    n = 60
+    release = np.sort(rng.integers(0, 500000, size=n)).astype(np.int64)
+    duration = rng.integers(0, 20000, size=n).astype(np.int64)
+    fixed = rng.random(n) < 0.3
+    windows = []
+    for _ in range(rng.integers(0, 4)):
+        window_start = int(rng.integers(0, 500000))
+        windows.append((window_start, window_start + int(rng.integers(1, 50000))))
+    start = schedule_line(release, duration, fixed, windows)
+    _assert_valid(release, duration, fixed, windows, start)
+
+
+def test_merge_intervals():
+    starts, ends = merge_intervals(np.array([10, 0, 30, 15]), np.array([20, 5, 40, 25]))
+    assert starts.tolist() == [0, 10, 30]
+    assert ends.tolist() == [5, 25, 40]